@@ -0,0 +1,36 @@
+import pytest
+
+from vmi.model.episode import Episode
+from vmi.model.season import Season
+from vmi.model.show import Show, ShowMetadata
+
+
+# Show with one season per list of scores, its episodes indexed and given
+# imdb ids "tt%07d" in order. episode_ids_by_season gives the episode imdb ids
+# instead, scores then default to 8.0.
+def _make_show(scores_by_season=None, imdb_id="tt1234567",
+               episode_ids_by_season=None):
+    if scores_by_season is None:
+        scores_by_season = [[8.0] * len(episode_ids)
+                            for episode_ids in episode_ids_by_season]
+    season_list = []
+    index = 1
+    for season_number, scores in enumerate(scores_by_season, 1):
+        episode_ids = None
+        if episode_ids_by_season is not None:
+            episode_ids = episode_ids_by_season[season_number - 1]
+        episode_list = []
+        for number, score in enumerate(scores, 1):
+            episode_list.append(Episode(
+                index, season_number, number, "Episode %d" % index, score,
+                episode_ids[number - 1] if episode_ids else "tt%07d" % index))
+            index += 1
+        season_list.append(Season(season_number, episode_list))
+    show_metadata = ShowMetadata(
+        "Test Show", "test-show", "8.7", imdb_id, len(season_list))
+    return Show(show_metadata, season_list)
+
+
+@pytest.fixture
+def make_show():
+    return _make_show
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+import threading
+
+from vmi.db.columnar import EpisodeColumns
+from vmi.insights.show import ShowInsights
+
+
+def test_columns_sync_and_summarize(tmpdir, make_show):
+    columns = EpisodeColumns(str(tmpdir) + "/")
+    first = make_show([[8.0, 8.5], [9.0]], "tt0000001")
+    second = make_show([[7.0, 6.0, 5.5]], "tt0000002")
+    columns.build([first, second])
+
+    # a fresh reader maps what was written.
+    columns = EpisodeColumns(str(tmpdir) + "/")
+    assert(list(columns.show_ids) == ["tt0000001", "tt0000002"])
+    assert(list(columns.season[columns.show_rows("tt0000001")]) == [1, 1, 2])
+    for i, show in enumerate([first, second]):
+        insights = ShowInsights(show)
+        assert(columns.mean_scores()[i] ==
+               pytest.approx(insights.avg_episode_rating))
+        assert(columns.slopes()[i] == pytest.approx(insights.slope))
+
+    # a changed show is replaced, an unchanged one is left alone.
+    generation = columns.generation
+    columns.sync_show(second)
+    assert(columns.generation == generation)
+    first = make_show([[8.0, 8.5], [9.0, 9.5]], "tt0000001")
+    columns.sync_show(first)
+    assert(list(columns.show_ids) == ["tt0000002", "tt0000001"])
+    assert(list(columns.episode_counts()) == [3, 4])
+
+    columns.remove_show("tt0000002")
+    assert(list(columns.show_ids) == ["tt0000001"])
+    assert(np.allclose(columns.score, [8.0, 8.5, 9.0, 9.5]))
+
+
+def test_sync_only_writes_the_show(tmpdir, make_show):
+    columns = EpisodeColumns(str(tmpdir) + "/")
+    shows = [make_show([[7.0 + i % 3] * (1 + i % 4)], "tt%07d" % i)
+             for i in range(32)]
+    for show in shows:
+        columns.sync_show(show)
+        # the newest segments were merged, so there are only a few.
+        assert(len(columns.segments) <= 6)
+    assert(list(columns.show_ids) == [show.imdb_id for show in shows])
+    assert(list(columns.episode_counts()) ==
+           [show.episode_count for show in shows])
+
+    # a replaced show's old rows are dead until their segment is merged.
+    changed = make_show([[1.0, 2.0]], "tt0000003")
+    columns.sync_show(changed)
+    assert(columns.show_ids[-1] == "tt0000003")
+    assert(list(columns.score[columns.show_rows("tt0000003")]) == [1.0, 2.0])
+    assert(len(columns.show_ids) == 32)
+
+    # and the same catalog is read back from disk.
+    reader = EpisodeColumns(str(tmpdir) + "/")
+    assert(list(reader.show_ids) == list(columns.show_ids))
+    assert(np.array_equal(reader.score, columns.score))
+
+
+def test_load_retries_when_segments_vanish(tmpdir, make_show):
+    reader = EpisodeColumns(str(tmpdir) + "/")
+    writer = EpisodeColumns(str(tmpdir) + "/")
+    writer.build([make_show([[8.0]], "tt0000001")])
+    read_current = reader._read_current
+    reads = []
+
+    # a writer replaces everything right after the reader read CURRENT.
+    def racing_read_current():
+        manifest = read_current()
+        if not reads:
+            writer.build([make_show([[7.0]], "tt0000002")])
+        reads.append(manifest)
+        return manifest
+
+    reader._read_current = racing_read_current
+    reader.load()
+    assert(len(reads) == 2)
+    assert(list(reader.show_ids) == ["tt0000002"])
+
+
+def test_concurrent_readers_and_writer(tmpdir, make_show):
+    dbpath = str(tmpdir) + "/"
+    shows = [make_show([[5.0 + i % 5] * 3], "tt%07d" % i) for i in range(40)]
+    errors = []
+    done = threading.Event()
+
+    def write():
+        try:
+            writer = EpisodeColumns(dbpath)
+            for i, show in enumerate(shows):
+                writer.sync_show(show)
+                if i % 7 == 0:
+                    writer.remove_show(shows[i // 2].imdb_id)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                reader = EpisodeColumns(dbpath)
+                # every show in the catalog has all of its rows.
+                assert(all(count == 3 for count in reader.episode_counts()))
+                assert(len(reader.score) == 3 * len(reader.show_ids))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write)] + \
+        [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert(errors == [])
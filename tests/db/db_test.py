@@ -0,0 +1,165 @@
+import pytest
+
+from vmi.db.db import DbClient
+from vmi.model.episode import Episode
+from vmi.model.movie import Movie, MovieMetadata
+from vmi.model.season import Season
+from vmi.model.show import Show, ShowMetadata
+from vmi.net.session import ThrottledError
+
+
+# Answers name searches from a dict and remembers what was searched.
+class _StubNet:
+    def __init__(self, names):
+        self.names = names
+        self.searched = []
+
+    def find_director_imdb_id_by_name(self, name):
+        self.searched.append(name)
+        if name == "Throttled":
+            raise ThrottledError("www.imdb.com")
+        return self.names.get(name)
+
+
+# DbClient with all of its data under a temp dir.
+@pytest.fixture
+def dbclient(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OMDB_API_KEY", "test")
+    monkeypatch.delenv("VMI_HTTP_CACHE", raising=False)
+    return DbClient(storage="pickle")
+
+
+def test_near_miss_names_are_searched(dbclient):
+    dbclient.net = _StubNet({
+        "Spike Jonze": "nm0005069",
+        "Spike Jones": None,
+        "Jon Watts": "nm1218281",
+        "John Watts": None,
+    })
+    assert(dbclient.resolve_director_names(["Spike Jonze", "Jon Watts"]) ==
+           ["nm0005069", "nm1218281"])
+    assert(dbclient.resolve_director_names(["Spike Jones", "John Watts"]) ==
+           [None, None])
+    assert(dbclient.net.searched == [
+        "Spike Jonze", "Jon Watts", "Spike Jones", "John Watts"])
+    # exact names are served from the name index.
+    dbclient.resolve_director_names(["spike jonze"])
+    assert(len(dbclient.net.searched) == 4)
+
+
+def test_throttled_name_is_skipped_not_cached(dbclient):
+    dbclient.net = _StubNet({"Spike Jonze": "nm0005069"})
+    assert(dbclient.resolve_director_names(["Throttled", "Spike Jonze"]) ==
+           [None, "nm0005069"])
+    # searched again next time, rather than remembered as a miss.
+    dbclient.resolve_director_names(["Throttled"])
+    assert(dbclient.net.searched.count("Throttled") == 2)
+
+
+class _StubMovieNet:
+    def get_movies(self, movie_metadata_list):
+        for movie_metadata in movie_metadata_list:
+            if movie_metadata.title == "Broken":
+                yield None
+            else:
+                yield Movie(movie_metadata.imdb_id, movie_metadata.title,
+                            None, None, None, None, None, None, None, None, [])
+
+
+def test_get_movies_skips_failed_movies(dbclient):
+    dbclient.net = _StubMovieNet()
+    movie_metadata_list = [MovieMetadata("tt0000001", "First"),
+                           MovieMetadata("tt0000002", "Broken"),
+                           MovieMetadata("tt0000003", "Third")]
+    movie_list = dbclient._get_movies(movie_metadata_list)
+    assert([movie.title for movie in movie_list] == ["First", "Third"])
+    assert(dbclient.store.has(movie_metadata_list[2]))
+    assert(not dbclient.store.has(movie_metadata_list[1]))
+
+
+def _show_metadata():
+    return ShowMetadata("Test Show", "test-show", "8.7", "tt1234567", 2)
+
+
+class _StubShowNet:
+    def __init__(self):
+        self.streamed = 0
+
+    def get_show_metadata(self, title):
+        return _show_metadata()
+
+    def iter_show(self, show_metadata):
+        self.streamed += 1
+        for number in range(1, 3):
+            yield Season(number, [Episode(
+                number, number, 1, "Episode %d" % number, 8.0,
+                "tt000000%d" % number)])
+
+
+def test_stream_show_stores_on_exhaustion(dbclient):
+    dbclient.net = _StubShowNet()
+    show_metadata, seasons = dbclient.stream_show("Test Show")
+    assert(isinstance(show_metadata, ShowMetadata))
+    next(seasons)
+    # nothing is stored until every season is in.
+    assert(not dbclient.store.has(show_metadata))
+    next(seasons)
+    assert(list(seasons) == [])
+    assert(dbclient.store.has(show_metadata))
+
+    show_metadata, seasons = dbclient.stream_show("Test Show")
+    assert(isinstance(show_metadata, ShowMetadata))
+    assert(show_metadata.imdb_id == "tt1234567")
+    assert([season.number for season in seasons] == [1, 2])
+    assert(dbclient.net.streamed == 1)
+
+
+def _season(number, first_index, scores):
+    return Season(number, [
+        Episode(first_index + i, number, i + 1, "Episode %d" % (i + 1),
+                score, "tt%03d%04d" % (number, i + 1))
+        for i, score in enumerate(scores)])
+
+
+# Serves a show that gained an episode in its last season and a new season.
+class _StubRefreshNet:
+    def __init__(self):
+        self.requested = []
+
+    def get_show_metadata(self, title):
+        return ShowMetadata("Test Show", "test-show", "8.7", "tt1234567", 3)
+
+    def get_seasons(self, show_metadata, season_numbers, first_index=1):
+        season_numbers = list(season_numbers)
+        self.requested.append((season_numbers, first_index))
+        scores = {2: [7.0, 7.5, 9.0], 3: [8.0, 8.5]}
+        season_list = []
+        for number in season_numbers:
+            season_list.append(_season(number, first_index, scores[number]))
+            first_index += len(scores[number])
+        return season_list
+
+
+def test_refresh_show(dbclient):
+    stored = Show(ShowMetadata("Test Show", "test-show", "8.7", "tt1234567", 2),
+                  [_season(1, 1, [8.0, 8.2, 8.4]), _season(2, 4, [7.0, 7.5])])
+    dbclient.store.put(stored)
+    dbclient.net = _StubRefreshNet()
+
+    show = dbclient.refresh_show("Test Show")
+    # only the last cached season and the new one are scraped, numbered on
+    # from the kept seasons.
+    assert(dbclient.net.requested == [([2, 3], 4)])
+    assert([season.number for season in show.season_list] == [1, 2, 3])
+    episodes = [e for season in show.season_list for e in season.episode_list]
+    assert([e.index for e in episodes] == list(range(1, 9)))
+    assert(show.season_list[0].episode_list[0].__getstate__() ==
+           stored.season_list[0].episode_list[0].__getstate__())
+    assert([e.score for e in show.season_list[0].episode_list] ==
+           [8.0, 8.2, 8.4])
+    assert([e.score for e in show.season_list[1].episode_list] ==
+           [7.0, 7.5, 9.0])
+    # and the refreshed show is what's stored now.
+    dbclient.store.clear()
+    assert(dbclient.store.get(show).episode_count == 8)
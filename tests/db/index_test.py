@@ -0,0 +1,101 @@
+import threading
+
+from vmi.db.index import NameIndex, TitleIndex
+
+
+def test_title_index(tmpdir):
+    path = str(tmpdir / "titles.json")
+    index = TitleIndex(path)
+    assert(index.get("The Wire") is None)
+    index.add("tt0306414", ["the wire", "The Wire"])
+    # aliases are normalized and survive a reload
+    index = TitleIndex(path)
+    assert(index.get("THE WIRE") == "tt0306414")
+    assert(index.get("the-wire") == "tt0306414")
+    assert(index.get("tt0306414") == "tt0306414")
+    index.remove("tt0306414")
+    assert(TitleIndex(path).get("The Wire") is None)
+
+
+def test_title_index_shared_by_writers(tmpdir):
+    path = str(tmpdir / "titles.json")
+    first = TitleIndex(path)
+    second = TitleIndex(path)
+    first.add("tt0306414", ["The Wire"])
+    second.add("tt0903747", ["Breaking Bad"])
+    # a removal only takes away the remover's own entries.
+    second.add("tt0141842", ["The Sopranos"])
+    first.remove("tt0306414")
+    index = TitleIndex(path)
+    assert(index.get("The Wire") is None)
+    assert(index.get("Breaking Bad") == "tt0903747")
+    assert(index.get("The Sopranos") == "tt0141842")
+
+    def add(offset):
+        writer = TitleIndex(path)
+        for i in range(offset, offset + 20):
+            writer.add("tt%07d" % i, ["Show %d" % i])
+
+    threads = [threading.Thread(target=add, args=(i * 100,))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    index = TitleIndex(path)
+    assert(all(index.get("Show %d" % i) == "tt%07d" % i
+               for offset in range(0, 400, 100)
+               for i in range(offset, offset + 20)))
+
+
+def test_name_index(tmpdir):
+    path = str(tmpdir / "names.json")
+    index = NameIndex(path)
+    assert(index.lookup("Martin Scorsese") == (False, None))
+    index.add("Martin Scorsese", "nm0000217")
+    index.add("Nobody Atall", None)
+    index = NameIndex(path)
+    assert(index.lookup("martin  scorsese") == (True, "nm0000217"))
+    # a near miss is only a suggestion, it is never resolved
+    assert(index.lookup("Martin Scorcese") == (False, None))
+    assert(index.suggest("Martin Scorcese") == "martin-scorsese")
+    # cached negative result
+    assert(index.lookup("Nobody Atall") == (True, None))
+
+
+def test_name_index_shared_by_writers(tmpdir):
+    path = str(tmpdir / "names.json")
+    first = NameIndex(path)
+    second = NameIndex(path)
+    # resolved and negative entries of both writers are kept.
+    first.add("Martin Scorsese", "nm0000217")
+    second.add("Nobody Atall", None)
+    second.add("Akira Kurosawa", "nm0000041", save=False)
+    second.add("Satoshi Kon", None, save=False)
+    second.save()
+    index = NameIndex(path)
+    assert(index.lookup("Martin Scorsese") == (True, "nm0000217"))
+    assert(index.lookup("Nobody Atall") == (True, None))
+    assert(index.lookup("Akira Kurosawa") == (True, "nm0000041"))
+    # a miss doesn't take back a name resolved elsewhere.
+    first.add("Satoshi Kon", "nm0464804")
+    second.add("Satoshi Kon", None)
+    assert(NameIndex(path).lookup("Satoshi Kon") == (True, "nm0464804"))
+    assert(second.lookup("Satoshi Kon") == (True, "nm0464804"))
+
+    def add(offset):
+        writer = NameIndex(path)
+        for i in range(offset, offset + 20):
+            writer.add("Director %d" % i, "nm%07d" % i if i % 2 else None)
+
+    threads = [threading.Thread(target=add, args=(i * 100,))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    index = NameIndex(path)
+    assert(all(index.lookup("Director %d" % i) ==
+               (True, "nm%07d" % i if i % 2 else None)
+               for offset in range(0, 400, 100)
+               for i in range(offset, offset + 20)))
@@ -0,0 +1,68 @@
+import pickle
+import pytest
+
+from vmi.db.lazy import LazyShow, StaleRecordError
+from vmi.db.pickler import Pickler, PickleKey
+from vmi.model.show import Show
+
+
+def test_lazy_show_loads_seasons_on_access(tmpdir, make_show):
+    pickler = Pickler(str(tmpdir) + "/")
+    pickler.put(make_show([[8.0, 8.5], [9.0], [7.5]]))
+
+    show = pickler.get(PickleKey("tt1234567"))
+    assert(isinstance(show, LazyShow))
+    assert(show.title == "Test Show")
+    assert(show.season_count == 3 and show.episode_count == 4)
+    assert(list(show.scores) == [8.0, 8.5, 9.0, 7.5])
+    assert(not any(show.season_list.loaded))
+
+    assert(show.season_list[1].episode_list[0].score == 9.0)
+    assert(show.season_list.loaded == [False, True, False])
+
+    # pickles as a plain, fully loaded Show.
+    unpickled = pickle.loads(pickle.dumps(show))
+    assert(type(unpickled) is Show)
+    assert([s.number for s in unpickled.season_list] == [1, 2, 3])
+    assert(unpickled.episode_count == 4)
+
+
+def test_lazy_show_follows_rewrites(tmpdir, make_show):
+    pickler = Pickler(str(tmpdir) + "/")
+    pickler.put(make_show([[8.0], [9.0]]))
+    show = pickler.get(PickleKey("tt1234567"))
+    assert(show.season_list[0].episode_list[0].score == 8.0)
+
+    pickler.put(make_show([[7.0], [6.0], [5.0]]))
+    assert(show.season_list[1].episode_list[0].score == 6.0)
+    assert(show.season_count == 3 and len(show.season_list) == 3)
+    # the season loaded before the rewrite was dropped, not mixed in.
+    assert(show.season_list.loaded == [False, True, False])
+    assert([s.episode_list[0].score for s in show.season_list] ==
+           [7.0, 6.0, 5.0])
+    assert(list(show.scores) == [7.0, 6.0, 5.0])
+
+
+def test_lazy_show_follows_shrinking_rewrites(tmpdir, make_show):
+    pickler = Pickler(str(tmpdir) + "/")
+    pickler.put(make_show([[8.0], [9.0], [7.0]]))
+    show = pickler.get(PickleKey("tt1234567"))
+
+    pickler.put(make_show([[6.0]]))
+    assert([s.episode_list[0].score for s in show.season_list] == [6.0])
+    assert(show.season_count == 1 and show.episode_count == 1)
+    with pytest.raises(IndexError):
+        show.season_list[2]
+
+
+def test_lazy_show_of_a_removed_record(tmpdir, make_show):
+    pickler = Pickler(str(tmpdir) + "/")
+    pickler.put(make_show([[8.0], [9.0]]))
+    show = pickler.get(PickleKey("tt1234567"))
+    assert(show.season_list[0].episode_list[0].score == 8.0)
+
+    pickler.remove(show)
+    with pytest.raises(StaleRecordError):
+        show.season_list[1]
+    # seasons already loaded are still there.
+    assert(show.season_list[0].episode_list[0].score == 8.0)
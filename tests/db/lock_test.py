@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+
+from vmi.db.lock import KeyLocks
+
+
+def test_exclusive_lock(tmp_path):
+    locks = KeyLocks(str(tmp_path))
+    inside = []
+    overlaps = []
+
+    def work():
+        for _ in range(20):
+            with locks.exclusive("key"):
+                inside.append(1)
+                if len(inside) > 1:
+                    overlaps.append(1)
+                time.sleep(0.001)
+                inside.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert(overlaps == [])
+    # lock files don't outlive their last holder.
+    assert(os.listdir(str(tmp_path)) == [])
+
+
+def test_shared_lock(tmp_path):
+    locks = KeyLocks(str(tmp_path))
+    with locks.shared("key"):
+        with locks.shared("key"):
+            assert(os.listdir(str(tmp_path)) == ["key"])
+        # still held by the outer reader.
+        assert(os.listdir(str(tmp_path)) == ["key"])
+    assert(os.listdir(str(tmp_path)) == [])
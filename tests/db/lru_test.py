@@ -0,0 +1,49 @@
+from vmi.db.lazy import LazyShow
+from vmi.db.lru import LruStore, estimate_size
+from vmi.db.pickler import Pickler, PickleKey
+from vmi.model.show import ShowMetadata
+
+
+def _make_show_metadata(imdb_id):
+    return ShowMetadata("Test Show", "test-show", 8.7, imdb_id, 3)
+
+
+def test_lru_store_hits_and_evicts(tmpdir):
+    store = LruStore(Pickler(str(tmpdir) + "/"), max_entries=2)
+    for imdb_id in ["tt0000001", "tt0000002", "tt0000003"]:
+        store.store.put(_make_show_metadata(imdb_id))
+
+    first = store.get(PickleKey("tt0000001"))
+    assert(store.get(PickleKey("tt0000001")) is first)
+    assert(store.stats()["hits"] == 1 and store.stats()["misses"] == 1)
+
+    store.get(PickleKey("tt0000002"))
+    store.get(PickleKey("tt0000003"))
+    # tt0000001 was the least recently used.
+    assert(list(store.entries) == ["tt0000002", "tt0000003"])
+
+    # put and remove invalidate.
+    updated = _make_show_metadata("tt0000002")
+    store.put(updated)
+    assert(store.get(PickleKey("tt0000002")) is updated)
+    store.remove(updated)
+    assert(not store.has(updated))
+
+
+def test_lru_store_max_bytes(tmpdir):
+    store = LruStore(Pickler(str(tmpdir) + "/"), max_bytes=1)
+    show_metadata = _make_show_metadata("tt0000001")
+    store.put(show_metadata)
+    # too large to cache at all, but still stored.
+    assert(store.stats()["entries"] == 0)
+    assert(store.get(show_metadata).imdb_id == "tt0000001")
+
+
+def test_lru_store_sizes_lazy_shows_without_loading(tmpdir, make_show):
+    store = LruStore(Pickler(str(tmpdir) + "/"), max_bytes=10 ** 6)
+    store.store.put(make_show([[8.0], [8.0]], "tt0000001"))
+    show = store.get(PickleKey("tt0000001"))
+    assert(isinstance(show, LazyShow))
+    assert(not any(show.season_list.loaded))
+    assert(store.stats()["bytes"] == estimate_size(show))
+    assert(estimate_size(show) > estimate_size(_make_show_metadata("tt1")))
@@ -1,4 +1,11 @@
-from vmi.db.pickler import Pickler
+import os
+import pickle
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from vmi.db.pickler import DIRECTORS, SHOWS, Pickler, PickleKey
+from vmi.model.director import DirectorMetadata
 from vmi.model.show import ShowMetadata
 
 
@@ -11,3 +18,49 @@ def test_pickler(tmpdir):
     gotten = pickler.get(show_metadata)
     # use hacky deep copy to check for equality
     assert(gotten.__dict__ == show_metadata.__dict__)
+
+
+def _create_slowly(path, counter_path):
+    pickler = Pickler(path)
+
+    def create():
+        with open(counter_path, "a") as f:
+            f.write("x")
+        time.sleep(0.2)
+        return ShowMetadata("Test Show", "test-show", 8.7, "tt1234567", 3)
+    return pickler.get_or_create(PickleKey("tt1234567"), create).title
+
+
+def test_pickler_get_or_create_is_single_flight(tmpdir):
+    path = str(tmpdir) + "/"
+    counter_path = str(tmpdir.join("created"))
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        titles = list(executor.map(
+            _create_slowly, [path] * 4, [counter_path] * 4))
+    assert(titles == ["Test Show"] * 4)
+    with open(counter_path) as f:
+        assert(f.read() == "x")
+    # no temp files are left behind.
+    assert(sorted(os.listdir(path)) == [".locks", "created", "shows"])
+    assert([name for _, _, names in os.walk(path + "shows")
+            for name in names] == ["tt1234567"])
+
+
+def test_pickler_moves_flat_entries(tmpdir):
+    path = str(tmpdir) + "/"
+    show_metadata = ShowMetadata("Test Show", "test-show", 8.7, "tt1234567", 3)
+    director_metadata = DirectorMetadata(
+        "nm0000217", "Martin Scorsese", "martin-scorsese", [])
+    # the old flat layout, every entity in one directory.
+    for obj in [show_metadata, director_metadata]:
+        with open(path + obj.imdb_id, "wb") as f:
+            pickle.dump(obj, f)
+
+    pickler = Pickler(path)
+    # moved on first lookup.
+    assert(pickler.has(PickleKey("nm0000217", DIRECTORS)))
+    assert(not os.path.exists(path + "nm0000217"))
+    assert(pickler.move_flat_entries() == 1)
+    assert([(key.namespace, key.imdb_id) for key in pickler.keys()] ==
+           [(DIRECTORS, "nm0000217"), (SHOWS, "tt1234567")])
+    assert(pickler.get(show_metadata).title == "Test Show")
@@ -0,0 +1,96 @@
+import pickle
+import pytest
+
+from vmi.db import record
+from vmi.db.migrate import migrate
+from vmi.db.pickler import Pickler, PickleKey
+from vmi.model.director import DirectorMetadata
+from vmi.model.episode import Episode
+from vmi.model.movie import MovieMetadata
+from vmi.model.season import Season
+from vmi.model.show import Show, ShowMetadata
+
+
+def _make_show_metadata():
+    return ShowMetadata("Test Show", "test-show", 8.7, "tt1234567", 3)
+
+
+def test_record_round_trip():
+    show_metadata = _make_show_metadata()
+    for codec in [record.CODEC_NONE, record.CODEC_ZLIB]:
+        data = record.dumps(show_metadata, codec)
+        assert(data.startswith(record.MAGIC))
+        assert(record.read_header(data) == (record.FORMAT_VERSION, codec))
+        assert(record.loads(data).__dict__ == show_metadata.__dict__)
+
+
+def test_record_holds_plain_data_only():
+    director_metadata = DirectorMetadata(
+        "nm0000001", "Some Director", "some-director",
+        [MovieMetadata("tt0000001", "First"), MovieMetadata("tt0000002",
+                                                            "Second")])
+    show = Show(_make_show_metadata(), [Season(1, [
+        Episode(1, 1, 1, "Pilot", 8.0, "tt0000011")])])
+    for obj in [_make_show_metadata(), director_metadata, show]:
+        data = record.dumps(obj, record.CODEC_NONE)
+        # nothing in the record names a model class.
+        assert(b"vmi.model" not in data)
+    loaded = record.loads(record.dumps(director_metadata))
+    assert([m.title for m in loaded.movie_metadata_list] ==
+           ["First", "Second"])
+    loaded = record.loads(record.dumps(show))
+    assert(loaded.season_list[0].episode_list[0].title == "Pilot")
+
+
+def test_record_reads_version_2():
+    show_metadata = _make_show_metadata()
+    payload = pickle.dumps(show_metadata)
+    index = pickle.dumps({"kind": record.KIND_OBJECT, "token": "t",
+                          "meta": None, "segments": [(0, len(payload))]})
+    data = record.MAGIC + bytes([2, 0]) + \
+        len(index).to_bytes(4, "big") + index + payload
+    assert(not record.is_current(data, record.CODEC_NONE))
+    assert(record.loads(data).__dict__ == show_metadata.__dict__)
+
+
+def test_migrate_schema_upgrades(tmpdir, monkeypatch):
+    path = str(tmpdir) + "/"
+    pickler = Pickler(path)
+    pickler.put(_make_show_metadata())
+
+    # schema 2 renamed the show to upper case.
+    def upgrade(kind, plain):
+        if kind == record.KIND_SHOW_METADATA:
+            plain = dict(plain, title=plain["title"].upper())
+        return plain
+    monkeypatch.setattr(record, "SCHEMA_VERSION", 2)
+    monkeypatch.setattr(record, "_SCHEMA_UPGRADES", {1: upgrade})
+    assert(pickler.get(PickleKey("tt1234567")).title == "TEST SHOW")
+    assert(migrate(path) == 1)
+    assert(migrate(path) == 0)
+    # stored in schema 2 now, it is not upgraded twice.
+    assert(pickler.get(PickleKey("tt1234567")).title == "TEST SHOW")
+
+
+def test_record_rejects_newer_versions():
+    data = bytearray(record.dumps(_make_show_metadata()))
+    data[len(record.MAGIC)] = record.FORMAT_VERSION + 1
+    with pytest.raises(record.RecordFormatError):
+        record.loads(bytes(data))
+
+
+def test_migrate_legacy_pickles(tmpdir):
+    path = str(tmpdir) + "/"
+    show_metadata = _make_show_metadata()
+    # the pre-record format, a bare default protocol pickle.
+    with open(path + show_metadata.imdb_id, "wb") as f:
+        pickle.dump(show_metadata, f)
+
+    pickler = Pickler(path)
+    assert(pickler.get(show_metadata).__dict__ == show_metadata.__dict__)
+    assert(migrate(path) == 1)
+    with open(pickler._path(show_metadata), "rb") as f:
+        assert(record.is_current(f.read()))
+    assert(pickler.get(PickleKey("tt1234567")).title == "Test Show")
+    # already migrated.
+    assert(migrate(path) == 0)
@@ -0,0 +1,80 @@
+import dbm
+
+from vmi.db.pickler import Pickler, PickleKey
+from vmi.db.secondary import EpisodeIndex, MovieIndex
+from vmi.model.director import DirectorMetadata
+from vmi.model.movie import MovieMetadata
+
+
+def test_episode_index(tmpdir, make_show):
+    index = EpisodeIndex(str(tmpdir.join("episodes")))
+    assert(index.lookup("tt0000001") is None)
+    index.sync_show(make_show(
+        episode_ids_by_season=[["tt0000001", "tt0000002"], ["tt0000003"]]))
+    assert(index.lookup("tt0000003") == ("tt1234567", 2, 1))
+
+    # a fresh reader sees it, and episodes gone from the show are dropped.
+    index = EpisodeIndex(str(tmpdir.join("episodes")))
+    index.add_show(make_show(
+        episode_ids_by_season=[["tt0000001"], ["tt0000003", "tt0000004"]]))
+    assert(index.lookup("tt0000002") is None)
+    assert(index.lookup("tt0000004") == ("tt1234567", 2, 2))
+
+    index.remove_show("tt1234567")
+    assert(index.lookup("tt0000001") is None)
+
+
+def test_episode_index_follows_changes(tmpdir, make_show):
+    path = str(tmpdir.join("episodes"))
+    index = EpisodeIndex(path)
+    index.sync_show(make_show(
+        episode_ids_by_season=[["tt0000001", "tt0000002"]]))
+    # same episode count, but an episode was replaced.
+    index = EpisodeIndex(path)
+    index.sync_show(make_show(
+        episode_ids_by_season=[["tt0000001", "tt0000003"]]))
+    assert(index.lookup("tt0000002") is None)
+    assert(index.lookup("tt0000003") == ("tt1234567", 1, 2))
+    # or renumbered.
+    index = EpisodeIndex(path)
+    index.sync_show(make_show(
+        episode_ids_by_season=[["tt0000003", "tt0000001"]]))
+    assert(index.lookup("tt0000001") == ("tt1234567", 1, 2))
+
+    # entries already gone are skipped when the show is removed.
+    with dbm.open(path, "w") as db:
+        del db["tt0000001"]
+    index.remove_show("tt1234567")
+    assert(index.lookup("tt0000003") is None)
+    index.remove_show("tt1234567")
+
+
+def test_episode_index_of_lazy_shows(tmpdir, make_show):
+    pickler = Pickler(str(tmpdir) + "/")
+    pickler.put(make_show(
+        episode_ids_by_season=[["tt0000001", "tt0000002"], ["tt0000003"]]))
+    show = pickler.get(PickleKey("tt1234567"))
+    index = EpisodeIndex(str(tmpdir.join("episodes")))
+    index.add_show(show)
+    assert(index.lookup("tt0000003") == ("tt1234567", 2, 1))
+    index = EpisodeIndex(str(tmpdir.join("episodes")))
+    index.sync_show(show)
+    # both worked off the record's episode columns.
+    assert(not any(show.season_list.loaded))
+
+
+def test_movie_index(tmpdir):
+    index = MovieIndex(str(tmpdir.join("movies")))
+    goodfellas = MovieMetadata("tt0099685", "Goodfellas")
+    casino = MovieMetadata("tt0112641", "Casino")
+    index.sync_director(DirectorMetadata(
+        "nm0000217", "Martin Scorsese", "martin-scorsese", [goodfellas, casino]))
+    index.sync_director(DirectorMetadata(
+        "nm0000001", "Someone Else", "someone-else", [goodfellas]))
+    assert(index.lookup("tt0099685") == ["nm0000217", "nm0000001"])
+    assert(index.lookup("tt0112641") == ["nm0000217"])
+
+    index.sync_director(DirectorMetadata(
+        "nm0000217", "Martin Scorsese", "martin-scorsese", [casino]))
+    assert(index.lookup("tt0099685") == ["nm0000001"])
+    assert(index.lookup("tt0000000") == [])
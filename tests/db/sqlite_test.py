@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from vmi.db.pickler import PickleKey
+from vmi.db.sqlite import SqliteStore
+from vmi.model.director import DirectorMetadata
+from vmi.model.movie import Movie, MovieMetadata
+
+
+def test_show_round_trip(tmpdir, make_show):
+    store = SqliteStore(str(tmpdir.join("vmi.sqlite3")))
+    show = make_show([[8.1, 6.5], [9.0]])
+    assert(not store.has(show))
+    store.put(show)
+    assert(store.has(PickleKey("tt1234567")))
+    gotten = store.get(PickleKey("tt1234567"))
+    assert(gotten.title == show.title)
+    assert(gotten.rating == show.rating)
+    assert(gotten.season_count == 2)
+    assert(gotten.episode_count == 3)
+    for season, gotten_season in zip(show.season_list, gotten.season_list):
+        assert(gotten_season.number == season.number)
+        for episode, gotten_episode in zip(
+                season.episode_list, gotten_season.episode_list):
+            assert(gotten_episode.__getstate__() == episode.__getstate__())
+    assert([(title, e.imdb_id) for title, e in store.episodes_below(8.5)] ==
+           [("Test Show", "tt0000002"), ("Test Show", "tt0000001")])
+    store.remove(show)
+    assert(not store.has(show))
+    assert(store.episodes_below(10) == [])
+
+
+def test_director_and_movie_round_trip(tmpdir):
+    store = SqliteStore(str(tmpdir.join("vmi.sqlite3")))
+    director_metadata = DirectorMetadata(
+        "nm0000217", "Martin Scorsese", "martin-scorsese",
+        [MovieMetadata("tt0099685", "Goodfellas")])
+    movie = Movie(
+        "tt0099685", "Goodfellas", "goodfellas", "1990", 8.7,
+        Decimal("25000000"), None, Decimal("46836394"), None, 146,
+        ["Biography", "Crime", "Drama"])
+    store.put(director_metadata)
+    store.put(movie)
+    gotten = store.get(director_metadata)
+    assert(gotten.name == "Martin Scorsese")
+    assert([m.__dict__ for m in gotten.movie_metadata_list] ==
+           [m.__dict__ for m in director_metadata.movie_metadata_list])
+    assert(store.get(movie).__getstate__() == movie.__getstate__())
@@ -0,0 +1,52 @@
+import gc
+import weakref
+
+from vmi.insights.frame import show_frame
+from vmi.insights.show import ShowInsights
+from vmi.model.episode import Episode
+from vmi.model.season import ArraySeason, Season
+from vmi.model.show import Show, ShowMetadata
+
+
+def test_show_frame():
+    season_list = [
+        Season(1, [Episode(1, 1, 1, "First", 8.0, "tt0000001"),
+                   Episode(2, 1, 2, "Second", 8.5, "tt0000002")]),
+        Season(2, [Episode(3, 2, 1, "Third", 9.0, "tt0000003")]),
+    ]
+    show = Show(ShowMetadata("Test Show", "test-show", "8.7", "tt1234567", 2),
+                season_list)
+    frame = show_frame(show)
+    # built once per show.
+    assert(show_frame(show) is frame)
+    assert(list(frame.offsets) == [0, 2, 3])
+    assert(list(frame.score[frame.season_rows(1)]) == [9.0])
+    assert(list(frame.season) == [1, 1, 2])
+    assert(frame.labels(frame.season_rows(0)) == ["01x01", "01x02"])
+    assert(list(show_frame(season_list[0]).number) == [1, 2])
+    # only columns are kept, episodes are looked up by row.
+    assert(not hasattr(frame, "episodes"))
+    assert(frame.episode(2) is season_list[1].episode_list[0])
+    assert(frame.episode(1) is season_list[0].episode_list[1])
+
+    insights = ShowInsights(show)
+    assert(insights.all_episodes == tuple(
+        e for season in season_list for e in season.episode_list))
+    assert(insights.all_episodes is not insights.all_episodes)
+
+
+def test_show_frame_of_array_seasons():
+    season = ArraySeason.from_rows(2, [
+        (4, 2, 1, "Fourth", 7.0, "tt0000004"),
+        (5, 2, 2, "Fifth", 6.0, "tt0000005")])
+    frame = show_frame(season)
+    assert(list(frame.index) == [4, 5])
+    assert(list(frame.score) == [7.0, 6.0])
+    assert(frame.labels() == ["02x01", "02x02"])
+    assert(frame.episode(1).title == "Fifth")
+
+    # the frame doesn't keep its season alive.
+    ref = weakref.ref(season)
+    del season
+    gc.collect()
+    assert(ref() is None)
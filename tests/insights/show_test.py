@@ -0,0 +1,34 @@
+import math
+
+from vmi.insights.show import RunningShowInsights
+from vmi.insights.summary import summarize
+from vmi.model.episode import Episode
+from vmi.model.season import Season
+from vmi.model.show import Show, ShowMetadata
+
+
+def test_running_show_insights():
+    season_list = [
+        Season(1, []),
+        Season(2, [Episode(1, 2, 1, "First", 8.0, "tt0000001")]),
+        Season(3, [Episode(2, 3, 1, "Second", 9.1, "tt0000002"),
+                   Episode(3, 3, 2, "Third", 7.4, "tt0000003")]),
+    ]
+    insights = RunningShowInsights()
+    insights.add_season(season_list[0])
+    # nothing to average yet, and no trend from a single episode.
+    assert(math.isnan(insights.avg_episode_rating))
+    insights.add_season(season_list[1])
+    assert(insights.avg_episode_rating == 8.0)
+    assert(math.isnan(insights.slope))
+    insights.add_season(season_list[2])
+
+    summary = summarize(Show(
+        ShowMetadata("Test Show", "test-show", "8.7", "tt1234567", 3),
+        season_list))
+    assert((insights.season_count, insights.episode_count) == (3, 3))
+    assert(insights.best_episode is summary.best_episode)
+    assert(insights.worst_episode is summary.worst_episode)
+    assert(math.isclose(insights.avg_episode_rating,
+                        summary.avg_episode_rating))
+    assert(math.isclose(insights.slope, summary.slope))
@@ -0,0 +1,101 @@
+import gc
+import math
+import pytest
+import statistics
+
+from scipy.stats import linregress
+
+from vmi.db.pickler import Pickler, PickleKey
+from vmi.insights.frame import StaleFrameError, show_frame
+from vmi.insights.season import SeasonInsights
+from vmi.insights.show import ShowInsights
+from vmi.insights.summary import summarize
+from vmi.model.episode import Episode
+from vmi.model.season import Season
+from vmi.model.show import Show, ShowMetadata
+
+
+def test_summarize():
+    season_list = [
+        Season(1, [Episode(1, 1, 1, "First", 8.0, "tt0000001"),
+                   Episode(2, 1, 2, "Second", 9.1, "tt0000002"),
+                   Episode(3, 1, 3, "Third", 7.4, "tt0000003"),
+                   Episode(4, 1, 4, "Fourth", 9.1, "tt0000004")]),
+        Season(2, [Episode(5, 2, 1, "Fifth", 7.4, "tt0000005")]),
+    ]
+    show = Show(ShowMetadata("Test Show", "test-show", "8.7", "tt1234567", 2),
+                season_list)
+    summary = summarize(show)
+    # computed once per show, seasons included.
+    assert(summarize(show) is summary)
+    season_summary = summarize(season_list[0])
+
+    for s, episode_list in [(summary, [e for season in season_list
+                                       for e in season.episode_list]),
+                            (season_summary, season_list[0].episode_list)]:
+        scores = [e.score for e in episode_list]
+        assert(s.episode_count == len(scores))
+        assert(s.worst_episode is min(episode_list, key=lambda e: e.score))
+        assert(s.best_episode is max(episode_list, key=lambda e: e.score))
+        assert(math.isclose(s.avg_episode_rating, statistics.mean(scores)))
+        assert(math.isclose(s.stdev, statistics.stdev(scores)))
+        assert(math.isclose(
+            s.slope, linregress(range(len(scores)), scores).slope))
+
+    single = summarize(season_list[1])
+    assert(single.best_episode.title == "Fifth")
+    assert(math.isnan(single.stdev) and math.isnan(single.slope))
+
+
+def test_summarize_lazy_shows(tmpdir, make_show):
+    pickler = Pickler(str(tmpdir) + "/")
+    pickler.put(make_show([[8.0, 9.0], [7.0], [6.0]]))
+    show = pickler.get(PickleKey("tt1234567"))
+
+    # making insights loads nothing, only asking for a stat does.
+    ShowInsights(show)
+    assert(not any(show.season_list.loaded))
+
+    # a season's insights only load that season.
+    assert(SeasonInsights(show.season_list[1]).avg_episode_rating == 7.0)
+    assert(show.season_list.loaded == [False, True, False])
+
+    # the show follows a rewrite of its record while summarizing loads the
+    # other seasons, and so does its summary.
+    pickler.put(make_show([[5.0], [6.0]]))
+    summary = summarize(show)
+    assert(summary.avg_episode_rating == 5.5)
+    assert(summary.best_episode.score == 6.0)
+    assert(summarize(show) is summary)
+    assert(summarize(show.season_list[1]).avg_episode_rating == 6.0)
+    # memos are per record token, not per object.
+    show.token = "rewritten"
+    assert(summarize(show) is not summary)
+
+
+def test_summarize_after_a_reset(tmpdir, make_show):
+    pickler = Pickler(str(tmpdir) + "/")
+    pickler.put(make_show([[8.0, 9.0], [7.0]]))
+    show = pickler.get(PickleKey("tt1234567"))
+    frame = show_frame(show)
+
+    # the reset show dropped the seasons the frame pointed at.
+    show.season_list.reset(show.season_count)
+    gc.collect()
+    assert(all(season_ref() is None for season_ref in frame.seasons))
+    # the record is the same, so they are read back.
+    assert(frame.episode(2).score == 7.0)
+    summary = summarize(show)
+    assert(summary.best_episode.score == 9.0)
+    assert(summarize(show.season_list[1]).avg_episode_rating == 7.0)
+
+    # after a rewrite the old frame's rows mean nothing, summarize starts over.
+    pickler.put(make_show([[5.0], [6.0], [4.0]]))
+    show.season_list.reset(show.season_count)
+    show.season_list[0]
+    gc.collect()
+    with pytest.raises(StaleFrameError):
+        frame.episode(2)
+    summary = summarize(show)
+    assert(summary.worst_episode.score == 4.0)
+    assert(summary.episode_count == 3)
@@ -0,0 +1,86 @@
+import pickle
+import pytest
+
+from decimal import Decimal
+
+from vmi.db.db import make_store
+from vmi.db.pickler import PickleKey
+from vmi.model.episode import Episode
+from vmi.model.memory import measure
+from vmi.model.movie import Movie
+from vmi.model.season import ArraySeason, Season
+
+
+# Episode as it was before it had slots, label included.
+class _DictEpisode:
+    def __init__(self):
+        self.index = 2
+        self.season = 1
+        self.number = 2
+        self.title = "Second"
+        self.score = 8.5
+        self.imdb_id = "tt0000002"
+        self.label = "01x02"
+
+
+def test_legacy_episode_pickles_still_load():
+    # pickled with the default protocol of the time, then pointed at Episode.
+    data = pickle.dumps(_DictEpisode(), protocol=3).replace(
+        ("c%s\n_DictEpisode\n" % _DictEpisode.__module__).encode(),
+        b"cvmi.model.episode\nEpisode\n")
+    episode = pickle.loads(data)
+    assert(type(episode) is Episode)
+    assert(episode.label == "01x02")
+    assert(episode.__getstate__() == Episode(
+        2, 1, 2, "Second", 8.5, "tt0000002").__getstate__())
+
+
+def _episode_fields(episode):
+    return (episode.index, episode.season, episode.number, episode.title,
+            episode.score, episode.imdb_id)
+
+
+def test_array_season():
+    season = Season(3, [Episode(10, 3, 1, "First", 8.1, "tt0000010"),
+                        Episode(11, 3, 2, "Second", 9.3, "tt0000011")])
+    array_season = ArraySeason.from_season(season)
+    assert(array_season.episode_list is array_season.episode_list)
+    array_season = pickle.loads(pickle.dumps(array_season))
+    assert(array_season.number == 3 and array_season.episode_count == 2)
+    for episode, view in zip(season.episode_list, array_season.episode_list):
+        assert(str(view) == str(episode))
+        assert(_episode_fields(view) == _episode_fields(episode))
+
+    rows = [_episode_fields(episode) for episode in season.episode_list]
+    from_rows = ArraySeason.from_rows(3, rows)
+    assert([_episode_fields(view) for view in from_rows.episode_list] == rows)
+    assert(ArraySeason.from_rows(4, []).episode_list == [])
+
+
+@pytest.mark.parametrize("storage", ["pickle", "sqlite"])
+def test_slotted_models_round_trip(storage, tmp_path, monkeypatch, make_show):
+    monkeypatch.chdir(tmp_path)
+    store = make_store(storage)
+    show = make_show([[8.1, 6.5], [9.0]])
+    movie = Movie("tt7654321", "Test Movie", "test-movie", "1999", 7.5,
+                  Decimal("1000"), None, Decimal("2000"), None, 120,
+                  ["Drama", "Crime"])
+    store.put(show)
+    store.put(movie)
+
+    gotten = store.get(PickleKey("tt1234567"))
+    assert((gotten.title, gotten.imdb_id, gotten.season_count,
+            gotten.episode_count) == ("Test Show", "tt1234567", 2, 3))
+    assert([[_episode_fields(e) for e in season.episode_list]
+            for season in gotten.season_list] ==
+           [[_episode_fields(e) for e in season.episode_list]
+            for season in show.season_list])
+    gotten = store.get(PickleKey("tt7654321", "movies"))
+    assert(type(gotten) is Movie)
+    assert(gotten.__getstate__() == movie.__getstate__())
+
+
+def test_array_seasons_take_less_memory():
+    sizes = dict(measure(200))
+    assert(sizes["array"] < sizes["slots"] < sizes["dict"])
+    assert(sizes["views"] < sizes["slots"])
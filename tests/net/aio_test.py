@@ -0,0 +1,150 @@
+import asyncio
+import json
+import pytest
+
+from aiohttp import web
+from pathlib import Path
+
+from vmi.net import aio
+from vmi.net.aio import AsyncHttpSession, AsyncNet
+from vmi.net.cache import CachePolicy, ResponseCache
+from vmi.net.ratelimit import HostLimiter
+from vmi.net.session import ThrottledError
+
+# Reuses the IMDB page fixtures.
+_FIXTURES = Path(__file__).parent / "imdb_test"
+
+_OMDB_SHOW = {
+    "Response": "True",
+    "Title": "The Wire",
+    "totalSeasons": "1",
+    "imdbID": "tt0306414",
+    "imdbRating": "9.3",
+}
+
+
+# Serves canned OMDB and IMDB responses on a local port.
+async def _start_stub_server():
+    async def omdb(request):
+        return web.Response(text=json.dumps(_OMDB_SHOW))
+
+    async def season(request):
+        return web.Response(
+            text=(_FIXTURES / "the-wire-season-one.htm").read_text())
+
+    async def director(request):
+        return web.Response(
+            text=(_FIXTURES / "martin-scorsese.htm").read_text())
+
+    app = web.Application()
+    app.router.add_get("/omdb/", omdb)
+    app.router.add_get("/imdb/title/{imdb_id}/episodes", season)
+    app.router.add_get("/imdb/name/{imdb_id}", director)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, "http://127.0.0.1:%d" % port
+
+
+async def _run_against_stub():
+    runner, root = await _start_stub_server()
+    session = AsyncHttpSession(url_map={
+        "http://www.omdbapi.com": root + "/omdb",
+        "https://www.imdb.com": root + "/imdb",
+    })
+    try:
+        async with AsyncNet(session) as net:
+            show_metadata = await net.get_show_metadata("The Wire")
+            show, director = await asyncio.gather(
+                net.get_show(show_metadata),
+                net.get_director_metadata("nm0000217"))
+    finally:
+        await runner.cleanup()
+    return show, director
+
+
+def test_async_net(monkeypatch):
+    monkeypatch.setenv("OMDB_API_KEY", "test")
+    show, director = asyncio.run(_run_against_stub())
+    assert(show.imdb_id == "tt0306414")
+    assert(show.season_count == 1)
+    episodes = show.season_list[0].episode_list
+    assert([e.index for e in episodes] == list(range(1, len(episodes) + 1)))
+    assert(director.name == "Martin Scorsese")
+    assert(len(director.movie_metadata_list) > 0)
+
+
+async def _fetch_twice_through_cache(cache_dir):
+    hits = []
+
+    async def omdb(request):
+        hits.append(request.path)
+        return web.Response(text=json.dumps(_OMDB_SHOW))
+
+    app = web.Application()
+    app.router.add_get("/omdb/", omdb)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    root = "http://127.0.0.1:%d" % runner.addresses[0][1]
+    session = AsyncHttpSession(
+        url_map={"http://www.omdbapi.com": root + "/omdb"},
+        cache=CachePolicy(ResponseCache(cache_dir)))
+    try:
+        async with AsyncNet(session) as net:
+            for _ in range(2):
+                show_metadata = await net.get_show_metadata("The Wire")
+    finally:
+        await runner.cleanup()
+    # the budget is kept under the real host, not the stub.
+    limiter = session.limiter.for_host("www.omdbapi.com")
+    return hits, show_metadata, limiter
+
+
+def test_async_session_uses_cache_and_limiter(monkeypatch, tmp_path):
+    monkeypatch.setenv("OMDB_API_KEY", "test")
+    hits, show_metadata, limiter = asyncio.run(
+        _fetch_twice_through_cache(str(tmp_path)))
+    assert(show_metadata.imdb_id == "tt0306414")
+    assert(len(hits) == 1)
+    assert(limiter.in_flight == 0 and limiter.tokens < limiter.burst)
+
+
+async def _get_unreachable(session):
+    try:
+        await session.get_text("http://127.0.0.1:9/")
+    finally:
+        await session.close()
+
+
+def test_async_session_retries_connection_errors(monkeypatch):
+    released = []
+    monkeypatch.setattr(aio, "retry_delay", lambda attempt, headers: 0)
+    session = AsyncHttpSession(max_retries=2)
+    limiter = session.limiter.for_host("127.0.0.1:9")
+    monkeypatch.setattr(limiter, "release", lambda throttled=False: (
+        released.append(throttled), HostLimiter.release(limiter, throttled)))
+    with pytest.raises(ThrottledError):
+        asyncio.run(_get_unreachable(session))
+    # three attempts, every one of them counted as throttled.
+    assert(released == [True, True, True])
+
+
+def test_cancelled_waiter_leaves_no_callback():
+    limiter = HostLimiter(rate=1000, burst=1000, concurrency=1)
+    # a sync request holds the only slot.
+    limiter.acquire()
+    session = AsyncHttpSession()
+
+    async def wait_for_slot():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(session._acquire(limiter), 0.05)
+
+    asyncio.run(wait_for_slot())
+    assert(limiter.release_callbacks == [])
+    # the loop is closed, releasing must not touch it.
+    limiter.release()
+    assert(limiter.in_flight == 0)
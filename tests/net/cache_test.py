@@ -0,0 +1,73 @@
+import pytest
+
+from vmi.net import cache
+from vmi.net.cache import (
+    CacheMissError, CachingSession, MODE_REPLAY, ResponseCache)
+
+
+class _Response:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers if headers else {}
+
+
+# Replies with the queued responses and remembers every request.
+class _StubSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append((url, headers))
+        return self.responses.pop(0)
+
+
+_URL = "http://www.omdbapi.com/?t=the+wire&apikey=%s"
+
+
+def test_apikey_is_not_part_of_the_key(tmp_path):
+    response_cache = ResponseCache(str(tmp_path))
+    response_cache.put(_URL % "one", "body", {})
+    meta, body = response_cache.get(_URL % "two")
+    assert(body == "body")
+    assert("apikey" not in meta["url"])
+    assert(list(response_cache.urls()) == [meta["url"]])
+
+
+def test_ttl_expiry_and_304_revalidation(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    session = _StubSession(
+        _Response(200, "fresh", {"ETag": "v1"}),
+        _Response(304))
+    caching = CachingSession(session, ResponseCache(str(tmp_path)), ttl=10)
+
+    assert(caching.get(_URL % "k").text == "fresh")
+    now[0] += 5
+    assert(caching.get(_URL % "k").text == "fresh")
+    assert(len(session.requests) == 1)
+
+    # stale: revalidated with the stored etag, the body is kept on 304.
+    now[0] += 10
+    assert(caching.get(_URL % "k").text == "fresh")
+    assert(session.requests[1][1] == {"If-None-Match": "v1"})
+    # and the 304 made it fresh again.
+    assert(caching.get(_URL % "k").text == "fresh")
+    assert(len(session.requests) == 2)
+
+
+def test_omdb_errors_are_not_cached(tmp_path):
+    error = '{"Response":"False","Error":"Series not found."}'
+    session = _StubSession(_Response(200, error), _Response(200, error))
+    caching = CachingSession(session, ResponseCache(str(tmp_path)))
+    caching.get(_URL % "k")
+    caching.get(_URL % "k")
+    assert(len(session.requests) == 2)
+
+
+def test_replay_miss(tmp_path):
+    caching = CachingSession(
+        _StubSession(), ResponseCache(str(tmp_path)), MODE_REPLAY)
+    with pytest.raises(CacheMissError):
+        caching.get(_URL % "k")
@@ -1,6 +1,11 @@
+import pytest
+import time
+
 from bs4 import BeautifulSoup as Soup
 
-from vmi.net.imdb import ImdbScraper
+from vmi.net.imdb import (ImdbEpisodeData, ImdbScraper, ImdbSeasonData,
+                           reviews_page_url, reviews_url)
+from vmi.model.show import ShowMetadata
 
 
 # sanity test for The Wire Season 1
@@ -26,7 +31,7 @@ def test_martin_scorsese(datadir):
 def test_martin_scorsese_search(datadir):
     scraper = ImdbScraper()
     soup = Soup(open(datadir / 'martin-scorsese-search.htm'), 'html.parser')
-    imdb_id = scraper.scrape_name_soup(soup)
+    imdb_id = scraper.scrape_name_soup("Martin Scorsese", soup)
     assert(imdb_id == "nm0000217")
 
 # regression test for missing box office and runtime info
@@ -38,3 +43,136 @@ def test_satoshi_kon(datadir):
     director_data = scraper.scrape_director_soup(soup)
     assert(director_data.name == "Satoshi Kon")
     assert(len(director_data.movie_metadata_list) > 0)
+
+# concurrent season scraping must number episodes exactly like the serial path
+
+
+def test_scrape_show_concurrent_indexes(datadir, monkeypatch):
+    html = open(datadir / 'the-wire-season-one.htm').read()
+    scraper = ImdbScraper()
+    monkeypatch.setattr(
+        scraper, '_scrape_season', lambda show_metadata, n:
+        scraper.scrape_season_soup(Soup(html, 'html.parser'), n))
+    show_metadata = ShowMetadata("The Wire", "the-wire", 9.3, "tt0306414", 5)
+
+    def indexes(show_data):
+        return [(e.season, e.number, e.index)
+                for s in show_data.season_list for e in s.episode_list]
+
+    serial = scraper.scrape_show(show_metadata, max_workers=1)
+    concurrent = scraper.scrape_show(show_metadata, max_workers=4)
+    assert(indexes(serial) == indexes(concurrent))
+    episode_count = len(serial.season_list[0].episode_list) * 5
+    assert([i for _, _, i in indexes(serial)] ==
+           list(range(1, episode_count + 1)))
+
+# every parser backend must scrape exactly what html.parser does
+
+
+def _as_dict(data):
+    if isinstance(data, list):
+        return [_as_dict(d) for d in data]
+    if hasattr(data, '__dict__'):
+        return {k: _as_dict(v) for k, v in vars(data).items()}
+    return data
+
+
+@pytest.mark.parametrize("parser,strain", [
+    ("lxml", False),
+    ("html.parser", True),
+    ("lxml", True),
+])
+def test_parser_backends(datadir, parser, strain):
+    baseline = ImdbScraper()
+    scraper = ImdbScraper(parser=parser, strain=strain)
+
+    html = open(datadir / 'the-wire-season-one.htm').read()
+    assert(_as_dict(scraper.scrape_season_html(html, 1)) ==
+           _as_dict(baseline.scrape_season_html(html, 1)))
+
+    for fname in ['martin-scorsese.htm', 'satoshi-kon.htm']:
+        html = open(datadir / fname).read()
+        assert(_as_dict(scraper.scrape_director_html(html)) ==
+               _as_dict(baseline.scrape_director_html(html)))
+
+    html = open(datadir / 'martin-scorsese-search.htm').read()
+    assert(scraper.find_name_in_soup(scraper._soup(html, "search")) ==
+           "nm0000217")
+
+# the single pass movie extractor must match the legacy one field for field
+
+
+@pytest.mark.parametrize("fname", ['goodfellas.htm', 'tokyo-godfathers.htm'])
+def test_movie_extractors(datadir, fname):
+    html = open(datadir / fname).read()
+    legacy = ImdbScraper(movie_extractor="legacy").scrape_movie_html(html)
+    single_pass = ImdbScraper(
+        movie_extractor="single_pass").scrape_movie_html(html)
+    assert(_as_dict(single_pass) == _as_dict(legacy))
+
+
+def test_goodfellas(datadir):
+    scraper = ImdbScraper()
+    movie_data = scraper.scrape_movie_html(
+        open(datadir / 'goodfellas.htm').read())
+    assert(movie_data.budget == 25000000)
+    assert(movie_data.opening_weekend == 6368901)
+    assert(movie_data.us_boxoffice == 46836394)
+    assert(movie_data.worldwide_boxoffice == 46879058)
+    assert(movie_data.runtime == 146)
+    assert(movie_data.rating_count == 1010271)
+    assert(movie_data.genre_list == ["Biography", "Crime", "Drama"])
+
+# reviews are followed across "Load More" pages up to the limit
+
+
+def _reviews_page(first, count, key):
+    reviews = "".join(
+        '<div class="lister-item imdb-user-review collapsable">'
+        '<a class="title">Review %d</a>'
+        '<div class="content"><div class="text">Body %d</div></div>'
+        '</div>' % (i, i) for i in range(first, first + count))
+    load_more = ('<div class="load-more-data" data-key="%s" '
+                 'data-ajaxurl="/reviews/_ajax"></div>' % key) if key else ''
+    return '<html><body>%s%s</body></html>' % (reviews, load_more)
+
+
+def test_iter_reviews(monkeypatch):
+    pages = {
+        reviews_url("tt1"): _reviews_page(0, 25, "page2"),
+        reviews_page_url("tt1", "page2"): _reviews_page(25, 25, "page3"),
+        reviews_page_url("tt1", "page3"): _reviews_page(50, 10, None),
+    }
+    scraper = ImdbScraper()
+    monkeypatch.setattr(scraper, '_get_text', lambda url: pages[url])
+    titles = [r.title for r in scraper.iter_reviews("tt1")]
+    assert(titles == ["Review %d" % i for i in range(60)])
+    titles = [r.title for r in scraper.iter_reviews("tt1", limit=30)]
+    assert(titles == ["Review %d" % i for i in range(30)])
+
+# seasons come out in season order with contiguous indexes, however the
+# pages are fetched
+
+
+def _stub_season(show_metadata, season_number):
+    # later seasons come back first when fetched concurrently.
+    time.sleep(0.01 * (5 - season_number))
+    season_data = ImdbSeasonData()
+    for number in range(1, season_number + 1):
+        episode_data = ImdbEpisodeData()
+        episode_data.season = season_number
+        episode_data.number = number
+        season_data.episode_list.append(episode_data)
+    return season_data
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_iter_seasons(monkeypatch, max_workers):
+    scraper = ImdbScraper()
+    monkeypatch.setattr(scraper, '_scrape_season', _stub_season)
+    show_metadata = ShowMetadata("Show", "show", "8", "tt1", 4)
+    seasons = list(scraper.iter_seasons(
+        show_metadata, [2, 3, 4], first_index=2, max_workers=max_workers))
+    episodes = [e for season in seasons for e in season.episode_list]
+    assert([e.season for e in episodes] == [2, 2, 3, 3, 3, 4, 4, 4, 4])
+    assert([e.index for e in episodes] == list(range(2, 11)))
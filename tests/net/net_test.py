@@ -0,0 +1,70 @@
+import pytest
+import time
+
+from pathlib import Path
+from vmi.model.movie import MovieMetadata
+from vmi.net.net import Net
+from vmi.net.omdb import OmdbMovieData
+
+# Reuses the IMDB page fixtures.
+_FIXTURES = Path(__file__).parent / "imdb_test"
+
+
+# OMDB client stand-in. Fails the titles in fail and answers the first
+# titles slowest, so results come back out of order.
+class _StubOmdb:
+    def __init__(self, fail):
+        self.fail = fail
+
+    def get_movie_data(self, movie_metadata):
+        time.sleep(0.01 * (5 - int(movie_metadata.imdb_id[2:])))
+        if movie_metadata.title in self.fail:
+            raise SystemExit(1)
+        movie_data = OmdbMovieData()
+        movie_data.imdb_id = movie_metadata.imdb_id
+        movie_data.title = movie_metadata.title
+        return movie_data
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+# Serves the Goodfellas page for every movie but the ones in fail.
+class _StubSession:
+    def __init__(self, fail):
+        self.html = (_FIXTURES / "goodfellas.htm").read_text()
+        self.fail = fail
+
+    def get(self, url):
+        if any(imdb_id in url for imdb_id in self.fail):
+            raise ConnectionError(url)
+        return _Response(self.html)
+
+
+def test_get_movies_keeps_order_and_skips_failures(monkeypatch):
+    monkeypatch.setenv("OMDB_API_KEY", "test")
+    net = Net(session=object(), parse_workers=2)
+    net.omdb = _StubOmdb(fail=["Two"])
+    net.pipeline.session = _StubSession(fail=["tt3"])
+    movie_metadata_list = [
+        MovieMetadata("tt%d" % i, title)
+        for i, title in enumerate(["One", "Two", "Three", "Four"])]
+    movies = list(net.get_movies(movie_metadata_list))
+    net.pipeline.close()
+    assert(movies[1] is None and movies[3] is None)
+    assert([movies[0].title, movies[2].title] == ["One", "Three"])
+    # the IMDB side was parsed in the parser processes.
+    assert(movies[0].runtime == 146)
+
+
+def test_parser_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv("OMDB_API_KEY", "test")
+    monkeypatch.setenv("VMI_PARSER", "lxml")
+    assert(Net(session=object()).imdb.parser == "lxml")
+    assert(Net(session=object(), parser="html.parser").imdb.parser ==
+           "html.parser")
+    monkeypatch.setenv("VMI_PARSER", "no-such-parser")
+    with pytest.raises(SystemExit):
+        Net(session=object())
@@ -0,0 +1,99 @@
+import pytest
+
+from pathlib import Path
+
+from vmi.net.pipeline import (DIRECTOR, MOVIE, REVIEWS, SEASON, ParseJob,
+                              ParsePipeline)
+from vmi.net.session import ThrottledError
+
+# Reuses the IMDB page fixtures.
+_FIXTURES = Path(__file__).parent / "imdb_test"
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+# Serves the same season page for every url, or the fixture in pages, except
+# for the urls in throttled, failing and the one that kills its fetcher.
+class _StubSession:
+    def __init__(self, throttled=(), failing=(), fatal=None, pages=None):
+        self.html = (_FIXTURES / "the-wire-season-one.htm").read_text()
+        self.throttled = throttled
+        self.failing = failing
+        self.fatal = fatal
+        self.pages = pages if pages else {}
+
+    def get(self, url):
+        if url == self.fatal:
+            raise SystemExit(1)
+        if url in self.throttled:
+            raise ThrottledError("www.imdb.com")
+        if url in self.failing:
+            raise ConnectionError(url)
+        if url in self.pages:
+            return _Response((_FIXTURES / self.pages[url]).read_text())
+        return _Response(self.html)
+
+
+def _jobs(count):
+    return [ParseJob(SEASON, "season/%d" % i, i, key=i)
+            for i in range(1, count + 1)]
+
+
+def test_pipeline():
+    pipeline = ParsePipeline(
+        _StubSession(throttled=["season/3"]),
+        fetch_workers=2, parse_workers=2, queue_size=2)
+    results = dict((job.key, record) for job, record in pipeline.run(_jobs(5)))
+    assert(sorted(results) == [1, 2, 3, 4, 5])
+    assert(results[3] is None)
+    for key in [1, 2, 4, 5]:
+        episodes = results[key].episode_list
+        assert(len(episodes) > 0)
+        assert(all(episode.season == key for episode in episodes))
+
+
+def test_pipeline_fetcher_dies():
+    pipeline = ParsePipeline(
+        _StubSession(fatal="season/2"), fetch_workers=1, parse_workers=1)
+    with pytest.raises(SystemExit):
+        list(pipeline.run(_jobs(4)))
+
+
+def test_pipeline_parses_every_kind():
+    pipeline = ParsePipeline(
+        _StubSession(pages={"director": "martin-scorsese.htm",
+                            "movie": "goodfellas.htm"}),
+        fetch_workers=2, parse_workers=2)
+    jobs = [ParseJob(DIRECTOR, "director", key=DIRECTOR),
+            ParseJob(MOVIE, "movie", key=MOVIE)]
+    # the records come back from the parser processes whole.
+    results = dict((job.key, record) for job, record in pipeline.run(jobs))
+    assert(results[DIRECTOR].name == "Martin Scorsese")
+    assert(len(results[DIRECTOR].movie_metadata_list) > 0)
+    assert(results[MOVIE].runtime == 146)
+    assert(results[MOVIE].genre_list == ["Biography", "Crime", "Drama"])
+
+    html = ('<html><body><div class="lister-item imdb-user-review">'
+            '<a class="title">Title</a><div class="content">'
+            '<div class="text">Body</div></div></div></body></html>')
+    reviews_data = pipeline.parse(REVIEWS, html)
+    assert([(review.title, review.body) for review in
+            reviews_data.review_list] == [("Title", "Body")])
+    pipeline.close()
+
+
+def test_pipeline_skips_errors():
+    pipeline = ParsePipeline(
+        _StubSession(failing=["season/2"]), fetch_workers=2, parse_workers=1)
+    with pytest.raises(ConnectionError):
+        list(pipeline.run(_jobs(3)))
+    # a page the parsers don't know fails in the parser process.
+    jobs = _jobs(3) + [ParseJob("trailer", "season/4", key=4)]
+    results = dict((job.key, record)
+                   for job, record in pipeline.run(jobs, skip_errors=True))
+    assert(results[2] is None and results[4] is None)
+    assert(results[1] is not None and results[3] is not None)
+    pipeline.close()
@@ -0,0 +1,103 @@
+import pytest
+
+from vmi.net import session as session_module
+from vmi.net.ratelimit import HostLimiter
+from vmi.net.session import HttpSession, ThrottledError, retry_after
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    clock = _Clock()
+    limiter = HostLimiter(rate=2, burst=2, concurrency=4, clock=clock)
+    limiter.acquire()
+    limiter.acquire()
+    assert(limiter.tokens == 0 and limiter.in_flight == 2)
+    # half a second at 2 per second buys exactly one more request.
+    clock.now += 0.5
+    limiter.acquire()
+    assert(limiter.tokens == 0 and limiter.in_flight == 3)
+    # and the bucket never holds more than burst.
+    clock.now += 60
+    limiter._refill()
+    assert(limiter.tokens == 2)
+
+
+def test_aimd():
+    limiter = HostLimiter(rate=4, burst=4, concurrency=8, clock=_Clock())
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert((limiter.rate, limiter.concurrency) == (2, 4))
+    assert(limiter.tokens <= 0)
+    for _ in range(5):
+        limiter.in_flight += 1
+        limiter.release()
+    assert(limiter.rate == pytest.approx(2.5))
+    assert(limiter.concurrency == pytest.approx(4.5))
+    # never grows past the configured budget.
+    for _ in range(100):
+        limiter.in_flight += 1
+        limiter.release()
+    assert((limiter.rate, limiter.concurrency) == (4, 8))
+
+
+def test_retry_after():
+    assert(retry_after({"Retry-After": "7"}) == 7)
+    assert(retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:10 GMT"},
+                       now=1445412480) == 10)
+    assert(retry_after({}) is None)
+    assert(retry_after({"Retry-After": "soon"}) is None)
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.text = ""
+        self.headers = headers if headers else {}
+
+
+class _StubRequests:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get(self, url, headers=None, timeout=None):
+        return self.responses.pop(0)
+
+
+def test_retries_honor_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(session_module.time, "sleep", sleeps.append)
+    http = HttpSession(rate=1000, burst=1000, max_retries=2)
+    http.session = _StubRequests([
+        _Response(429, {"Retry-After": "30"}), _Response(200)])
+    assert(http.get("http://example.com/").status_code == 200)
+    assert(sleeps == [30])
+
+
+def test_no_sleep_after_last_attempt(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(session_module.time, "sleep", sleeps.append)
+    http = HttpSession(rate=1000, burst=1000, max_retries=2)
+    http.session = _StubRequests([_Response(429)] * 3)
+    with pytest.raises(ThrottledError):
+        http.get("http://example.com/")
+    assert(len(sleeps) == 2)
+
+
+def test_failing_release_callback():
+    limiter = HostLimiter(rate=1000, burst=1000, concurrency=1)
+    limiter.acquire()
+    calls = []
+
+    def fail():
+        raise RuntimeError("Event loop is closed")
+    assert(limiter.try_acquire(fail) is None)
+    assert(limiter.try_acquire(lambda: calls.append(1)) is None)
+    limiter.release()
+    assert(calls == [1] and limiter.in_flight == 0)
@@ -0,0 +1,380 @@
+import json
+import numpy as np
+import os
+import shutil
+import sys
+import time
+import uuid
+import weakref
+
+from pathlib import Path
+
+from vmi.db.lazy import LazyShow
+from vmi.db.lock import KeyLocks
+from vmi.db.pickler import SHOWS, Pickler
+
+_COLUMNS_DATA_DIR = "data/columns/"
+# Holds the manifest readers should map: the generation and its segments.
+_CURRENT = "CURRENT"
+_LOCK_DIR = ".locks"
+_LOCK_KEY = "columns"
+
+# Per-episode columns and their types, see EpisodeColumns.
+_EPISODE_COLUMNS = {
+    "season": np.int16,
+    "number": np.int16,
+    "index": np.int32,
+    "score": np.float32,
+}
+_SHOW_ID_DTYPE = "U16"
+
+
+# Columns for some of the shows, usually one immutable segment directory.
+# Rows offsets[i]:offsets[i+1] belong to show_ids[i].
+class _Segment:
+    def __init__(self, name, show_ids, offsets, columns):
+        self.name = name
+        self.show_ids = show_ids
+        self.offsets = offsets
+        self.columns = columns
+        self.rows = {imdb_id: i for i, imdb_id in enumerate(show_ids)}
+
+    def show_rows(self, imdb_id):
+        i = self.rows[imdb_id]
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    # Indexes of the shows not in dead, and their number of rows.
+    def live(self, dead):
+        keep = [i for i, imdb_id in enumerate(self.show_ids)
+                if imdb_id not in dead]
+        counts = np.diff(self.offsets)[keep]
+        return keep, int(counts.sum())
+
+
+def _read_segment(dbpath, name):
+    path = os.path.join(dbpath, name)
+    return _Segment(
+        name,
+        np.load(os.path.join(path, "show_ids.npy")),
+        np.load(os.path.join(path, "offsets.npy"), mmap_mode="r"),
+        {column: np.load(os.path.join(path, column + ".npy"), mmap_mode="r")
+         for column in _EPISODE_COLUMNS})
+
+
+# The live rows of (_Segment, dead) pairs, in order, as a single unnamed
+# _Segment in memory.
+def _gather(segments):
+    show_ids = [np.empty(0, dtype=_SHOW_ID_DTYPE)]
+    offsets = [np.zeros(1, dtype=np.int64)]
+    columns = {name: [np.empty(0, dtype=dtype)]
+               for name, dtype in _EPISODE_COLUMNS.items()}
+    for segment, dead in segments:
+        keep, _ = segment.live(dead)
+        starts = segment.offsets[:-1][keep]
+        ends = segment.offsets[1:][keep]
+        rows = np.concatenate(
+            [np.arange(s, e) for s, e in zip(starts, ends)] +
+            [np.empty(0, dtype=np.int64)])
+        show_ids.append(segment.show_ids[keep])
+        offsets.append(offsets[-1][-1] + np.cumsum(ends - starts))
+        for name in _EPISODE_COLUMNS:
+            columns[name].append(np.asarray(segment.columns[name])[rows])
+    return _Segment(
+        None, np.concatenate(show_ids), np.concatenate(offsets),
+        {name: np.concatenate(parts) for name, parts in columns.items()})
+
+
+# Every episode of every show in the DB as a handful of typed NumPy columns,
+# ordered show by show. Rows offsets[i]:offsets[i+1] belong to show_ids[i].
+# Columns are memory-mapped, so catalog-wide analytics don't unpickle a
+# single Show.
+#
+# On disk the columns are a list of immutable segments, each holding some of
+# the shows. A segment lists its dead shows, ones that were removed or
+# replaced by a later segment. Syncing a show only writes a segment for that
+# show, and the newest segments are merged whenever one is no bigger than the
+# one after it, so there are O(log n) segments and a row is rewritten
+# O(log n) times.
+#
+# Each update atomically replaces CURRENT with a new manifest of segments.
+# Readers never see a half-written set of columns, and keep the segments they
+# mapped until they reload. Segments that drop out of the manifest are
+# removed, a reader that has only read the manifest by then reads it again.
+class EpisodeColumns:
+    def __init__(self, dbpath=_COLUMNS_DATA_DIR):
+        # ensure this directory exists.
+        Path(dbpath).mkdir(parents=True, exist_ok=True)
+        self.dbpath = dbpath
+        self.locks = KeyLocks(os.path.join(dbpath, _LOCK_DIR))
+        self.generation = None
+        # (_Segment, frozenset of dead imdb ids) pairs, oldest first.
+        self.segments = []
+        # the segments concatenated, see _view.
+        self.view = None
+        # imdb id -> Show last synced by this process, so syncing the same
+        # (cached) Show again doesn't touch the disk.
+        self.synced = weakref.WeakValueDictionary()
+        self.load()
+
+    # The manifest in CURRENT, None if nothing was written yet. Older
+    # trees hold the name of a single generation directory instead.
+    def _read_current(self):
+        try:
+            with open(os.path.join(self.dbpath, _CURRENT)) as f:
+                current = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if not current.startswith("{"):
+            return {"generation": current, "segments": [[current, []]]}
+        return json.loads(current)
+
+    # Maps the latest generation, unless it is already mapped. Segments
+    # mapped before are reused, they never change.
+    def load(self):
+        mapped = {segment.name: segment for segment, _ in self.segments}
+        while True:
+            manifest = self._read_current()
+            if manifest is None or \
+                    manifest["generation"] == self.generation:
+                return
+            try:
+                segments = [
+                    (mapped[name] if name in mapped else
+                     _read_segment(self.dbpath, name), frozenset(dead))
+                    for name, dead in manifest["segments"]]
+                break
+            except FileNotFoundError:
+                # a writer replaced the manifest and removed its segments
+                # since we read it.
+                continue
+        self.segments = segments
+        self.generation = manifest["generation"]
+        self.view = None
+
+    # Writes segment to a new directory, and returns it mapped from there.
+    def _write_segment(self, segment):
+        name = uuid.uuid4().hex
+        path = os.path.join(self.dbpath, name)
+        os.mkdir(path)
+        np.save(os.path.join(path, "show_ids.npy"),
+                np.asarray(segment.show_ids, dtype=_SHOW_ID_DTYPE))
+        np.save(os.path.join(path, "offsets.npy"),
+                np.asarray(segment.offsets, dtype=np.int64))
+        for column, dtype in _EPISODE_COLUMNS.items():
+            np.save(os.path.join(path, column + ".npy"),
+                    np.asarray(segment.columns[column], dtype=dtype))
+        return _read_segment(self.dbpath, name), frozenset()
+
+    # Writes the rows of shows as a new segment.
+    def _write_shows(self, shows):
+        show_ids = []
+        offsets = [0]
+        columns = {name: [] for name in _EPISODE_COLUMNS}
+        for show in shows:
+            show_ids.append(show.imdb_id)
+            offsets.append(offsets[-1] + show.episode_count)
+            for name, values in self._show_columns(show).items():
+                columns[name].extend(values)
+        return self._write_segment(
+            _Segment(None, show_ids, offsets, columns))
+
+    # Points CURRENT at segments, then removes the ones no longer used.
+    def _commit(self, segments):
+        generation = uuid.uuid4().hex
+        tmp_path = os.path.join(self.dbpath, "." + _CURRENT + "." + generation)
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "generation": generation,
+                "segments": [[segment.name, sorted(dead)]
+                             for segment, dead in segments]}, f)
+        old_manifest = self._read_current()
+        os.replace(tmp_path, os.path.join(self.dbpath, _CURRENT))
+        used = set(segment.name for segment, _ in segments)
+        # mapped files of old segments stay readable until unmapped.
+        for name, _ in old_manifest["segments"] if old_manifest else []:
+            if name not in used:
+                shutil.rmtree(
+                    os.path.join(self.dbpath, name), ignore_errors=True)
+        self.load()
+
+    # Writes the live rows of segments, in order, as a single segment.
+    def _merge(self, segments):
+        return self._write_segment(_gather(segments))
+
+    # Drops segments without live shows, rewrites the ones that are mostly
+    # dead, and merges the newest segments while one is no bigger than the
+    # one after it.
+    def _tidy(self, segments):
+        tidy = []
+        for segment, dead in segments:
+            if len(dead) == len(segment.show_ids):
+                continue
+            _, live_rows = segment.live(dead)
+            if live_rows < segment.offsets[-1] - live_rows:
+                segment, dead = self._merge([(segment, dead)])
+            tidy.append((segment, dead))
+        while len(tidy) > 1 and \
+                tidy[-2][0].live(tidy[-2][1])[1] <= \
+                tidy[-1][0].live(tidy[-1][1])[1]:
+            tidy[-2:] = [self._merge(tidy[-2:])]
+        return tidy
+
+    # The segment holding the live rows of imdb_id, or None.
+    def _find(self, imdb_id):
+        for segment, dead in reversed(self.segments):
+            if imdb_id in segment.rows and imdb_id not in dead:
+                return segment
+        return None
+
+    # Segments without dead shows, with imdb_id marked dead in its segment.
+    def _without(self, imdb_id):
+        owner = self._find(imdb_id)
+        return [(segment, dead | set([imdb_id]) if segment is owner else dead)
+                for segment, dead in self.segments]
+
+    # Live rows of every segment, concatenated on first use after a load.
+    # A single segment without dead shows is used as mapped.
+    def _view(self):
+        if self.view is None:
+            if len(self.segments) == 1 and not self.segments[0][1]:
+                self.view = self.segments[0][0]
+            else:
+                self.view = _gather(self.segments)
+        return self.view
+
+    @property
+    def show_ids(self):
+        return self._view().show_ids
+
+    @property
+    def offsets(self):
+        return self._view().offsets
+
+    @property
+    def season(self):
+        return self._view().columns["season"]
+
+    @property
+    def number(self):
+        return self._view().columns["number"]
+
+    @property
+    def index(self):
+        return self._view().columns["index"]
+
+    @property
+    def score(self):
+        return self._view().columns["score"]
+
+    def _show_columns(self, show):
+        episodes = [e for season in show.season_list
+                    for e in season.episode_list]
+        return {name: [getattr(e, name) for e in episodes]
+                for name in _EPISODE_COLUMNS}
+
+    def has_show(self, imdb_id):
+        return self._find(imdb_id) is not None
+
+    def show_rows(self, imdb_id):
+        return self._view().show_rows(imdb_id)
+
+    # Rewrites the columns from scratch out of an iterable of Shows.
+    def build(self, shows):
+        with self.locks.exclusive(_LOCK_KEY):
+            self._commit([self._write_shows(shows)])
+
+    def _is_synced(self, show):
+        segment = self._find(show.imdb_id)
+        if segment is None:
+            return False
+        rows = segment.show_rows(show.imdb_id)
+        return rows.stop - rows.start == show.episode_count and \
+            np.array_equal(segment.columns["score"][rows], np.asarray(
+                _show_scores(show), dtype=np.float32))
+
+    # Adds the show, or replaces its rows if it changed. Cheap when the
+    # columns are already up to date, and otherwise only writes the show's
+    # rows (and whatever merge that triggers).
+    def sync_show(self, show):
+        if self.synced.get(show.imdb_id) is show:
+            return
+        self.load()
+        if not self._is_synced(show):
+            with self.locks.exclusive(_LOCK_KEY):
+                self.load()
+                if not self._is_synced(show):
+                    self._commit(self._tidy(
+                        self._without(show.imdb_id) +
+                        [self._write_shows([show])]))
+        self.synced[show.imdb_id] = show
+
+    def remove_show(self, imdb_id):
+        self.synced.pop(imdb_id, None)
+        with self.locks.exclusive(_LOCK_KEY):
+            self.load()
+            if self.has_show(imdb_id):
+                self._commit(self._tidy(self._without(imdb_id)))
+
+    def episode_counts(self):
+        return np.diff(self.offsets)
+
+    # Sum of values over the rows of every show, in show_ids order.
+    def _sum_by_show(self, values):
+        counts = self.episode_counts()
+        shows = np.repeat(np.arange(len(counts)), counts)
+        return np.bincount(shows, weights=values, minlength=len(counts))
+
+    # Mean episode score of every show, in show_ids order. Shows without
+    # episodes get nan.
+    def mean_scores(self):
+        counts = self.episode_counts()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._sum_by_show(self.score) / counts
+
+    # Least squares slope of every show's episode scores against their
+    # position in the show, same as ShowInsights.slope. Shows with fewer
+    # than two episodes get nan.
+    def slopes(self):
+        counts = self.episode_counts()
+        y = np.asarray(self.score, dtype=np.float64)
+        x = np.arange(len(y)) - np.repeat(self.offsets[:-1], counts)
+        sum_x = self._sum_by_show(x)
+        sum_y = self._sum_by_show(y)
+        sum_xx = self._sum_by_show(x * x)
+        sum_xy = self._sum_by_show(x * y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slopes = (counts * sum_xy - sum_x * sum_y) / \
+                (counts * sum_xx - sum_x ** 2)
+        return np.where(counts > 1, slopes, np.nan)
+
+
+# Scores of every episode of the show. Lazily loaded shows have them without
+# loading any season.
+def _show_scores(show):
+    if isinstance(show, LazyShow):
+        return show.scores
+    return [e.score for season in show.season_list
+            for e in season.episode_list]
+
+
+# Reads every Show out of the pickle DB.
+def iter_pickled_shows(pickler):
+    for key in pickler.keys(SHOWS):
+        yield pickler.get(key)
+
+
+# module testing only
+if __name__ == "__main__":
+    columns = EpisodeColumns()
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        columns.build(iter_pickled_shows(Pickler("data/pickles/")))
+    start = time.perf_counter()
+    columns = EpisodeColumns()
+    means = columns.mean_scores()
+    slopes = columns.slopes()
+    elapsed = time.perf_counter() - start
+    print("%d shows, %d episodes, loaded and summarized in %.1fms" %
+          (len(columns.show_ids), len(columns.score), elapsed * 1000))
+    for i in np.argsort(-means)[:10]:
+        print("%s: mean %.2f, slope %.4f" %
+              (columns.show_ids[i], means[i], slopes[i]))
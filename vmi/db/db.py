@@ -3,98 +3,354 @@ import pickle
 import sys
 import logging
 
-from vmi.db.pickler import Pickler
+from concurrent.futures import ThreadPoolExecutor
+
+from vmi.db import record
+from vmi.db.columnar import EpisodeColumns
+from vmi.db.index import NameIndex, TitleIndex
+from vmi.db.lazy import LazyList
+from vmi.db.lru import LruStore
+from vmi.db.pickler import DIRECTORS, Pickler, PickleKey
+from vmi.db.secondary import EpisodeIndex, MovieIndex
+from vmi.db.sqlite import SqliteStore
 from vmi.model.director import Director
+from vmi.model.show import Show, ShowMetadata
 from vmi.net.net import Net
+from vmi.net.session import ThrottledError
 from vmi.util.logger import LoggerConfig
 
 _PICKLE_DATA_DIR = "data/pickles/"
+_COLUMNS_DATA_DIR = "data/columns/"
+_SQLITE_DB_PATH = "data/vmi.sqlite3"
+# Storage engine used when none is given, "pickle" or "sqlite".
+_DEFAULT_STORAGE = "pickle"
+# Max number of models kept in memory, see LruStore.
+_CACHE_ENTRIES = 256
+_TITLE_INDEX_PATH = "data/index/titles.json"
+_NAME_INDEX_PATH = "data/index/names.json"
+_EPISODE_INDEX_PATH = "data/index/episodes"
+_MOVIE_INDEX_PATH = "data/index/movies"
+# Max number of IMDB name searches in flight during a bulk resolve.
+_MAX_NAME_SEARCHES = 8
 
 
-class FakeDirectorMetadata:
-    def __init__(self):
-        imdb_id = None
+def make_store(storage):
+    if storage == "pickle":
+        codec = os.getenv("VMI_PICKLE_CODEC", record.DEFAULT_CODEC)
+        try:
+            return Pickler(_PICKLE_DATA_DIR, codec)
+        except record.RecordFormatError as e:
+            logging.error(str(e))
+            raise SystemExit(1)
+    if storage == "sqlite":
+        return SqliteStore(_SQLITE_DB_PATH)
+    logging.error("Unknown storage engine %s!" % storage)
+    raise SystemExit(1)
 
 
 class DbClient:
-    def __init__(self):
-        self.net = Net()
-        self.pickler = Pickler(_PICKLE_DATA_DIR)
+    # storage picks the storage engine, see make_store. Defaults to the
+    # VMI_STORAGE environment variable, falling back to the pickle DB.
+    # Loaded models are kept in an LRU cache of at most cache_entries models
+    # and, if given, cache_bytes estimated bytes. parser is the
+    # BeautifulSoup tree builder for IMDB pages, defaulting to the VMI_PARSER
+    # environment variable, see choose_parser.
+    def __init__(
+            self,
+            storage=None,
+            cache_entries=_CACHE_ENTRIES,
+            cache_bytes=None,
+            parser=None):
+        self.net = Net(parser=parser)
+        if not storage:
+            storage = os.getenv("VMI_STORAGE", _DEFAULT_STORAGE)
+        self.store = LruStore(make_store(storage), cache_entries, cache_bytes)
+        self.columns = EpisodeColumns(_COLUMNS_DATA_DIR)
+        self.episode_index = EpisodeIndex(_EPISODE_INDEX_PATH)
+        self.movie_index = MovieIndex(_MOVIE_INDEX_PATH)
+        self.title_index = TitleIndex(_TITLE_INDEX_PATH)
+        self.name_index = NameIndex(_NAME_INDEX_PATH)
+
+    # Looks the title up in the local title index. Returns the key of the
+    # show if it is known and already in the store, None otherwise.
+    def _find_cached_show(self, title):
+        imdb_id = self.title_index.get(title)
+        if imdb_id and self.store.has(PickleKey(imdb_id)):
+            return PickleKey(imdb_id)
+        return None
+
+    # Keeps the episode columns and index in sync with a loaded or stored
+    # show.
+    def _sync_show(self, show):
+        self.columns.sync_show(show)
+        self.episode_index.sync_show(show)
 
+    def _unsync_show(self, imdb_id):
+        self.columns.remove_show(imdb_id)
+        self.episode_index.remove_show(imdb_id)
+
+    # Loads the show and keeps the episode columns in sync with it.
     def get_show(self, title):
+        show = self._get_show(title)
+        self._sync_show(show)
+        return show
+
+    # Returns (show imdb id, season number, episode number) of a cached
+    # episode, None if no cached show has it.
+    def find_episode(self, episode_imdb_id):
+        return self.episode_index.lookup(episode_imdb_id)
+
+    # imdb ids of the cached directors of a movie.
+    def find_movie_directors(self, movie_imdb_id):
+        return self.movie_index.lookup(movie_imdb_id)
+
+    def _get_show(self, title):
         logging.info("Getting show %s..." % title)
+        show_key = self._find_cached_show(title)
+        if show_key:
+            logging.info("Show %s was found in the title index!" % title)
+            return self.store.get(show_key)
         show_metadata = self.net.get_show_metadata(title)
         logging.info("Got handle for show %s!" % show_metadata.title)
-        if (self.pickler.has(show_metadata)):
+        self.title_index.add(
+            show_metadata.imdb_id, [title, show_metadata.title])
+        if (self.store.has(show_metadata)):
             logging.info(
-                "Show %s was found in the pickle DB!" %
+                "Show %s was found in the DB!" %
                 show_metadata.title)
-            show = self.pickler.get(show_metadata)
+            show = self.store.get(show_metadata)
             return show
+        # another process may be scraping the same show, get_or_create makes
+        # sure only one of us does.
+        return self.store.get_or_create(
+            show_metadata, lambda: self._scrape_show(show_metadata))
+
+    def _scrape_show(self, show_metadata):
         logging.info("Scraping data for show %s..." % show_metadata.title)
         show = self.net.get_show(show_metadata)
         logging.info("Done scraping data for show %s!" % show_metadata.title)
-        self.pickler.put(show)
+        return show
+
+    # Streaming version of get_show. Returns the ShowMetadata of the show and
+    # an iterator over its seasons. Cached shows are served from the store.
+    # Uncached shows are scraped one season at a time, and only stored (and
+    # synced) once the iterator is exhausted; a caller that stops early
+    # leaves nothing behind.
+    def stream_show(self, title):
+        logging.info("Streaming show %s..." % title)
+        show_key = self._find_cached_show(title)
+        if show_key:
+            show = self.store.get(show_key)
+            return ShowMetadata.from_show(show), iter(show.season_list)
+        show_metadata = self.net.get_show_metadata(title)
+        self.title_index.add(
+            show_metadata.imdb_id, [title, show_metadata.title])
+        if self.store.has(show_metadata):
+            show = self.store.get(show_metadata)
+            return show_metadata, iter(show.season_list)
+        return show_metadata, self._stream_and_put_show(show_metadata)
+
+    def _stream_and_put_show(self, show_metadata):
+        season_list = []
+        for season in self.net.iter_show(show_metadata):
+            season_list.append(season)
+            yield season
+        logging.info("Done scraping data for show %s!" % show_metadata.title)
+        show = Show(show_metadata, season_list)
+        self.store.put(show)
+        self._sync_show(show)
+
+    # Bulk version of get_show. Shows missing from the store are scraped
+    # together through the net's parse pipeline. Shows that could not be
+    # scraped (see Net.get_shows) are None.
+    def get_shows(self, titles):
+        show_list = [None] * len(titles)
+        missing = []
+        for i, title in enumerate(titles):
+            show_key = self._find_cached_show(title)
+            if show_key:
+                show_list[i] = self.store.get(show_key)
+                continue
+            show_metadata = self.net.get_show_metadata(title)
+            self.title_index.add(
+                show_metadata.imdb_id, [title, show_metadata.title])
+            if self.store.has(show_metadata):
+                show_list[i] = self.store.get(show_metadata)
+            else:
+                missing.append((i, show_metadata))
+        if missing:
+            logging.info("Scraping data for %d shows..." % len(missing))
+            shows = self.net.get_shows([m for _, m in missing])
+            for (i, _), show in zip(missing, shows):
+                if show is None:
+                    continue
+                self.store.put(show)
+                show_list[i] = show
+        for show in show_list:
+            if show is not None:
+                self._sync_show(show)
+        return show_list
+
+    # Picks up new episodes of a show that is still airing. Compares the
+    # OMDB season count with the cached show, and re-scrapes only the last
+    # `rescrape` cached seasons plus any new ones. Earlier seasons, and their
+    # episode indexes, are kept as they are.
+    def refresh_show(self, title, rescrape=1):
+        logging.info("Refreshing show %s..." % title)
+        show_metadata = self.net.get_show_metadata(title)
+        self.title_index.add(
+            show_metadata.imdb_id, [title, show_metadata.title])
+        if not self.store.has(show_metadata):
+            logging.info("Show %s is not cached yet, scraping all of it..." %
+                         show_metadata.title)
+            show = self.store.get_or_create(
+                show_metadata, lambda: self._scrape_show(show_metadata))
+            self._sync_show(show)
+            return show
+
+        show = self.store.get(show_metadata)
+        kept_count = max(0, show.season_count - rescrape)
+        kept = show.season_list[:kept_count]
+        last_season = max(show.season_count, show_metadata.season_count)
+        first_index = sum(len(season.episode_list) for season in kept) + 1
+        logging.info("Scraping seasons %d to %d for show %s..." %
+                     (kept_count + 1, last_season, show_metadata.title))
+        seasons = self.net.get_seasons(
+            show_metadata, range(kept_count + 1, last_season + 1), first_index)
+        show = Show(show_metadata, kept + seasons)
+        self.store.put(show)
+        self._sync_show(show)
+        logging.info("Show %s now has %d episodes" %
+                     (show.title, show.episode_count))
         return show
 
     def remove_show(self, title):
         logging.info("Removing show %s..." % title)
+        show_key = self._find_cached_show(title)
+        if show_key:
+            self.store.remove(show_key)
+            self._unsync_show(show_key.imdb_id)
+            self.title_index.remove(show_key.imdb_id)
+            logging.info("Show %s was deleted from the DB" % title)
+            return
         show_metadata = self.net.get_show_metadata(title)
         logging.info("Got handle for show %s!" % show_metadata.title)
-        if self.pickler.has(show_metadata):
+        self.title_index.remove(show_metadata.imdb_id)
+        if self.store.has(show_metadata):
             logging.info(
-                "Show %s was found in the pickle DB!" %
+                "Show %s was found in the DB!" %
                 show_metadata.title)
-            self.pickler.remove(show_metadata)
+            self.store.remove(show_metadata)
+            self._unsync_show(show_metadata.imdb_id)
             logging.info(
-                "Show %s was deleted from the pickle DB" %
+                "Show %s was deleted from the DB" %
                 show_metadata.title)
         else:
-            logging.info("Show %s was not found in the pickle DB!"%
+            logging.info("Show %s was not found in the DB!"%
                 show_metadata.title)
 
     def _get_director_metadata(self, imdb_id):
         logging.info("Getting director...")
-        # HACK
-        director_metadata = FakeDirectorMetadata()
-        director_metadata.imdb_id = imdb_id
-        if (self.pickler.has(director_metadata)):
-            director_metadata = self.pickler.get(director_metadata)
+        director_key = PickleKey(imdb_id, DIRECTORS)
+        if (self.store.has(director_key)):
+            director_metadata = self.store.get(director_key)
             logging.info(
-                "Director %s was found in the pickle DB!" %
+                "Director %s was found in the DB!" %
                 director_metadata.name)
             return director_metadata
+        return self.store.get_or_create(
+            director_key,
+            lambda: self._scrape_director_metadata(imdb_id))
+
+    def _scrape_director_metadata(self, imdb_id):
         logging.info("Scraping data for director...")
-        director_metadata = self.net.get_director_metadata(
-            director_metadata.imdb_id)
+        director_metadata = self.net.get_director_metadata(imdb_id)
         logging.info(
             "Done scraping data for director metadata %s!" %
             director_metadata.name)
-        self.pickler.put(director_metadata)
         return director_metadata
 
-    def _get_movie(self, movie_metadata):
-        logging.info("Getting movie %s..." % movie_metadata.title)
-        if (self.pickler.has(movie_metadata)):
-            movie = self.pickler.get(movie_metadata)
-            logging.info("Movie %s was found in the pickle DB!" % movie.title)
-            return movie
-        logging.info("Scraping data for movie...")
-        movie = self.net.get_movie(movie_metadata)
-        logging.info("Done scraping data for movie %s!" % movie_metadata.title)
-        self.pickler.put(movie)
-        return movie
+    # Loads every movie in movie_metadata_list, scraping the ones that are not
+    # in the store yet concurrently. Keeps the order of the list, minus
+    # the movies that could not be scraped. If all of them are cached, they
+    # are only loaded once they are accessed.
+    def _get_movies(self, movie_metadata_list):
+        missing = [i for i, movie_metadata in enumerate(movie_metadata_list)
+                   if not self.store.has(movie_metadata)]
+        if not missing:
+            logging.info("All %d movies were found in the DB!" %
+                         len(movie_metadata_list))
+            return LazyList(len(movie_metadata_list), lambda indexes: [
+                self.store.get(movie_metadata_list[i]) for i in indexes])
+        movie_list = [None] * len(movie_metadata_list)
+        to_scrape = set(missing)
+        for i, movie_metadata in enumerate(movie_metadata_list):
+            if i not in to_scrape:
+                movie_list[i] = self.store.get(movie_metadata)
+        logging.info("Scraping data for %d movies..." % len(missing))
+        movies = self.net.get_movies(
+            [movie_metadata_list[i] for i in missing])
+        for i, movie in zip(missing, movies):
+            if movie is None:
+                continue
+            logging.info("Done scraping data for movie %s!" % movie.title)
+            self.store.put(movie)
+            movie_list[i] = movie
+        return [movie for movie in movie_list if movie is not None]
 
     def get_director(self, imdb_id):
         director_metadata = self._get_director_metadata(imdb_id)
-        movie_list = []
-        for movie_metadata in director_metadata.movie_metadata_list:
-            movie_list.append(self._get_movie(movie_metadata))
-        movie_list.reverse()
+        self.movie_index.sync_director(director_metadata)
+        movie_list = self._get_movies(
+            list(reversed(director_metadata.movie_metadata_list)))
         return Director(director_metadata, movie_list)
 
+    # Resolves director names to imdb ids, consulting the name index first
+    # and searching IMDB concurrently for the rest. Names with no match
+    # resolve to None.
+    def resolve_director_names(self, names):
+        resolved = {}
+        missing = []
+        for name in names:
+            found, imdb_id = self.name_index.lookup(name)
+            if found:
+                resolved[name] = imdb_id
+            elif name not in missing:
+                suggestion = self.name_index.suggest(name)
+                if suggestion:
+                    logging.info(
+                        "%s is not in the name index, searching it even "
+                        "though it is close to %s." % (name, suggestion))
+                missing.append(name)
+        if missing:
+            logging.info("Searching IMDB for %d names..." % len(missing))
+            with ThreadPoolExecutor(max_workers=_MAX_NAME_SEARCHES) as executor:
+                results = executor.map(self._search_director_name, missing)
+                for name, (searched, imdb_id) in zip(missing, results):
+                    if searched:
+                        self.name_index.add(name, imdb_id, save=False)
+                    resolved[name] = imdb_id
+            self.name_index.save()
+        return [resolved[name] for name in names]
+
+    # Returns (searched, imdb_id). A throttled search resolves to None for
+    # now, but isn't remembered as a miss.
+    def _search_director_name(self, name):
+        try:
+            return True, self.net.find_director_imdb_id_by_name(name)
+        except ThrottledError:
+            logging.warning("Throttled while searching for %s, skipping it." %
+                            name)
+            return False, None
+
+    def resolve_director_name(self, name):
+        return self.resolve_director_names([name])[0]
+
     def get_director_by_name(self, name):
-        imdb_id = self.net.get_director_imdb_id_by_name(name)
+        imdb_id = self.resolve_director_name(name)
+        if not imdb_id:
+            logging.error("No match found for %s! Try using imdb_id.", name)
+            raise SystemExit(1)
         logging.info("Found imdb_id for %s!" % name)
         return self.get_director(imdb_id)
 
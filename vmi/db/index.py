@@ -0,0 +1,147 @@
+import difflib
+import json
+import os
+import tempfile
+import time
+
+from pathlib import Path
+from slugify import slugify
+
+from vmi.db.lock import KeyLocks
+
+# Seconds a "no such director" answer is trusted before searching again.
+_NEGATIVE_TTL = 7 * 24 * 60 * 60
+# Minimum similarity for a name to be suggested, see
+# difflib.get_close_matches.
+_SUGGEST_CUTOFF = 0.85
+
+
+# Small persistent str -> value map, kept in memory and written back to a json
+# file on every change. Several processes may share the file: a save only
+# writes the entries this instance changed, on top of what is on disk.
+class JsonIndex:
+    def __init__(self, path):
+        Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.locks = KeyLocks(path + ".locks")
+        self.entries = self._load()
+        # entries as of the last load or save, to tell our changes apart.
+        self.saved = dict(self.entries)
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    # Reloads the file and merges the entries added, changed or removed
+    # since the last save into it, under the file's lock, then replaces it.
+    def _save(self):
+        with self.locks.exclusive(os.path.basename(self.path)):
+            entries = self._load()
+            for key, value in self.entries.items():
+                if key not in self.saved or self.saved[key] != value:
+                    entries[key] = self._merge(value, entries.get(key))
+            for key in self.saved:
+                if key not in self.entries:
+                    entries.pop(key, None)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.path),
+                prefix="." + os.path.basename(self.path) + ".",
+                suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(entries, f, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        self.entries = entries
+        self.saved = dict(entries)
+
+    # Value to save for an entry this instance changed, given the one on
+    # disk, None if there is none. Ours wins by default.
+    def _merge(self, ours, theirs):
+        return ours
+
+
+# Maps show titles, slugs and imdb ids to imdb ids, so a cached show can be
+# found without asking OMDB. Every alias is slugified, so "The Wire",
+# "the wire" and "the-wire" are the same entry.
+class TitleIndex(JsonIndex):
+    @staticmethod
+    def normalize(alias):
+        return slugify(alias)
+
+    def get(self, title):
+        return self.entries.get(self.normalize(title))
+
+    def add(self, imdb_id, aliases):
+        changed = False
+        for alias in list(aliases) + [imdb_id]:
+            key = self.normalize(alias)
+            if key and self.entries.get(key) != imdb_id:
+                self.entries[key] = imdb_id
+                changed = True
+        if changed:
+            self._save()
+
+    def remove(self, imdb_id):
+        aliases = [k for k, v in self.entries.items() if v == imdb_id]
+        for alias in aliases:
+            del self.entries[alias]
+        if aliases:
+            self._save()
+
+
+# Maps director names to imdb ids, so resolving a name doesn't need an IMDB
+# search page every time. Names are slugified (which also unidecodes them), so
+# "Akira Kurosawa" and "akira  kurosawa" share an entry. Near misses are only
+# ever suggested, never resolved: "Spike Jones" is not "Spike Jonze". Names
+# IMDB has no match for are remembered for a while too.
+class NameIndex(JsonIndex):
+    @staticmethod
+    def normalize(name):
+        return slugify(name)
+
+    # Returns (found, imdb_id). found is False if the name must be searched,
+    # imdb_id is None for a cached negative result.
+    def lookup(self, name):
+        key = self.normalize(name)
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        if entry["imdb_id"] is None and \
+                time.time() - entry["resolved_at"] > _NEGATIVE_TTL:
+            return False, None
+        return True, entry["imdb_id"]
+
+    # Closest known name with an imdb id, for "did you mean" hints. None if
+    # nothing is close enough.
+    def suggest(self, name):
+        known = [k for k, v in self.entries.items() if v["imdb_id"]]
+        close = difflib.get_close_matches(
+            self.normalize(name), known, n=1, cutoff=_SUGGEST_CUTOFF)
+        return close[0] if close else None
+
+    # A name another process resolved to an imdb id is not taken back by a
+    # miss cached here. Otherwise the newest answer wins.
+    def _merge(self, ours, theirs):
+        if theirs is None:
+            return ours
+        if ours["imdb_id"] is None and theirs["imdb_id"] is not None:
+            return theirs
+        if theirs["imdb_id"] is None and ours["imdb_id"] is not None:
+            return ours
+        return max(ours, theirs, key=lambda entry: entry["resolved_at"])
+
+    def add(self, name, imdb_id, save=True):
+        self.entries[self.normalize(name)] = {
+            "imdb_id": imdb_id,
+            "resolved_at": time.time(),
+        }
+        if save:
+            self._save()
+
+    def save(self):
+        self._save()
@@ -0,0 +1,130 @@
+import array
+import threading
+
+from collections.abc import Sequence
+
+from vmi.db import record
+from vmi.model.show import Show, ShowMetadata
+
+
+# Read-only list whose items are loaded on first access. load_items(indexes)
+# returns the items at the given indexes, so iterating loads everything
+# missing in one go. load_items may instead find that the source changed and
+# reset the list, then the access starts over on the reset list.
+class LazyList(Sequence):
+    def __init__(self, length, load_items):
+        self.load_items = load_items
+        # reentrant, load_items may reset the list, see LazyShow.
+        self.lock = threading.RLock()
+        self.generation = 0
+        self.reset(length)
+
+    # Forgets every loaded item.
+    def reset(self, length):
+        with self.lock:
+            self.items = [None] * length
+            self.loaded = [False] * length
+            self.generation += 1
+
+    # key is an index, a slice or None for every item.
+    def _load(self, key):
+        with self.lock:
+            while True:
+                indexes = range(len(self.items))
+                if key is not None:
+                    indexes = indexes[key]
+                if isinstance(indexes, int):
+                    indexes = [indexes]
+                missing = [i for i in indexes if not self.loaded[i]]
+                if not missing:
+                    return [self.items[i] for i in indexes]
+                generation = self.generation
+                items = self.load_items(missing)
+                if self.generation != generation:
+                    continue
+                for i, item in zip(missing, items):
+                    self.items[i] = item
+                    self.loaded[i] = True
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._load(i)
+        return self._load(i)[0]
+
+    def __iter__(self):
+        return iter(self._load(None))
+
+
+# Raised when a LazyShow needs a season but its record is gone.
+class StaleRecordError(Exception):
+    pass
+
+
+# Show read from a version 2 or later record, see vmi.db.record. Only the
+# record's index is read up front, which has everything but the seasons:
+# title, rating, counts and every episode's score, imdb id, season and
+# number. Each season is read and unpickled on first access. Pickles (and
+# copies) as a plain Show.
+class LazyShow(Show):
+    def __init__(self, path, codec, index, body_offset):
+        self.path = path
+        self._set_index(codec, index, body_offset)
+        self.season_list = LazyList(self.season_count, self._load_seasons)
+
+    def _set_index(self, codec, index, body_offset):
+        meta = index["meta"]
+        self.title = meta["title"]
+        self.slug = meta["slug"]
+        self.rating = meta["rating"]
+        self.imdb_id = meta["imdb_id"]
+        self.season_count = meta["season_count"]
+        self.episode_count = meta["episode_count"]
+        self.season_numbers = meta["season_numbers"]
+        self.scores = array.array("f")
+        self.scores.frombytes(meta["scores"])
+        # imdb id, season and number of every episode, None for records
+        # written before the index had them.
+        self.episode_ids = meta.get("episode_ids")
+        self.episode_seasons = self.episode_numbers = None
+        if self.episode_ids is not None:
+            self.episode_seasons = array.array("h")
+            self.episode_seasons.frombytes(meta["episode_seasons"])
+            self.episode_numbers = array.array("h")
+            self.episode_numbers.frombytes(meta["episode_numbers"])
+        self.codec = codec
+        self.index = index
+        self.token = index["token"]
+        self.segments = index["segments"]
+        self.body_offset = body_offset
+
+    def _load_seasons(self, indexes):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            raise StaleRecordError(
+                "Show %s was removed from the DB" % self.imdb_id)
+        with f:
+            _, codec, index, body_offset = record.read_index(f)
+            if index["token"] != self.token:
+                # the show was rewritten since, e.g. by refresh_show in
+                # another process. Seasons loaded so far may no longer
+                # match, so they are all dropped and the show follows the
+                # new record.
+                self._set_index(codec, index, body_offset)
+                self.season_list.reset(self.season_count)
+                return None
+            seasons = []
+            for i in indexes:
+                offset, length = self.segments[i]
+                f.seek(self.body_offset + offset)
+                seasons.append(record.load_season(
+                    self.codec, self.index, f.read(length)))
+            return seasons
+
+    def __reduce__(self):
+        return (Show, (ShowMetadata(
+            self.title, self.slug, self.rating, self.imdb_id,
+            self.season_count), list(self.season_list)))
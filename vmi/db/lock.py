@@ -0,0 +1,51 @@
+import fcntl
+import os
+
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# Per-key advisory file locks, shared between threads and processes that use
+# the same lock directory. Every key gets its own lock file, so work on
+# different keys never waits on each other. Lock files only exist while their
+# key is locked: the last holder removes it on release.
+class KeyLocks:
+    def __init__(self, lockpath):
+        # ensure this directory exists.
+        Path(lockpath).mkdir(parents=True, exist_ok=True)
+        self.lockpath = lockpath
+
+    @contextmanager
+    def _lock(self, key, operation):
+        path = os.path.join(self.lockpath, key)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT)
+            fcntl.flock(fd, operation)
+            # the last holder may have removed the file between our open and
+            # flock, then the lock we got is worthless and we try again.
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+        try:
+            yield
+        finally:
+            # only a holder that can get the lock exclusively is the last
+            # one, and may remove the file.
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.remove(path)
+            except BlockingIOError:
+                pass
+            # closing the file drops the lock.
+            os.close(fd)
+
+    # Any number of readers may hold the shared lock of a key at once.
+    def shared(self, key):
+        return self._lock(key, fcntl.LOCK_SH)
+
+    # Only one writer holds the exclusive lock of a key, and no reader does.
+    def exclusive(self, key):
+        return self._lock(key, fcntl.LOCK_EX)
@@ -0,0 +1,113 @@
+import threading
+
+from collections import OrderedDict
+
+_DEFAULT_MAX_ENTRIES = 256
+# Rough in-memory bytes of a model, and of each episode or movie it holds,
+# see estimate_size.
+_MODEL_SIZE = 512
+_ITEM_SIZE = 256
+
+
+# In-process LRU cache in front of a store (Pickler or SqliteStore), with the
+# same interface. Hot models come back without touching the store at all.
+# Bounded by entry count, and optionally by the estimated size of the cached
+# models. put/remove through this cache invalidate the entry; writes
+# made by other processes are not seen until the entry is evicted.
+class LruStore:
+    def __init__(self, store, max_entries=_DEFAULT_MAX_ENTRIES, max_bytes=None):
+        self.store = store
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # imdb id -> (model, estimated size), least recently used first.
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _estimate_size(self, obj):
+        if self.max_bytes is None:
+            return 0
+        return estimate_size(obj)
+
+    def _lookup(self, imdb_id):
+        with self.lock:
+            if imdb_id in self.entries:
+                self.entries.move_to_end(imdb_id)
+                self.hits += 1
+                return True, self.entries[imdb_id][0]
+            self.misses += 1
+            return False, None
+
+    def _insert(self, obj):
+        size = self._estimate_size(obj)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self.lock:
+            self._evict(obj.imdb_id)
+            self.entries[obj.imdb_id] = (obj, size)
+            self.size += size
+            while len(self.entries) > self.max_entries or \
+                    (self.max_bytes is not None and self.size > self.max_bytes):
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def _evict(self, imdb_id):
+        if imdb_id in self.entries:
+            self.size -= self.entries.pop(imdb_id)[1]
+
+    def has(self, key):
+        with self.lock:
+            if key.imdb_id in self.entries:
+                return True
+        return self.store.has(key)
+
+    def get(self, key):
+        found, obj = self._lookup(key.imdb_id)
+        if found:
+            return obj
+        obj = self.store.get(key)
+        self._insert(obj)
+        return obj
+
+    def put(self, obj):
+        with self.lock:
+            self._evict(obj.imdb_id)
+        self.store.put(obj)
+        self._insert(obj)
+
+    def remove(self, key):
+        with self.lock:
+            self._evict(key.imdb_id)
+        self.store.remove(key)
+
+    def get_or_create(self, key, create):
+        found, obj = self._lookup(key.imdb_id)
+        if found:
+            return obj
+        obj = self.store.get_or_create(key, create)
+        self._insert(obj)
+        return obj
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "bytes": self.size,
+            }
+
+
+# Estimates the size of a model from its shape alone: nothing is pickled, and
+# a LazyShow loads no season, it counts as if all of them were loaded.
+def estimate_size(obj):
+    items = getattr(obj, "episode_count", 0) + \
+        len(getattr(obj, "movie_metadata_list", ()))
+    return _MODEL_SIZE + _ITEM_SIZE * items
@@ -0,0 +1,47 @@
+import logging
+import sys
+
+from vmi.db import record
+from vmi.db.pickler import Pickler
+from vmi.util.logger import LoggerConfig
+
+_PICKLE_DATA_DIR = "data/pickles/"
+
+
+# Upgrades every entry of the pickle DB at dbpath to the sharded layout and
+# the current record format and schema, compressed with codec. Entries
+# already in that format are left alone, so this can be re-run, and readers
+# may keep using the DB meanwhile.
+def migrate(dbpath=_PICKLE_DATA_DIR, codec=record.DEFAULT_CODEC):
+    pickler = Pickler(dbpath, codec)
+    moved = pickler.move_flat_entries()
+    if moved:
+        logging.info("Moved %d entries out of the flat layout" % moved)
+    upgraded = 0
+    size_before = 0
+    size_after = 0
+    keys = pickler.keys()
+    for key in keys:
+        rewritten, before, after = pickler.upgrade(key)
+        if rewritten:
+            upgraded += 1
+        size_before += before
+        size_after += after
+    logging.info("Upgraded %d of %d entries, %d bytes -> %d bytes" %
+                 (upgraded, len(keys), size_before, size_after))
+    return upgraded
+
+
+if __name__ == "__main__":
+    LoggerConfig()
+    if len(sys.argv) > 3:
+        print("Usage: python -m vmi.db.migrate [<CODEC>] [<DB PATH>]")
+        raise SystemExit(1)
+    codec = sys.argv[1] if len(sys.argv) > 1 else record.DEFAULT_CODEC
+    dbpath = sys.argv[2] if len(sys.argv) > 2 else _PICKLE_DATA_DIR
+    try:
+        record.check_codec(codec)
+    except record.RecordFormatError as e:
+        logging.error(str(e))
+        raise SystemExit(1)
+    migrate(dbpath, codec)
@@ -1,28 +1,198 @@
+import hashlib
 import os
-import pickle
+import tempfile
 
 from pathlib import Path
 
+from vmi.db import record
+from vmi.db.lazy import LazyShow
+from vmi.db.lock import KeyLocks
+from vmi.model.director import DirectorMetadata
+from vmi.model.movie import Movie, MovieMetadata
 from vmi.model.show import Show, ShowMetadata
 
+# Lock files live in this hidden directory inside the DB.
+_LOCK_DIR = ".locks"
 
+# One namespace (top level directory) per entity type.
+SHOWS = "shows"
+DIRECTORS = "directors"
+MOVIES = "movies"
+_NAMESPACES = {
+    Show: SHOWS,
+    LazyShow: SHOWS,
+    ShowMetadata: SHOWS,
+    DirectorMetadata: DIRECTORS,
+    Movie: MOVIES,
+    MovieMetadata: MOVIES,
+}
+# Number of hex digits of the id hash used to pick a shard, 256 shards per
+# namespace.
+_SHARD_DIGITS = 2
+
+
+# Stand-in for a model when all we have is its imdb id.
+class PickleKey:
+    def __init__(self, imdb_id, namespace=SHOWS):
+        self.imdb_id = imdb_id
+        self.namespace = namespace
+
+
+def _namespace(key):
+    if isinstance(key, PickleKey):
+        return key.namespace
+    return _NAMESPACES[type(key)]
+
+
+def _shard(imdb_id):
+    return hashlib.sha1(imdb_id.encode("utf-8")).hexdigest()[:_SHARD_DIGITS]
+
+
+# File-based DB with one pickle per imdb id, stored at
+# <namespace>/<shard>/<imdb id> so no directory grows past a few thousand
+# entries. Entries are written to a temp file and renamed into place, so
+# readers and has() only ever see complete entries, even if a writer
+# crashes. Writers of a key also hold that key's lock, so several processes
+# can share one DB.
+#
+# Entries are stored in the record format (see vmi.db.record), compressed
+# with codec. Legacy headerless pickles are still read, and can be upgraded
+# in bulk with vmi.db.migrate. So are entries of the old flat layout, which
+# are moved into place the first time they are looked up.
 class Pickler:
-    def __init__(self, dbpath):
+    def __init__(self, dbpath, codec=record.DEFAULT_CODEC):
+        record.check_codec(codec)
         # ensure this directory exists.
         Path(dbpath).mkdir(parents=True, exist_ok=True)
         self.dbpath = dbpath
+        self.codec = codec
+        self.locks = KeyLocks(os.path.join(dbpath, _LOCK_DIR))
+        # only look for flat entries while there may be some left.
+        self.has_flat_entries = any(True for _ in self._flat_entries())
+
+    def _path(self, key):
+        return os.path.join(
+            self.dbpath, _namespace(key), _shard(key.imdb_id), key.imdb_id)
+
+    def _flat_path(self, imdb_id):
+        return os.path.join(self.dbpath, imdb_id)
+
+    def _flat_entries(self):
+        with os.scandir(self.dbpath) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith("."):
+                    yield entry.name
+
+    def _read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _load(self, key):
+        return record.loads(self._read(self._path(key)))
+
+    # Like _load, but only reads the index of show records, see LazyShow.
+    def _open(self, key):
+        path = self._path(key)
+        with open(path, "rb") as f:
+            _, codec, index, body_offset = record.read_index(f)
+            if index is not None and index["kind"] == record.KIND_SHOW:
+                return LazyShow(path, codec, index, body_offset)
+            f.seek(0)
+            return record.loads(f.read())
+
+    def _dump(self, obj):
+        data = record.dumps(obj, self.codec)
+        path = self._path(obj)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix="." + obj.imdb_id + ".",
+            suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    # Moves a flat layout entry into its namespace and shard. The namespace
+    # is only known once the entry is loaded.
+    def _move_flat(self, imdb_id):
+        with self.locks.exclusive(imdb_id):
+            flat_path = self._flat_path(imdb_id)
+            if not os.path.isfile(flat_path):
+                return
+            path = self._path(record.loads(self._read(flat_path)))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(flat_path, path)
+
+    def _check_flat(self, key):
+        if self.has_flat_entries and not os.path.isfile(self._path(key)):
+            self._move_flat(key.imdb_id)
+
+    # Moves every flat layout entry into place. Returns how many were moved.
+    def move_flat_entries(self):
+        names = list(self._flat_entries())
+        for name in names:
+            self._move_flat(name)
+        self.has_flat_entries = False
+        return len(names)
 
     def has(self, show):
-        return os.path.isfile(self.dbpath + show.imdb_id)
+        self._check_flat(show)
+        return os.path.isfile(self._path(show))
 
     def get(self, show):
-        return pickle.load(open(self.dbpath + show.imdb_id, "rb"))
+        self._check_flat(show)
+        with self.locks.shared(show.imdb_id):
+            return self._open(show)
 
     def put(self, show):
-        pickle.dump(show, open(self.dbpath + show.imdb_id, "wb"))
+        with self.locks.exclusive(show.imdb_id):
+            self._dump(show)
 
     def remove(self, show):
-        os.remove(self.dbpath + show.imdb_id)
+        self._check_flat(show)
+        with self.locks.exclusive(show.imdb_id):
+            os.remove(self._path(show))
+
+    # Rewrites the entry in the current record format, schema and codec,
+    # unless it already is. Returns whether it was rewritten, and its size in bytes
+    # before and after.
+    def upgrade(self, key):
+        with self.locks.exclusive(key.imdb_id):
+            data = self._read(self._path(key))
+            if record.is_current(data, self.codec):
+                return False, len(data), len(data)
+            self._dump(record.loads(data))
+            return True, len(data), os.path.getsize(self._path(key))
+
+    # Keys of every entry in the namespace, or in all of them, skipping
+    # lock and temp files.
+    def keys(self, namespace=None):
+        namespaces = [namespace] if namespace else [SHOWS, DIRECTORS, MOVIES]
+        keys = []
+        for namespace in namespaces:
+            for root, _, names in os.walk(os.path.join(self.dbpath, namespace)):
+                keys.extend(PickleKey(name, namespace) for name in names
+                            if not name.startswith("."))
+        return sorted(keys, key=lambda key: (key.namespace, key.imdb_id))
+
+    # Returns the entry for key, calling create() and storing its result if
+    # there is none. Single-flight: while one process runs create() for a
+    # key, others asking for the same key wait and then read its result
+    # instead of creating it again.
+    def get_or_create(self, key, create):
+        if self.has(key):
+            return self.get(key)
+        with self.locks.exclusive(key.imdb_id):
+            if os.path.isfile(self._path(key)):
+                return self._open(key)
+            obj = create()
+            self._dump(obj)
+            return obj
 
 
 # module testing only
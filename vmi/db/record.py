@@ -0,0 +1,308 @@
+import array
+import io
+import pickle
+import struct
+import uuid
+import zlib
+
+from vmi.model.director import DirectorMetadata
+from vmi.model.movie import Movie, MovieMetadata
+from vmi.model.season import ArraySeason
+from vmi.model.show import Show, ShowMetadata
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# Every record starts with MAGIC, then the format version and the codec of
+# the payload, one byte each. Headerless files are legacy raw pickles.
+#
+# Version 1 records hold a single compressed pickle. Version 2 records hold
+# the length of an index, the index (an uncompressed pickle of the record's
+# kind, metadata and segment offsets) and then the compressed segments, so
+# the index can be read without touching the rest.
+#
+# Version 3 records are laid out like version 2, but only ever pickle plain
+# data (dicts, lists, tuples and scalars), never model classes, so renaming
+# or reshaping a model doesn't break the files. The index records the
+# SCHEMA_VERSION of that plain data, and older schemas are upgraded on load,
+# see _SCHEMA_UPGRADES.
+MAGIC = b"\x93VMI"
+FORMAT_VERSION = 3
+_HEADER = struct.Struct(">4sBB")
+_INDEX_LENGTH = struct.Struct(">I")
+
+SCHEMA_VERSION = 1
+# Schema version -> upgrade(kind, plain) returning the plain data of the
+# next version. Add one whenever the plain form of a model changes, then
+# vmi.db.migrate rewrites the DB in the new schema.
+_SCHEMA_UPGRADES = {}
+
+# version 2 records of anything but a show.
+KIND_OBJECT = "object"
+KIND_SHOW = "show"
+# one segment of a show record.
+KIND_SEASON = "season"
+KIND_SHOW_METADATA = "show_metadata"
+KIND_MOVIE = "movie"
+KIND_MOVIE_METADATA = "movie_metadata"
+KIND_DIRECTOR_METADATA = "director_metadata"
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+CODEC_LZ4 = "lz4"
+_CODEC_IDS = {CODEC_NONE: 0, CODEC_ZLIB: 1, CODEC_ZSTD: 2, CODEC_LZ4: 3}
+_CODEC_NAMES = {codec_id: name for name, codec_id in _CODEC_IDS.items()}
+DEFAULT_CODEC = CODEC_ZLIB
+
+# zlib level 1 is several times faster than the default for little size loss
+# on pickles.
+_ZLIB_LEVEL = 1
+_ZSTD_LEVEL = 3
+
+
+class RecordFormatError(Exception):
+    pass
+
+
+def _compress(codec, data):
+    if codec == CODEC_NONE:
+        return data
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, _ZLIB_LEVEL)
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    return lz4.frame.compress(data)
+
+
+def _decompress(codec, data):
+    if codec == CODEC_NONE:
+        return data
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    return lz4.frame.decompress(data)
+
+
+# Fails early if the codec is unknown, or needs a library that is not
+# installed.
+def check_codec(codec):
+    if codec not in _CODEC_IDS:
+        raise RecordFormatError("Unknown codec %s" % codec)
+    if (codec == CODEC_ZSTD and zstandard is None) or \
+            (codec == CODEC_LZ4 and lz4 is None):
+        raise RecordFormatError(
+            "Codec %s needs a library that is not installed" % codec)
+
+
+def _fields(obj, names):
+    return {name: getattr(obj, name) for name in names}
+
+
+_SHOW_METADATA_FIELDS = ("title", "slug", "rating", "imdb_id", "season_count")
+_MOVIE_METADATA_FIELDS = ("imdb_id", "title")
+_MOVIE_FIELDS = ("imdb_id", "title", "slug", "year", "rating", "budget",
+                 "opening_weekend", "boxoffice_usa", "boxoffice_worldwide",
+                 "runtime", "genre_list")
+
+
+def _plain_director_metadata(director_metadata):
+    plain = _fields(director_metadata, ("imdb_id", "name", "slug"))
+    plain["movie_metadata_list"] = [
+        _fields(movie_metadata, _MOVIE_METADATA_FIELDS)
+        for movie_metadata in director_metadata.movie_metadata_list]
+    return plain
+
+
+def _make_director_metadata(plain):
+    return DirectorMetadata(
+        plain["imdb_id"], plain["name"], plain["slug"],
+        [MovieMetadata(**movie_metadata)
+         for movie_metadata in plain["movie_metadata_list"]])
+
+
+# kind -> (model class, model to plain data, plain data to model), for every
+# model stored as a single segment.
+_PLAIN_MODELS = {
+    KIND_SHOW_METADATA: (
+        ShowMetadata,
+        lambda obj: _fields(obj, _SHOW_METADATA_FIELDS),
+        lambda plain: ShowMetadata(**plain)),
+    KIND_MOVIE: (
+        Movie,
+        lambda obj: _fields(obj, _MOVIE_FIELDS),
+        lambda plain: Movie(**plain)),
+    KIND_MOVIE_METADATA: (
+        MovieMetadata,
+        lambda obj: _fields(obj, _MOVIE_METADATA_FIELDS),
+        lambda plain: MovieMetadata(**plain)),
+    KIND_DIRECTOR_METADATA: (
+        DirectorMetadata, _plain_director_metadata, _make_director_metadata),
+}
+_KINDS = {cls: kind for kind, (cls, _, _) in _PLAIN_MODELS.items()}
+
+
+# Episodes are tuples of Episode's arguments, they are by far the most
+# numerous.
+def _plain_season(season):
+    return {
+        "number": season.number,
+        "episodes": [(e.index, e.season, e.number, e.title, e.score,
+                      e.imdb_id) for e in season.episode_list],
+    }
+
+
+def _make_season(plain):
+    return ArraySeason.from_rows(plain["number"], plain["episodes"])
+
+
+# Brings plain data of the given kind from schema up to SCHEMA_VERSION.
+def _upgrade(schema, kind, plain):
+    if schema > SCHEMA_VERSION:
+        raise RecordFormatError(
+            "Record schema version %d is newer than this code" % schema)
+    while schema < SCHEMA_VERSION:
+        plain = _SCHEMA_UPGRADES[schema](kind, plain)
+        schema += 1
+    return plain
+
+
+# Show records are split into one segment per season behind a small index
+# holding the show's metadata and a few per-episode columns, see LazyShow.
+# Every other model is a single segment. Records written before the episode
+# ids and numbers were added to the index lack them.
+def _show_meta(show):
+    episodes = [e for season in show.season_list for e in season.episode_list]
+    scores = array.array("f", [e.score for e in episodes])
+    episode_seasons = array.array("h", [e.season for e in episodes])
+    episode_numbers = array.array("h", [e.number for e in episodes])
+    return {
+        "title": show.title,
+        "slug": show.slug,
+        "rating": show.rating,
+        "imdb_id": show.imdb_id,
+        "season_count": show.season_count,
+        "episode_count": show.episode_count,
+        "season_numbers": [season.number for season in show.season_list],
+        "scores": scores.tobytes(),
+        "episode_ids": [e.imdb_id for e in episodes],
+        "episode_seasons": episode_seasons.tobytes(),
+        "episode_numbers": episode_numbers.tobytes(),
+    }
+
+
+def make_show(meta, season_list):
+    return Show(ShowMetadata(
+        meta["title"], meta["slug"], meta["rating"], meta["imdb_id"],
+        len(season_list)), season_list)
+
+
+def dumps(obj, codec=DEFAULT_CODEC):
+    if isinstance(obj, Show):
+        kind, meta = KIND_SHOW, _show_meta(obj)
+        payloads = [_plain_season(season) for season in obj.season_list]
+    elif type(obj) in _KINDS:
+        kind, meta = _KINDS[type(obj)], None
+        payloads = [_PLAIN_MODELS[kind][1](obj)]
+    else:
+        raise RecordFormatError("Cannot store a %s" % type(obj).__name__)
+    segments = []
+    body = []
+    offset = 0
+    for payload in payloads:
+        data = _compress(codec, pickle.dumps(payload, pickle.HIGHEST_PROTOCOL))
+        segments.append((offset, len(data)))
+        body.append(data)
+        offset += len(data)
+    index = pickle.dumps({
+        "kind": kind,
+        "schema": SCHEMA_VERSION,
+        # tells a reader holding an older index that the record changed.
+        "token": uuid.uuid4().hex,
+        "meta": meta,
+        "segments": segments,
+    }, pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, _CODEC_IDS[codec]) + \
+        _INDEX_LENGTH.pack(len(index)) + index + b"".join(body)
+
+
+# Returns (version, codec) of a record, or (None, None) for a legacy pickle.
+def read_header(data):
+    if not data.startswith(MAGIC):
+        return None, None
+    _, version, codec_id = _HEADER.unpack_from(data)
+    if version > FORMAT_VERSION:
+        raise RecordFormatError(
+            "Record format version %d is newer than this code" % version)
+    if codec_id not in _CODEC_NAMES:
+        raise RecordFormatError("Unknown codec id %d" % codec_id)
+    return version, _CODEC_NAMES[codec_id]
+
+
+# Reads the header and index of the record in file f, leaving the body
+# unread. Returns (version, codec, index, body offset); index is None for
+# version 1 records, and everything is None for legacy pickles. The index of
+# a version 3 record has its show metadata upgraded to SCHEMA_VERSION, but
+# still names the schema the segments were written in.
+def read_index(f):
+    version, codec = read_header(f.read(_HEADER.size))
+    if version is None:
+        return None, None, None, None
+    check_codec(codec)
+    if version == 1:
+        return version, codec, None, _HEADER.size
+    (length,) = _INDEX_LENGTH.unpack(f.read(_INDEX_LENGTH.size))
+    index = pickle.loads(f.read(length))
+    if version >= 3 and index["kind"] == KIND_SHOW:
+        index["meta"] = _upgrade(index["schema"], KIND_SHOW, index["meta"])
+    return version, codec, index, _HEADER.size + _INDEX_LENGTH.size + length
+
+
+def load_segment(codec, data):
+    return pickle.loads(_decompress(codec, data))
+
+
+# Loads one season segment of a show record with the given index.
+def load_season(codec, index, data):
+    season = load_segment(codec, data)
+    if "schema" not in index:
+        # version 2 records pickled the Season itself.
+        return season
+    return _make_season(_upgrade(index["schema"], KIND_SEASON, season))
+
+
+def loads(data):
+    version, codec, index, body_offset = read_index(io.BytesIO(data))
+    if version is None:
+        return pickle.loads(data)
+    if index is None:
+        return load_segment(codec, data[body_offset:])
+    segments = [data[body_offset + offset:body_offset + offset + length]
+                for offset, length in index["segments"]]
+    kind = index["kind"]
+    if kind == KIND_SHOW:
+        return make_show(index["meta"], [
+            load_season(codec, index, segment) for segment in segments])
+    if kind == KIND_OBJECT:
+        return load_segment(codec, segments[0])
+    if kind not in _PLAIN_MODELS:
+        raise RecordFormatError("Unknown record kind %s" % kind)
+    return _PLAIN_MODELS[kind][2](_upgrade(
+        index["schema"], kind, load_segment(codec, segments[0])))
+
+
+# Whether a record is already in the current format and schema, with the
+# given codec.
+def is_current(data, codec=DEFAULT_CODEC):
+    if read_header(data) != (FORMAT_VERSION, codec):
+        return False
+    _, _, index, _ = read_index(io.BytesIO(data))
+    return index["schema"] == SCHEMA_VERSION
@@ -0,0 +1,190 @@
+import dbm
+import hashlib
+import json
+import logging
+import sys
+import weakref
+
+from contextlib import contextmanager
+from pathlib import Path
+
+from vmi.db.lazy import LazyShow
+from vmi.db.lock import KeyLocks
+from vmi.db.pickler import DIRECTORS, SHOWS, Pickler
+from vmi.util.logger import LoggerConfig
+
+_EPISODE_INDEX_PATH = "data/index/episodes"
+_MOVIE_INDEX_PATH = "data/index/movies"
+_LOCK_KEY = "index"
+
+
+def _get(db, key):
+    value = db.get(key)
+    return json.loads(value) if value is not None else None
+
+
+# Episode imdb id -> [show imdb id, season number, episode number] of every
+# episode of the show. Lazily loaded shows have them without loading any
+# season, unless their record predates the episode columns.
+def _show_episodes(show):
+    if isinstance(show, LazyShow) and show.episode_ids is not None:
+        return {episode_id: [show.imdb_id, season, number]
+                for episode_id, season, number in zip(
+                    show.episode_ids, show.episode_seasons,
+                    show.episode_numbers)}
+    return {episode.imdb_id: [show.imdb_id, season.number, episode.number]
+            for season in show.season_list
+            for episode in season.episode_list}
+
+
+# Digest of what the index holds for a show, to tell whether it is current.
+def _digest(episodes):
+    data = json.dumps(sorted(episodes.items())).encode()
+    return hashlib.sha1(data).hexdigest()
+
+
+# Persistent key -> json value map on top of dbm, safe to share between
+# processes. Lookups open the db read-only under a shared lock, updates open
+# it under an exclusive one.
+class DbmIndex:
+    def __init__(self, path):
+        # ensure the parent directory exists.
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.locks = KeyLocks(path + ".locks")
+
+    def get(self, key):
+        with self.locks.shared(_LOCK_KEY):
+            try:
+                db = dbm.open(self.path, "r")
+            except dbm.error:
+                # nothing was written yet.
+                return None
+            with db:
+                return _get(db, key)
+
+    # Yields the db open for writing. Reads made through it see a consistent
+    # view, no other process writes meanwhile.
+    @contextmanager
+    def _write(self):
+        with self.locks.exclusive(_LOCK_KEY):
+            with dbm.open(self.path, "c") as db:
+                yield db
+
+
+# Maps episode imdb ids to (show imdb id, season number, episode number), so
+# an episode can be put in context without loading any show. Every show also
+# has a "show:" entry with its episode ids and the _digest of its episodes.
+class EpisodeIndex(DbmIndex):
+    def __init__(self, path=_EPISODE_INDEX_PATH):
+        super().__init__(path)
+        # imdb id -> Show last synced by this process.
+        self.synced = weakref.WeakValueDictionary()
+
+    def lookup(self, episode_id):
+        value = self.get(episode_id)
+        return tuple(value) if value else None
+
+    # Episode ids of the show as indexed. Older indexes stored a bare list
+    # without a digest.
+    @staticmethod
+    def _show_entry(db, show_id):
+        entry = _get(db, "show:" + show_id)
+        if isinstance(entry, list):
+            return {"episodes": entry, "digest": None}
+        return entry or {"episodes": [], "digest": None}
+
+    # Drops the episode, unless it is gone already or has moved to another
+    # show since.
+    @staticmethod
+    def _drop_episode(db, episode_id, show_id):
+        value = _get(db, episode_id)
+        if value is not None and value[0] == show_id:
+            del db[episode_id]
+
+    def _add_episodes(self, show_id, episodes):
+        with self._write() as db:
+            for episode_id in self._show_entry(db, show_id)["episodes"]:
+                if episode_id not in episodes:
+                    self._drop_episode(db, episode_id, show_id)
+            for episode_id, value in episodes.items():
+                db[episode_id] = json.dumps(value)
+            db["show:" + show_id] = json.dumps({
+                "episodes": sorted(episodes), "digest": _digest(episodes)})
+
+    def add_show(self, show):
+        self._add_episodes(show.imdb_id, _show_episodes(show))
+        self.synced[show.imdb_id] = show
+
+    # Indexes the show unless it already is, as told by the digest of its
+    # episodes. Cached shows are checked without loading any season.
+    def sync_show(self, show):
+        if self.synced.get(show.imdb_id) is show:
+            return
+        episodes = _show_episodes(show)
+        entry = self.get("show:" + show.imdb_id)
+        if not isinstance(entry, dict) or \
+                entry["digest"] != _digest(episodes):
+            self._add_episodes(show.imdb_id, episodes)
+        self.synced[show.imdb_id] = show
+
+    def remove_show(self, show_id):
+        self.synced.pop(show_id, None)
+        with self._write() as db:
+            for episode_id in self._show_entry(db, show_id)["episodes"]:
+                self._drop_episode(db, episode_id, show_id)
+            if "show:" + show_id in db:
+                del db["show:" + show_id]
+
+
+# Maps movie imdb ids to the imdb ids of the cached directors who directed
+# them.
+class MovieIndex(DbmIndex):
+    def __init__(self, path=_MOVIE_INDEX_PATH):
+        super().__init__(path)
+
+    def lookup(self, movie_id):
+        return self.get(movie_id) or []
+
+    def add_director(self, director_metadata):
+        director_id = director_metadata.imdb_id
+        movie_ids = [m.imdb_id for m in director_metadata.movie_metadata_list]
+        with self._write() as db:
+            old_movie_ids = _get(db, "director:" + director_id) or []
+            for movie_id in set(movie_ids) | set(old_movie_ids):
+                director_ids = [d for d in _get(db, movie_id) or []
+                                if d != director_id]
+                if movie_id in movie_ids:
+                    director_ids.append(director_id)
+                db[movie_id] = json.dumps(director_ids)
+            db["director:" + director_id] = json.dumps(movie_ids)
+
+    # Indexes the director unless it already is.
+    def sync_director(self, director_metadata):
+        if self.get("director:" + director_metadata.imdb_id) != \
+                [m.imdb_id for m in director_metadata.movie_metadata_list]:
+            self.add_director(director_metadata)
+
+
+# Indexes every show and director of the pickle DB.
+def build(pickler, episode_index, movie_index):
+    for key in pickler.keys(SHOWS):
+        episode_index.sync_show(pickler.get(key))
+    for key in pickler.keys(DIRECTORS):
+        movie_index.sync_director(pickler.get(key))
+
+
+# module testing only
+if __name__ == "__main__":
+    LoggerConfig()
+    episode_index = EpisodeIndex()
+    movie_index = MovieIndex()
+    if len(sys.argv) < 2:
+        print("Usage: python -m vmi.db.secondary build | <IMDB ID>")
+        raise SystemExit(1)
+    if sys.argv[1] == "build":
+        build(Pickler("data/pickles/"), episode_index, movie_index)
+        logging.info("Done indexing the pickle DB")
+    else:
+        print(episode_index.lookup(sys.argv[1]) or
+              movie_index.lookup(sys.argv[1]))
@@ -0,0 +1,286 @@
+import json
+import sqlite3
+import threading
+
+from decimal import Decimal
+from pathlib import Path
+
+from vmi.db.lock import KeyLocks
+from vmi.model.director import DirectorMetadata
+from vmi.model.episode import Episode
+from vmi.model.movie import Movie, MovieMetadata
+from vmi.model.season import Season
+from vmi.model.show import Show, ShowMetadata
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    imdb_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS shows (
+    imdb_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    rating TEXT
+);
+CREATE INDEX IF NOT EXISTS shows_slug ON shows (slug);
+
+CREATE TABLE IF NOT EXISTS seasons (
+    show_id TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    PRIMARY KEY (show_id, number)
+);
+
+CREATE TABLE IF NOT EXISTS episodes (
+    show_id TEXT NOT NULL,
+    season INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    imdb_id TEXT NOT NULL,
+    title TEXT,
+    score REAL NOT NULL,
+    PRIMARY KEY (show_id, idx)
+);
+CREATE INDEX IF NOT EXISTS episodes_imdb_id ON episodes (imdb_id);
+CREATE INDEX IF NOT EXISTS episodes_season ON episodes (show_id, season);
+CREATE INDEX IF NOT EXISTS episodes_score ON episodes (score);
+
+CREATE TABLE IF NOT EXISTS directors (
+    imdb_id TEXT PRIMARY KEY,
+    name TEXT,
+    slug TEXT
+);
+CREATE INDEX IF NOT EXISTS directors_slug ON directors (slug);
+
+CREATE TABLE IF NOT EXISTS director_movies (
+    director_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    movie_id TEXT NOT NULL,
+    title TEXT,
+    PRIMARY KEY (director_id, position)
+);
+CREATE INDEX IF NOT EXISTS director_movies_movie_id
+    ON director_movies (movie_id);
+
+CREATE TABLE IF NOT EXISTS movies (
+    imdb_id TEXT PRIMARY KEY,
+    title TEXT,
+    slug TEXT,
+    year TEXT,
+    rating REAL,
+    budget TEXT,
+    opening_weekend TEXT,
+    boxoffice_usa TEXT,
+    boxoffice_worldwide TEXT,
+    runtime INTEGER,
+    genres TEXT
+);
+CREATE INDEX IF NOT EXISTS movies_slug ON movies (slug);
+CREATE INDEX IF NOT EXISTS movies_rating ON movies (rating);
+"""
+
+_SHOW = "show"
+_DIRECTOR = "director"
+_MOVIE = "movie"
+
+# Child tables of every kind, and the column holding the parent imdb id.
+_TABLES = {
+    _SHOW: [("episodes", "show_id"), ("seasons", "show_id"),
+            ("shows", "imdb_id")],
+    _DIRECTOR: [("director_movies", "director_id"), ("directors", "imdb_id")],
+    _MOVIE: [("movies", "imdb_id")],
+}
+
+
+def _to_text(num):
+    return None if num is None else str(num)
+
+
+def _to_decimal(text):
+    return None if text is None else Decimal(text)
+
+
+# Storage engine with the same has/get/put/remove interface as Pickler, but
+# backed by one SQLite file with normalized, indexed tables for shows,
+# seasons, episodes, directors and movies. Unlike the pickle DB it can answer
+# queries across the whole catalog, see episodes_below.
+class SqliteStore:
+    def __init__(self, dbpath):
+        Path(dbpath).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(dbpath, check_same_thread=False)
+        self.lock = threading.Lock()
+        # only used for get_or_create, sqlite locks the rest itself.
+        self.key_locks = KeyLocks(dbpath + ".locks")
+        with self.lock, self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def _kind(self, imdb_id):
+        row = self.conn.execute(
+            "SELECT kind FROM records WHERE imdb_id = ?", (imdb_id,)).fetchone()
+        return row[0] if row else None
+
+    def has(self, key):
+        with self.lock:
+            return self._kind(key.imdb_id) is not None
+
+    def get(self, key):
+        with self.lock:
+            kind = self._kind(key.imdb_id)
+            if kind == _SHOW:
+                return self._get_show(key.imdb_id)
+            if kind == _DIRECTOR:
+                return self._get_director(key.imdb_id)
+            if kind == _MOVIE:
+                return self._get_movie(key.imdb_id)
+            raise KeyError(key.imdb_id)
+
+    def put(self, obj):
+        if isinstance(obj, Show):
+            kind, put = _SHOW, self._put_show
+        elif isinstance(obj, DirectorMetadata):
+            kind, put = _DIRECTOR, self._put_director
+        elif isinstance(obj, Movie):
+            kind, put = _MOVIE, self._put_movie
+        else:
+            raise TypeError("Cannot store %s" % type(obj).__name__)
+        with self.lock, self.conn:
+            self._delete(obj.imdb_id)
+            self.conn.execute(
+                "INSERT INTO records (imdb_id, kind) VALUES (?, ?)",
+                (obj.imdb_id, kind))
+            put(obj)
+
+    def remove(self, key):
+        with self.lock, self.conn:
+            self._delete(key.imdb_id)
+
+    # Same single-flight contract as Pickler.get_or_create.
+    def get_or_create(self, key, create):
+        if self.has(key):
+            return self.get(key)
+        with self.key_locks.exclusive(key.imdb_id):
+            if self.has(key):
+                return self.get(key)
+            obj = create()
+            self.put(obj)
+            return obj
+
+    def _delete(self, imdb_id):
+        kind = self._kind(imdb_id)
+        if kind is None:
+            return
+        for table, column in _TABLES[kind]:
+            self.conn.execute(
+                "DELETE FROM %s WHERE %s = ?" % (table, column), (imdb_id,))
+        self.conn.execute("DELETE FROM records WHERE imdb_id = ?", (imdb_id,))
+
+    def _put_show(self, show):
+        self.conn.execute(
+            "INSERT INTO shows (imdb_id, title, slug, rating) "
+            "VALUES (?, ?, ?, ?)",
+            (show.imdb_id, show.title, show.slug, _to_text(show.rating)))
+        self.conn.executemany(
+            "INSERT INTO seasons (show_id, number) VALUES (?, ?)",
+            [(show.imdb_id, season.number) for season in show.season_list])
+        self.conn.executemany(
+            "INSERT INTO episodes "
+            "(show_id, season, number, idx, imdb_id, title, score) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(show.imdb_id, season.number, e.number, e.index, e.imdb_id,
+              e.title, e.score)
+             for season in show.season_list for e in season.episode_list])
+
+    def _make_episode(self, row):
+        season, number, index, imdb_id, title, score = row
+        return Episode(
+            index=index,
+            season=season,
+            number=number,
+            title=title,
+            score=score,
+            imdb_id=imdb_id)
+
+    def _get_show(self, imdb_id):
+        title, slug, rating = self.conn.execute(
+            "SELECT title, slug, rating FROM shows WHERE imdb_id = ?",
+            (imdb_id,)).fetchone()
+        episode_lists = {}
+        for (number,) in self.conn.execute(
+                "SELECT number FROM seasons WHERE show_id = ? ORDER BY number",
+                (imdb_id,)):
+            episode_lists[number] = []
+        for row in self.conn.execute(
+                "SELECT season, number, idx, imdb_id, title, score "
+                "FROM episodes WHERE show_id = ? ORDER BY idx", (imdb_id,)):
+            episode_lists[row[0]].append(self._make_episode(row))
+        season_list = [Season(number, episode_list)
+                       for number, episode_list in episode_lists.items()]
+        show_metadata = ShowMetadata(
+            title, slug, rating, imdb_id, len(season_list))
+        return Show(show_metadata, season_list)
+
+    def _put_director(self, director_metadata):
+        self.conn.execute(
+            "INSERT INTO directors (imdb_id, name, slug) VALUES (?, ?, ?)",
+            (director_metadata.imdb_id, director_metadata.name,
+             director_metadata.slug))
+        self.conn.executemany(
+            "INSERT INTO director_movies "
+            "(director_id, position, movie_id, title) VALUES (?, ?, ?, ?)",
+            [(director_metadata.imdb_id, i, m.imdb_id, m.title)
+             for i, m in enumerate(director_metadata.movie_metadata_list)])
+
+    def _get_director(self, imdb_id):
+        name, slug = self.conn.execute(
+            "SELECT name, slug FROM directors WHERE imdb_id = ?",
+            (imdb_id,)).fetchone()
+        movie_metadata_list = [
+            MovieMetadata(imdb_id=movie_id, title=title)
+            for movie_id, title in self.conn.execute(
+                "SELECT movie_id, title FROM director_movies "
+                "WHERE director_id = ? ORDER BY position", (imdb_id,))]
+        return DirectorMetadata(imdb_id, name, slug, movie_metadata_list)
+
+    def _put_movie(self, movie):
+        self.conn.execute(
+            "INSERT INTO movies (imdb_id, title, slug, year, rating, budget, "
+            "opening_weekend, boxoffice_usa, boxoffice_worldwide, runtime, "
+            "genres) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (movie.imdb_id, movie.title, movie.slug, movie.year, movie.rating,
+             _to_text(movie.budget), _to_text(movie.opening_weekend),
+             _to_text(movie.boxoffice_usa),
+             _to_text(movie.boxoffice_worldwide), movie.runtime,
+             json.dumps(movie.genre_list)))
+
+    def _get_movie(self, imdb_id):
+        row = self.conn.execute(
+            "SELECT title, slug, year, rating, budget, opening_weekend, "
+            "boxoffice_usa, boxoffice_worldwide, runtime, genres "
+            "FROM movies WHERE imdb_id = ?", (imdb_id,)).fetchone()
+        (title, slug, year, rating, budget, opening_weekend, boxoffice_usa,
+         boxoffice_worldwide, runtime, genres) = row
+        return Movie(
+            imdb_id=imdb_id,
+            title=title,
+            slug=slug,
+            year=year,
+            rating=rating,
+            budget=_to_decimal(budget),
+            opening_weekend=_to_decimal(opening_weekend),
+            boxoffice_usa=_to_decimal(boxoffice_usa),
+            boxoffice_worldwide=_to_decimal(boxoffice_worldwide),
+            runtime=runtime,
+            genre_list=json.loads(genres))
+
+    # All episodes across the catalog scoring below max_score, worst first,
+    # as (show title, Episode) pairs. Served from the score index.
+    def episodes_below(self, max_score):
+        with self.lock:
+            return [(row[0], self._make_episode(row[1:]))
+                    for row in self.conn.execute(
+                        "SELECT s.title, e.season, e.number, e.idx, "
+                        "e.imdb_id, e.title, e.score "
+                        "FROM episodes e JOIN shows s ON e.show_id = s.imdb_id "
+                        "WHERE e.score < ? ORDER BY e.score, e.show_id, e.idx",
+                        (max_score,))]
@@ -0,0 +1,111 @@
+import numpy as np
+import weakref
+
+from vmi.model.season import ArraySeason, Season
+
+# Show or Season -> its ShowFrame, which knows the version of the model it
+# was built from. Entries go away with the model.
+_frames = weakref.WeakKeyDictionary()
+
+
+# Version of a model, for memos like _frames. A LazyShow that follows a
+# rewrite of its record stays the same object, with a new token.
+def model_version(model):
+    return getattr(model, "token", None)
+
+
+# Raised when a ShowFrame needs a season its model no longer has, because
+# the model moved on to a new version since the frame was built.
+class StaleFrameError(Exception):
+    pass
+
+
+# index, number and score columns of the episodes of a season. ArraySeasons
+# already hold them, other seasons are read episode by episode.
+def _season_columns(season):
+    if isinstance(season, ArraySeason):
+        return season.indexes, season.numbers, season.scores
+    episodes = season.episode_list
+    return ([e.index for e in episodes], [e.number for e in episodes],
+            [e.score for e in episodes])
+
+
+# Episodes of a show (or of a single season) as contiguous NumPy columns,
+# season after season. Rows offsets[i]:offsets[i+1] belong to the i-th
+# season. Only the columns are kept, episode(row) looks up the episode
+# itself. Build it with show_frame, which builds it once per model.
+class ShowFrame:
+    def __init__(self, season_list, model=None):
+        season_list = list(season_list)
+        # weak, so a frame in _frames doesn't keep its model alive.
+        self.seasons = [weakref.ref(season) for season in season_list]
+        self.model = weakref.ref(model) if model is not None else None
+        # read after the seasons, loading them may switch to a new record.
+        self.version = model_version(model)
+        self.season_numbers = [season.number for season in season_list]
+        columns = [_season_columns(season) for season in season_list]
+        counts = [len(scores) for _, _, scores in columns]
+        self.offsets = np.cumsum([0] + counts)
+        self.index = np.concatenate(
+            [np.asarray(index, dtype=np.int64) for index, _, _ in columns] +
+            [np.empty(0, dtype=np.int64)])
+        self.season = np.repeat(
+            np.asarray(self.season_numbers, dtype=np.int64), counts)
+        self.number = np.concatenate(
+            [np.asarray(number, dtype=np.int64) for _, number, _ in columns] +
+            [np.empty(0, dtype=np.int64)])
+        self.score = np.concatenate(
+            [np.asarray(score, dtype=np.float64) for _, _, score in columns] +
+            [np.empty(0, dtype=np.float64)])
+
+    @property
+    def episode_count(self):
+        return len(self.score)
+
+    @property
+    def season_count(self):
+        return len(self.season_numbers)
+
+    def season_rows(self, i):
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    # The episode at row.
+    def episode(self, row):
+        i = np.searchsorted(self.offsets, row, side="right") - 1
+        season = self.seasons[i]()
+        if season is None:
+            season = self._reload_season(i)
+        return season.episode_list[row - self.offsets[i]]
+
+    # A LazyShow that was reset drops its seasons. As long as it still
+    # follows the same record, the season is read back from it.
+    def _reload_season(self, i):
+        model = self.model() if self.model is not None else None
+        if model is None or model_version(model) != self.version:
+            raise StaleFrameError(
+                "Season %d is no longer in the frame's model" %
+                self.season_numbers[i])
+        season = model.season_list[i]
+        if model_version(model) != self.version:
+            raise StaleFrameError(
+                "Season %d is no longer in the frame's model" %
+                self.season_numbers[i])
+        self.seasons[i] = weakref.ref(season)
+        return season
+
+    # Episode labels of rows, like Episode.label, made from the columns.
+    def labels(self, rows=slice(None)):
+        return ["%02dx%02d" % (season, number) for season, number in
+                zip(self.season[rows].tolist(), self.number[rows].tolist())]
+
+
+# Frame of a show or a season, built once per version of the model.
+def show_frame(show_or_season):
+    frame = _frames.get(show_or_season)
+    if frame is None or frame.version != model_version(show_or_season):
+        if isinstance(show_or_season, (Season, ArraySeason)):
+            frame = ShowFrame([show_or_season], show_or_season)
+        else:
+            frame = ShowFrame(show_or_season.season_list, show_or_season)
+        _frames[show_or_season] = frame
+    return frame
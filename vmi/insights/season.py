@@ -1,9 +1,7 @@
-import statistics
 import sys
 
-from scipy.stats import linregress
-
 from vmi.db.db import DbClient
+from vmi.insights.summary import summarize
 from vmi.model.episode import Episode
 from vmi.model.season import Season
 from vmi.model.show import Show
@@ -14,22 +12,30 @@ class SeasonInsights:
     def __init__(self, season):
         self.season = season
 
+    # summary statistics, shared by every insights of the same season.
+    @property
+    def summary(self):
+        return summarize(self.season)
+
     @property
     def worst_episode(self):
-        return min(self.season.episode_list, key=lambda e: e.score)
+        return self.summary.worst_episode
 
     @property
     def best_episode(self):
-        return max(self.season.episode_list, key=lambda e: e.score)
+        return self.summary.best_episode
 
     @property
     def avg_episode_rating(self):
-        return statistics.mean([e.score for e in self.season.episode_list])
+        return self.summary.avg_episode_rating
+
+    @property
+    def stdev(self):
+        return self.summary.stdev
 
     @property
     def slope(self):
-        return linregress([i for i in range(self.season.episode_count)], [
-                          e.score for e in self.season.episode_list]).slope
+        return self.summary.slope
 
 
 # module testing only
@@ -47,6 +53,7 @@ if __name__ == "__main__":
     print(f"Season {season.number}")
     print(f"  slope: {insights.slope * 100:.1f}%")
     print(f"  avg episode rating: {insights.avg_episode_rating:.2f}/10")
+    print(f"  stdev: {insights.stdev:.2f}")
     b = insights.best_episode
     print(
         f"  best:  ({b.number}/{season.episode_count}) {b.title} ({b.score}/10)")
@@ -1,10 +1,7 @@
-import itertools
-import statistics
 import sys
 
-from scipy.stats import linregress
-
 from vmi.insights.season import SeasonInsights
+from vmi.insights.summary import summarize
 from vmi.model.episode import Episode
 from vmi.model.season import Season
 from vmi.model.show import Show
@@ -16,27 +13,84 @@ class ShowInsights:
     def __init__(self, show):
         self.show = show
 
+    # summary statistics, shared by every insights of the same show.
+    @property
+    def summary(self):
+        return summarize(self.show)
+
     @property
     def worst_episode(self):
-        return min(self.all_episodes, key=lambda e: e.score)
+        return self.summary.worst_episode
 
     @property
     def best_episode(self):
-        return max(self.all_episodes, key=lambda e: e.score)
+        return self.summary.best_episode
 
     @property
     def avg_episode_rating(self):
-        return statistics.mean([e.score for e in self.all_episodes])
+        return self.summary.avg_episode_rating
 
+    # a new tuple every time, nothing keeps the episodes around.
     @property
     def all_episodes(self):
-        return list(itertools.chain.from_iterable(
-            [season.episode_list for season in self.show.season_list]))
+        return tuple(e for season in self.show.season_list
+                     for e in season.episode_list)
+
+    @property
+    def stdev(self):
+        return self.summary.stdev
+
+    @property
+    def slope(self):
+        return self.summary.slope
+
+
+# ShowInsights for a show that arrives one season at a time, see
+# DbClient.stream_show. Every stat is kept up to date as seasons are added,
+# without going back over earlier episodes.
+class RunningShowInsights:
+    def __init__(self):
+        self.season_count = 0
+        self.episode_count = 0
+        self.worst_episode = None
+        self.best_episode = None
+        # running sums for the mean and the least squares slope, with x being
+        # the position of the episode in the show.
+        self._sum_x = 0
+        self._sum_y = 0
+        self._sum_xx = 0
+        self._sum_xy = 0
+
+    def add_season(self, season):
+        self.season_count += 1
+        for episode in season.episode_list:
+            x = self.episode_count
+            y = episode.score
+            self.episode_count += 1
+            self._sum_x += x
+            self._sum_y += y
+            self._sum_xx += x * x
+            self._sum_xy += x * y
+            if self.worst_episode is None or y < self.worst_episode.score:
+                self.worst_episode = episode
+            if self.best_episode is None or y > self.best_episode.score:
+                self.best_episode = episode
+
+    # nan until the first episode is in, like Summary.
+    @property
+    def avg_episode_rating(self):
+        if not self.episode_count:
+            return float("nan")
+        return self._sum_y / self.episode_count
 
+    # nan with fewer than two episodes, like Summary.
     @property
     def slope(self):
-        return linregress([i for i in range(self.show.episode_count)], [
-                          e.score for e in self.all_episodes]).slope
+        n = self.episode_count
+        if n < 2:
+            return float("nan")
+        return (n * self._sum_xy - self._sum_x * self._sum_y) / \
+            (n * self._sum_xx - self._sum_x * self._sum_x)
 
 
 if __name__ == "__main__":
@@ -56,6 +110,7 @@ if __name__ == "__main__":
     print("  imdb rating: %s/10" % show.rating)
     print("  avg episode rating: {avg_episode_rating:.2f}/10".format(
         avg_episode_rating=insights.avg_episode_rating))
+    print("  stdev: {stdev:.2f}".format(stdev=insights.stdev))
     best = insights.best_episode
     print("  best:  {label} - {title} ({score}/10)".format(
         label=best.label,
@@ -76,6 +131,7 @@ if __name__ == "__main__":
             slope_percent=insights.slope * 100))
         print("  avg episode rating: {avg_episode_rating:.2f}/10".format(
             avg_episode_rating=insights.avg_episode_rating))
+        print("  stdev: {stdev:.2f}".format(stdev=insights.stdev))
         best = insights.best_episode
         print(
             "  best:  ({number}/{episode_count}) {title} ({score}/10)".format(
@@ -0,0 +1,92 @@
+import numpy as np
+import weakref
+
+from vmi.insights.frame import model_version, show_frame
+from vmi.model.season import ArraySeason, Season
+
+# Show or Season -> (version, its Summary), see model_version. Entries go
+# away with the model.
+_summaries = weakref.WeakKeyDictionary()
+
+
+# Summary statistics of the episode scores of a show or a season. x is the
+# position of the episode in the show (or season) for the slope, and ties
+# go to the earliest episode, like min() and max() do.
+class Summary:
+    def __init__(
+            self, episode_count, worst_episode, best_episode,
+            avg_episode_rating, stdev, slope):
+        self.episode_count = episode_count
+        self.worst_episode = worst_episode
+        self.best_episode = best_episode
+        self.avg_episode_rating = avg_episode_rating
+        # sample standard deviation, nan with fewer than two episodes.
+        self.stdev = stdev
+        # least squares slope, nan with fewer than two episodes.
+        self.slope = slope
+
+
+# Summaries of every group of rows of a ShowFrame at once. group gives the
+# group of every row and x its position within the group.
+def _summarize_groups(frame, group, x, group_count):
+    y = frame.score
+    n = np.bincount(group, minlength=group_count).astype(np.float64)
+    sum_x = np.bincount(group, weights=x, minlength=group_count)
+    sum_y = np.bincount(group, weights=y, minlength=group_count)
+    sum_xx = np.bincount(group, weights=x * x, minlength=group_count)
+    sum_xy = np.bincount(group, weights=x * y, minlength=group_count)
+    sum_yy = np.bincount(group, weights=y * y, minlength=group_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sum_y / n
+        variance = np.maximum(sum_yy - sum_y * mean, 0) / (n - 1)
+        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x * sum_x)
+    too_few = n < 2
+    stdev = np.where(too_few, np.nan, np.sqrt(variance))
+    slope = np.where(too_few, np.nan, slope)
+
+    # the first row of every group once sorted by score, earliest first.
+    rows = np.arange(len(y))
+    firsts = np.searchsorted(group[np.lexsort((rows, group))],
+                             np.arange(group_count))
+    worst = np.lexsort((rows, y, group))[firsts[n > 0]]
+    best = np.lexsort((rows, -y, group))[firsts[n > 0]]
+
+    summaries = []
+    worst_best = iter(zip(worst, best))
+    for i in range(group_count):
+        worst_episode = best_episode = None
+        if n[i] > 0:
+            w, b = next(worst_best)
+            worst_episode = frame.episode(w)
+            best_episode = frame.episode(b)
+        summaries.append(Summary(
+            int(n[i]), worst_episode, best_episode, float(mean[i]),
+            float(stdev[i]), float(slope[i])))
+    return summaries
+
+
+# Summary of a show or a season, computed once per version of the model.
+# Summarizing a show computes all of its seasons in the same pass, and
+# remembers those too.
+def summarize(show_or_season):
+    version, summary = _summaries.get(show_or_season, (None, None))
+    if summary is not None and version == model_version(show_or_season):
+        return summary
+    frame = show_frame(show_or_season)
+    rows = np.arange(frame.episode_count)
+    (summary,) = _summarize_groups(
+        frame, np.zeros(len(rows), dtype=np.int64), rows.astype(np.float64), 1)
+    _summaries[show_or_season] = (frame.version, summary)
+    if isinstance(show_or_season, (Season, ArraySeason)):
+        return summary
+
+    counts = np.diff(frame.offsets)
+    group = np.repeat(np.arange(frame.season_count), counts)
+    x = (rows - np.repeat(frame.offsets[:-1], counts)).astype(np.float64)
+    season_summaries = _summarize_groups(frame, group, x, frame.season_count)
+    for season_ref, season_summary in zip(frame.seasons, season_summaries):
+        # seasons dropped by a reset LazyShow have nothing to remember.
+        season = season_ref()
+        if season is not None:
+            _summaries.setdefault(season, (None, season_summary))
+    return summary
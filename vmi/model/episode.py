@@ -1,4 +1,9 @@
-class Episode:
+from vmi.model.slots import Slotted
+
+
+class Episode(Slotted):
+    __slots__ = ("index", "season", "number", "title", "score", "imdb_id")
+
     def __init__(self, index, season, number, title, score, imdb_id):
         # overall episode index.
         self.index = index
@@ -12,9 +17,12 @@ class Episode:
         self.score = score
         # imdb id for this episode
         self.imdb_id = imdb_id
-        # short label for the episode
-        self.label = "{season:02d}x{number:02d}".format(
-            season=season, number=number)
+
+    # short label for the episode
+    @property
+    def label(self):
+        return "{season:02d}x{number:02d}".format(
+            season=self.season, number=self.number)
 
     def __str__(self):
         return "{label}: {title}".format(label=self.label, title=self.title)
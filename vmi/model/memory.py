@@ -0,0 +1,82 @@
+import sys
+import tracemalloc
+
+from vmi.model.episode import Episode
+from vmi.model.season import ArraySeason, Season
+
+_SEASONS = 1000
+_EPISODES_PER_SEASON = 20
+
+
+# Episode and Season as they were before they had slots.
+class _DictEpisode:
+    def __init__(self, index, season, number, title, score, imdb_id):
+        self.index = index
+        self.season = season
+        self.number = number
+        self.title = title
+        self.score = score
+        self.imdb_id = imdb_id
+        self.label = "{season:02d}x{number:02d}".format(
+            season=season, number=number)
+
+
+class _DictSeason:
+    def __init__(self, number, episode_list):
+        self.number = number
+        self.episode_list = episode_list
+        self.episode_count = len(episode_list)
+
+
+def _make_seasons(episode_cls, season_cls, season_count):
+    index = 0
+    seasons = []
+    for number in range(1, season_count + 1):
+        episode_list = []
+        for episode_number in range(1, _EPISODES_PER_SEASON + 1):
+            index += 1
+            episode_list.append(episode_cls(
+                index, number, episode_number, "Episode %d" % index,
+                5 + (index % 50) / 10, "tt%07d" % index))
+        seasons.append(season_cls(number, episode_list))
+    return seasons
+
+
+def _measure(make):
+    tracemalloc.start()
+    seasons = make()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, seasons
+
+
+# Seasons as the pickle DB loads them, see vmi.db.record.
+def _load_array_seasons(season_count, with_views=False):
+    seasons = [ArraySeason.from_rows(season.number, [
+        (e.index, e.season, e.number, e.title, e.score, e.imdb_id)
+        for e in season.episode_list])
+        for season in _make_seasons(_DictEpisode, _DictSeason, season_count)]
+    if with_views:
+        for season in seasons:
+            season.episode_list
+    return seasons
+
+
+# Bytes per episode of every season layout, for season_count seasons.
+def measure(season_count=_SEASONS):
+    episode_count = season_count * _EPISODES_PER_SEASON
+    layouts = [
+        ("dict", lambda: _make_seasons(_DictEpisode, _DictSeason, season_count)),
+        ("slots", lambda: _make_seasons(Episode, Season, season_count)),
+        ("array", lambda: _load_array_seasons(season_count)),
+        # once episode_list was used, its EpisodeViews stay around.
+        ("views", lambda: _load_array_seasons(season_count, with_views=True)),
+    ]
+    return [(name, _measure(make)[0] / episode_count) for name, make in layouts]
+
+
+# module testing only
+if __name__ == "__main__":
+    season_count = int(sys.argv[1]) if len(sys.argv) > 1 else _SEASONS
+    for name, per_episode in measure(season_count):
+        print("%6s: %6.1f bytes per episode" % (name, per_episode))
@@ -1,3 +1,6 @@
+from vmi.model.slots import Slotted
+
+
 class MovieMetadata:
     def __init__(self, imdb_id, title):
         # imdb id for this movie
@@ -6,7 +9,11 @@ class MovieMetadata:
         self.title = title
 
 
-class Movie:
+class Movie(Slotted):
+    __slots__ = ("imdb_id", "title", "slug", "year", "rating", "budget",
+                 "opening_weekend", "boxoffice_usa", "boxoffice_worldwide",
+                 "runtime", "genre_list")
+
     def __init__(
             self, imdb_id, title, slug, year, rating, budget,
             opening_weekend, boxoffice_usa, boxoffice_worldwide,
@@ -1,4 +1,9 @@
-class Review:
+from vmi.model.slots import Slotted
+
+
+class Review(Slotted):
+    __slots__ = ("title", "body")
+
     def __init__(self, title, body):
         # title of the review
         self.title = title
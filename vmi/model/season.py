@@ -1,4 +1,11 @@
-class Season:
+import array
+
+from vmi.model.slots import Slotted
+
+
+class Season(Slotted):
+    __slots__ = ("number", "episode_list", "episode_count", "__weakref__")
+
     def __init__(self, number, episode_list):
         # season number.
         self.number = number
@@ -10,3 +17,116 @@ class Season:
     def __str__(self):
         return "Season[season_number={number}, episode_count={episode_count}]".format(
             number=self.number, episode_count=self.episode_count)
+
+
+# Read-only view of one episode of an ArraySeason, with the same attributes
+# as Episode. It holds the season's columns rather than the season, so an
+# episode kept in a memo keyed on its season doesn't keep the season alive.
+class EpisodeView:
+    __slots__ = ("_columns", "_i")
+
+    # columns is (number, indexes, numbers, titles, scores, imdb_ids).
+    def __init__(self, columns, i):
+        self._columns = columns
+        self._i = i
+
+    @property
+    def index(self):
+        return self._columns[1][self._i]
+
+    @property
+    def season(self):
+        return self._columns[0]
+
+    @property
+    def number(self):
+        return self._columns[2][self._i]
+
+    @property
+    def title(self):
+        return self._columns[3][self._i]
+
+    @property
+    def score(self):
+        return self._columns[4][self._i]
+
+    @property
+    def imdb_id(self):
+        return self._columns[5][self._i]
+
+    @property
+    def label(self):
+        return "{season:02d}x{number:02d}".format(
+            season=self.season, number=self.number)
+
+    def __str__(self):
+        return "{label}: {title}".format(label=self.label, title=self.title)
+
+
+# Drop-in Season that keeps its episodes in typed arrays instead of one
+# object per episode. Seasons loaded from the pickle DB are ArraySeasons,
+# see vmi.db.record. episode_list hands out EpisodeViews over the arrays,
+# made once on first access.
+class ArraySeason(Slotted):
+    __slots__ = ("number", "indexes", "numbers", "scores", "titles",
+                 "imdb_ids", "views", "__weakref__")
+
+    def __init__(self, number, episode_list):
+        self._set_columns(
+            number,
+            [e.index for e in episode_list],
+            [e.number for e in episode_list],
+            [e.score for e in episode_list],
+            [e.title for e in episode_list],
+            [e.imdb_id for e in episode_list])
+
+    def _set_columns(self, number, indexes, numbers, scores, titles,
+                     imdb_ids):
+        self.number = number
+        self.indexes = array.array("i", indexes)
+        self.numbers = array.array("h", numbers)
+        self.scores = array.array("d", scores)
+        self.titles = list(titles)
+        self.imdb_ids = list(imdb_ids)
+        self.views = None
+
+    @classmethod
+    def from_season(cls, season):
+        return cls(season.number, season.episode_list)
+
+    # rows are tuples of Episode's arguments, no Episode is made.
+    @classmethod
+    def from_rows(cls, number, rows):
+        season = cls.__new__(cls)
+        columns = list(zip(*rows)) if rows else [()] * 6
+        indexes, _, numbers, titles, scores, imdb_ids = columns
+        season._set_columns(
+            number, indexes, numbers, scores, titles, imdb_ids)
+        return season
+
+    @property
+    def episode_count(self):
+        return len(self.scores)
+
+    @property
+    def episode_list(self):
+        if self.views is None:
+            columns = (self.number, self.indexes, self.numbers, self.titles,
+                       self.scores, self.imdb_ids)
+            self.views = [EpisodeView(columns, i)
+                          for i in range(len(self.scores))]
+        return self.views
+
+    # the views are rebuilt on demand.
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop("views", None)
+        return state
+
+    def __setstate__(self, state):
+        self.views = None
+        super().__setstate__(state)
+
+    def __str__(self):
+        return "Season[season_number={number}, episode_count={episode_count}]".format(
+            number=self.number, episode_count=self.episode_count)
@@ -1,3 +1,6 @@
+from vmi.model.slots import Slotted
+
+
 # Metadata about a particular show.
 class ShowMetadata:
     def __init__(self, title, slug, rating, imdb_id, season_count):
@@ -12,10 +15,18 @@ class ShowMetadata:
         # number of seasons.
         self.season_count = season_count
 
+    @classmethod
+    def from_show(cls, show):
+        return cls(show.title, show.slug, show.rating, show.imdb_id,
+                   show.season_count)
+
 
 # All data we care about from a particular show. This will be pickled up into
 # our mini, file-based database
-class Show:
+class Show(Slotted):
+    __slots__ = ("title", "slug", "rating", "imdb_id", "season_list",
+                 "season_count", "episode_count", "__weakref__")
+
     def __init__(self, show_metadata, season_list):
         self.title = show_metadata.title
         self.slug = show_metadata.slug
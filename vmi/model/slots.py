@@ -0,0 +1,23 @@
+# Base of the model classes that use __slots__ instead of a __dict__. Pickles
+# state as a plain dict, and also accepts the __dict__ of pickles written
+# before the models had slots. Keys that are no longer slots (like the
+# Episode.label string that used to be stored) are dropped.
+class Slotted:
+    __slots__ = ()
+
+    def _slot_names(self):
+        return [name for cls in type(self).__mro__
+                for name in getattr(cls, "__slots__", ())
+                if not name.startswith("__")]
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self._slot_names()
+                if hasattr(self, name)}
+
+    def __setstate__(self, state):
+        names = set(self._slot_names())
+        for name, value in state.items():
+            if name in names:
+                setattr(self, name, value)
+            elif hasattr(self, "__dict__"):
+                self.__dict__[name] = value
@@ -0,0 +1,221 @@
+import aiohttp
+import asyncio
+import logging
+import sys
+
+from urllib.parse import urlsplit
+
+from vmi.net import imdb, omdb
+from vmi.net.cache import CachePolicy
+from vmi.net.imdb import ImdbScraper, ImdbShowData, choose_parser
+from vmi.net.net import (make_director_metadata, make_movie, make_reviews,
+                         make_show, make_show_metadata)
+from vmi.net.omdb import OmdbApiClient
+from vmi.net.ratelimit import RateLimiter
+from vmi.net.session import ThrottledError, is_throttled, retry_delay
+
+# Number of connections kept open per host.
+_DEFAULT_CONNECTIONS_PER_HOST = 16
+_DEFAULT_CONNECT_TIMEOUT = 5
+_DEFAULT_READ_TIMEOUT = 30
+_DEFAULT_MAX_RETRIES = 5
+
+
+# asyncio counterpart of HttpSession, built on aiohttp. Requests go through
+# the same per-host RateLimiter (pass the sync session's limiter to share the
+# budgets) and, if given, the same CachePolicy as CachingSession. Throttled
+# responses and connection errors are retried with the same backoff.
+class AsyncHttpSession:
+    def __init__(
+            self,
+            connections_per_host=_DEFAULT_CONNECTIONS_PER_HOST,
+            connect_timeout=_DEFAULT_CONNECT_TIMEOUT,
+            read_timeout=_DEFAULT_READ_TIMEOUT,
+            max_retries=_DEFAULT_MAX_RETRIES,
+            url_map=None,
+            limiter=None,
+            cache=None):
+        self.connections_per_host = connections_per_host
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_retries = max_retries
+        # url prefix -> replacement prefix, e.g. to point the clients at a
+        # local stub server.
+        self.url_map = url_map if url_map else {}
+        self.limiter = limiter if limiter else RateLimiter()
+        self.cache = cache
+        self.session = None
+
+    def _rewrite(self, url):
+        for prefix, replacement in self.url_map.items():
+            if url.startswith(prefix):
+                return replacement + url[len(prefix):]
+        return url
+
+    # aiohttp sessions must be created from within the running loop.
+    def _get_session(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=0, limit_per_host=self.connections_per_host),
+                timeout=self.timeout)
+        return self.session
+
+    # Waits on the loop, not on a thread, until limiter lets a request go.
+    async def _acquire(self, limiter):
+        loop = asyncio.get_running_loop()
+        while True:
+            released = asyncio.Event()
+
+            def on_release():
+                loop.call_soon_threadsafe(released.set)
+            wait = limiter.try_acquire(on_release)
+            if wait == 0:
+                return
+            if wait is None:
+                # taken back even when cancelled, the loop may be gone by the
+                # next release.
+                try:
+                    await released.wait()
+                finally:
+                    limiter.cancel_waiter(on_release)
+            else:
+                await asyncio.sleep(wait)
+
+    # Returns (status, text, headers) of url, within the budget of host.
+    async def _fetch(self, url, host, headers):
+        session = self._get_session()
+        limiter = self.limiter.for_host(host)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(limiter)
+            throttled = True
+            response_headers = None
+            try:
+                async with session.get(url, headers=headers) as response:
+                    status = response.status
+                    text = await response.text()
+                    response_headers = response.headers
+                    throttled = is_throttled(status, text)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning("Request to %s failed: %r" % (host, e))
+            finally:
+                limiter.release(throttled)
+            if not throttled:
+                return status, text, response_headers
+            if attempt == self.max_retries:
+                break
+            await asyncio.sleep(retry_delay(attempt, response_headers))
+        raise ThrottledError(host)
+
+    # The cache and the rate budgets see the real url, only the request
+    # itself goes to the rewritten one.
+    async def get_text(self, url):
+        meta = body = headers = None
+        if self.cache is not None:
+            meta, body, headers = self.cache.lookup(url)
+            if headers is None:
+                return body
+        status, text, response_headers = await self._fetch(
+            self._rewrite(url), urlsplit(url).netloc, headers)
+        if self.cache is not None:
+            status, text = self.cache.update(
+                url, meta, body, status, text, response_headers)
+        return text
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+# asyncio counterpart of Net. Pages are fetched on the event loop, parsing runs
+# on an executor (the loop's default thread pool unless one is given) so the
+# loop stays free to drive other fetches. Like Net, the raw response cache is
+# set up from the environment unless a session is given.
+class AsyncNet:
+    def __init__(self, session=None, executor=None, parser=None):
+        if not session:
+            session = AsyncHttpSession(cache=CachePolicy.from_env())
+        self.session = session
+        self.executor = executor
+        # parse-only clients, they never fetch anything themselves.
+        self.omdb = OmdbApiClient()
+        self.imdb = ImdbScraper(parser=choose_parser(parser))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.session.close()
+
+    async def _parse(self, parser, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, parser, *args)
+
+    async def get_show_metadata(self, title):
+        text = await self.session.get_text(
+            omdb.show_metadata_url(title, self.omdb.apikey))
+        return make_show_metadata(
+            await self._parse(self.omdb.parse_show_metadata, title, text))
+
+    async def _get_season(self, show_metadata, season_number):
+        text = await self.session.get_text(
+            imdb.season_url(show_metadata.imdb_id, season_number))
+        return await self._parse(
+            self.imdb.scrape_season_html, text, season_number)
+
+    async def get_show(self, show_metadata):
+        show_data = ImdbShowData()
+        show_data.season_list = list(await asyncio.gather(
+            *[self._get_season(show_metadata, season_number)
+              for season_number in range(1, show_metadata.season_count + 1)]))
+        self.imdb.assign_indexes(show_data.season_list)
+        return make_show(show_metadata, show_data)
+
+    async def get_reviews(self, imdb_id):
+        text = await self.session.get_text(imdb.reviews_url(imdb_id))
+        return make_reviews(
+            await self._parse(self.imdb.scrape_reviews_html, text))
+
+    async def get_director_metadata(self, imdb_id):
+        text = await self.session.get_text(imdb.director_url(imdb_id))
+        return make_director_metadata(
+            imdb_id, await self._parse(self.imdb.scrape_director_html, text))
+
+    async def _get_omdb_movie_data(self, movie_metadata):
+        text = await self.session.get_text(
+            omdb.movie_data_url(movie_metadata.imdb_id, self.omdb.apikey))
+        return await self._parse(
+            self.omdb.parse_movie_data, movie_metadata, text)
+
+    async def _get_imdb_movie_data(self, movie_metadata):
+        text = await self.session.get_text(
+            imdb.movie_url(movie_metadata.imdb_id))
+        return await self._parse(self.imdb.scrape_movie_html, text)
+
+    async def get_movie(self, movie_metadata):
+        omdb_movie_data, imdb_movie_data = await asyncio.gather(
+            self._get_omdb_movie_data(movie_metadata),
+            self._get_imdb_movie_data(movie_metadata))
+        return make_movie(omdb_movie_data, imdb_movie_data)
+
+
+async def _main(titles):
+    async with AsyncNet() as net:
+        show_metadata_list = await asyncio.gather(
+            *[net.get_show_metadata(title) for title in titles])
+        for show in await asyncio.gather(
+                *[net.get_show(m) for m in show_metadata_list]):
+            print(show)
+
+
+# module testing only
+if __name__ == "__main__":
+    if (len(sys.argv)) < 2:
+        print("Usage: python -m vmi.net.aio <TITLE> [<TITLE>...]")
+        raise SystemExit(1)
+
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_DEFAULT_HTTP_CACHE_DIR = "data/http/"
+
+# Query params that never take part in the cache key. The OMDB key differs
+# between users and must not end up on disk.
+_IGNORED_PARAMS = ["apikey"]
+
+# Fetch from the network, serve fresh entries from disk, store new responses.
+MODE_RECORD = "record"
+# Strictly offline: serve any stored entry regardless of age, never touch the
+# network. A miss raises CacheMissError.
+MODE_REPLAY = "replay"
+# No caching at all.
+MODE_OFF = "off"
+
+
+class CacheMissError(Exception):
+    pass
+
+
+# Minimal stand-in for requests.Response, which is all the clients use.
+class CachedResponse:
+    def __init__(self, url, status_code, text, headers):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+
+# OMDB reports errors ("Series not found.", "Invalid API key!") in a 200
+# response with Response set to "False". Those must not be cached, or a
+# transient failure would stick around forever.
+def is_error_body(text):
+    if not text.lstrip().startswith("{"):
+        return False
+    try:
+        body = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get("Response") == "False"
+
+
+# Strips ignored params so the same resource always maps to the same key.
+def cache_key_url(url):
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in _IGNORED_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+# On-disk store of raw response bodies, keyed by URL. Every entry is a body
+# file plus a small json file with the url, fetch time and validators.
+class ResponseCache:
+    def __init__(self, dbpath=_DEFAULT_HTTP_CACHE_DIR):
+        Path(dbpath).mkdir(parents=True, exist_ok=True)
+        self.dbpath = dbpath
+
+    def _path(self, url):
+        digest = hashlib.sha1(cache_key_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.dbpath, digest[:2], digest)
+
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with open(path + ".json") as f:
+                meta = json.load(f)
+            with open(path + ".body", encoding="utf-8") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None, None
+        return meta, body
+
+    def put(self, url, body, headers):
+        path = self._path(url)
+        Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+        meta = {
+            "url": cache_key_url(url),
+            "fetched_at": time.time(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        # body first, meta last: an entry only counts once its meta exists.
+        self._write(path + ".body", body)
+        self._write(path + ".json", json.dumps(meta))
+
+    def touch(self, url, meta):
+        meta["fetched_at"] = time.time()
+        self._write(self._path(url) + ".json", json.dumps(meta))
+
+    # Unique temp file next to the target, so concurrent writers of the same
+    # key (threads or processes) never share one.
+    def _write(self, path, text):
+        fd, tmp = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    # All cached urls, for bulk re-parsing.
+    def urls(self):
+        for meta_path in Path(self.dbpath).glob("*/*.json"):
+            with open(meta_path) as f:
+                yield json.load(f)["url"]
+
+
+# The caching rules on top of a ResponseCache: what may be served from disk,
+# how stale entries are revalidated and which responses are stored. Shared by
+# CachingSession and the async session, which only differ in how they fetch.
+class CachePolicy:
+    def __init__(self, cache, mode=MODE_RECORD, ttl=None):
+        self.cache = cache
+        self.mode = mode
+        # seconds an entry is served without revalidation. None means forever.
+        self.ttl = ttl
+
+    # Builds the policy from VMI_HTTP_CACHE (record/replay/off),
+    # VMI_HTTP_CACHE_DIR and VMI_HTTP_CACHE_TTL. Caching is off by default,
+    # in which case this returns None.
+    @staticmethod
+    def from_env():
+        mode = os.getenv("VMI_HTTP_CACHE", MODE_OFF)
+        if mode == MODE_OFF:
+            return None
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            logging.error("Unknown VMI_HTTP_CACHE mode %s!" % mode)
+            raise SystemExit(1)
+        ttl = os.getenv("VMI_HTTP_CACHE_TTL")
+        cache = ResponseCache(
+            os.getenv("VMI_HTTP_CACHE_DIR", _DEFAULT_HTTP_CACHE_DIR))
+        return CachePolicy(cache, mode, float(ttl) if ttl else None)
+
+    def _is_fresh(self, meta):
+        return self.ttl is None or time.time() - meta["fetched_at"] < self.ttl
+
+    # Called before fetching url. Returns (meta, body, headers): if headers
+    # is None, body can be served as is. Otherwise url must be fetched with
+    # headers, which carry the validators of a stale entry, if any. A miss
+    # in replay mode raises CacheMissError.
+    def lookup(self, url, headers=None):
+        meta, body = self.cache.get(url)
+        if meta is not None:
+            if self.mode == MODE_REPLAY or self._is_fresh(meta):
+                return meta, body, None
+        elif self.mode == MODE_REPLAY:
+            raise CacheMissError(cache_key_url(url))
+
+        headers = dict(headers) if headers else {}
+        if meta is not None:
+            if meta["etag"]:
+                headers["If-None-Match"] = meta["etag"]
+            if meta["last_modified"]:
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return meta, body, headers
+
+    # Called with the fetched response, and meta and body from lookup().
+    # Stores it if it is worth keeping and returns the (status code, body)
+    # to serve, which is the cached body on 304.
+    def update(self, url, meta, body, status_code, text, headers):
+        if status_code == 304 and meta is not None:
+            self.cache.touch(url, meta)
+            return 200, body
+        if status_code == 200 and not is_error_body(text):
+            self.cache.put(url, text, headers)
+        return status_code, text
+
+
+# Wraps an HttpSession with a ResponseCache. Has the same get() interface, so
+# it can be handed to the clients in place of the session.
+class CachingSession:
+    def __init__(self, session, cache, mode=MODE_RECORD, ttl=None):
+        self.session = session
+        self.policy = CachePolicy(cache, mode, ttl)
+
+    # Wraps session as configured by the environment, see
+    # CachePolicy.from_env. Returns session itself if caching is off.
+    @staticmethod
+    def from_env(session):
+        policy = CachePolicy.from_env()
+        if policy is None:
+            return session
+        return CachingSession(session, policy.cache, policy.mode, policy.ttl)
+
+    def get(self, url, headers=None):
+        meta, body, headers = self.policy.lookup(url, headers)
+        if headers is None:
+            return CachedResponse(url, 200, body, {})
+        response = self.session.get(url, headers=headers)
+        status_code, text = self.policy.update(
+            url, meta, body, response.status_code, response.text,
+            response.headers)
+        if status_code != response.status_code:
+            return CachedResponse(url, status_code, text, response.headers)
+        return response
+
+    def close(self):
+        self.session.close()
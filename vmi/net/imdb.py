@@ -1,19 +1,95 @@
-import requests
-import sys
 import logging
+import os
+import re
+import sys
+import time
 
-from bs4 import BeautifulSoup as Soup
+from bs4 import BeautifulSoup as Soup, SoupStrainer
+from bs4.builder import builder_registry
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from re import sub
+from urllib.parse import quote
 
 from vmi.model.show import ShowMetadata
+from vmi.net.session import HttpSession
 
 _BASE_IMDB_SHOW_URL = "https://www.imdb.com/title/{imdb_id}/episodes?season={season}"
 _BASE_IMDB_DIRECTOR_URL_ = "https://www.imdb.com/name/{imdb_id}"
 _BASE_IMDB_EPISODE_REVIEW_URL = "https://www.imdb.com/title/{imdb_id}/reviews"
+# Further review pages, as loaded by the "Load More" button.
+_BASE_IMDB_EPISODE_REVIEW_PAGE_URL = "https://www.imdb.com/title/{imdb_id}/reviews/_ajax?paginationKey={key}"
 _BASE_IMDB_MOVIE_URL = "https://www.imdb.com/title/{imdb_id}"
 _BASE_IMDB_NAME_SEARCH_URL_ = "https://www.imdb.com/find?q={name}&s=nm"
 
+# Max number of season pages fetched and parsed at once. Set to 1 for the old
+# fully serial behavior.
+_DEFAULT_MAX_WORKERS = 8
+
+# BeautifulSoup tree builder used for every page: "html.parser" (pure python,
+# always available) or "lxml" (much faster, needs lxml installed). Net and
+# DbClient take it from VMI_PARSER, see choose_parser.
+DEFAULT_PARSER = "html.parser"
+
+# How scrape_movie_soup extracts its fields: "single_pass" walks the document
+# once, "legacy" searches it once per field.
+DEFAULT_MOVIE_EXTRACTOR = "single_pass"
+
+_LOAD_MORE_DIV = re.compile(r'<div[^>]*class="load-more-data"[^>]*>')
+_DATA_KEY = re.compile(r'data-key="([^"]*)"')
+
+# With strain=True, only these subtrees of each page kind are parsed at all.
+# They cover everything the scrape_*_soup methods look at. Movie pages are
+# scraped by walking the whole document, so they are never strained.
+_STRAINERS = {
+    "season": SoupStrainer('div', class_=re.compile(r'\blist_item\b')),
+    "reviews": SoupStrainer(
+        'div', class_=re.compile(r'\b(imdb-user-review|load-more-data)\b')),
+    "director": SoupStrainer(
+        'div', id=re.compile(r'^(name-overview-widget$|director)')),
+    "search": SoupStrainer('table', class_=re.compile(r'\bfindList\b')),
+}
+
+
+# Returns parser, falling back to VMI_PARSER and then DEFAULT_PARSER. Exits
+# if BeautifulSoup has no such tree builder, e.g. lxml is not installed.
+def choose_parser(parser=None):
+    if not parser:
+        parser = os.getenv("VMI_PARSER", DEFAULT_PARSER)
+    if builder_registry.lookup(parser) is None:
+        logging.error("Unknown or unavailable parser %s!" % parser)
+        raise SystemExit(1)
+    return parser
+
+
+# Page urls. They are kept apart from fetching and parsing so other fetchers,
+# like the async client, can use them without a scraper.
+
+
+def season_url(imdb_id, season_number):
+    return _BASE_IMDB_SHOW_URL.format(imdb_id=imdb_id, season=season_number)
+
+
+def reviews_url(imdb_id):
+    return _BASE_IMDB_EPISODE_REVIEW_URL.format(imdb_id=imdb_id)
+
+
+def reviews_page_url(imdb_id, pagination_key):
+    return _BASE_IMDB_EPISODE_REVIEW_PAGE_URL.format(
+        imdb_id=imdb_id, key=quote(pagination_key))
+
+
+def director_url(imdb_id):
+    return _BASE_IMDB_DIRECTOR_URL_.format(imdb_id=imdb_id)
+
+
+def movie_url(imdb_id):
+    return _BASE_IMDB_MOVIE_URL.format(imdb_id=imdb_id)
+
+
+def name_search_url(name):
+    return _BASE_IMDB_NAME_SEARCH_URL_.format(name=name)
+
 # All this info can be retrieved from the episode list page on IMDB.
 
 
@@ -46,6 +122,8 @@ class ImdbReviewData:
 class ImdbEpisodeReviewsData:
     def __init__(self):
         self.review_list = []
+        # key of the next page of reviews, None on the last page.
+        self.pagination_key = None
 
 # This information can be found in the movie list under a director page on
 # IMDB.
@@ -71,12 +149,34 @@ class ImdbMovieData:
         self.us_boxoffice = None
         self.worldwide_boxoffice = None
         self.runtime = None
+        self.rating_count = None
         self.genre_list = []
 
 
 class ImdbScraper:
-    def __init__(self):
-        self.episode_index = None
+    def __init__(
+            self,
+            session=None,
+            max_workers=_DEFAULT_MAX_WORKERS,
+            parser=DEFAULT_PARSER,
+            strain=False,
+            movie_extractor=DEFAULT_MOVIE_EXTRACTOR):
+        self._session = session
+        self.max_workers = max_workers
+        self.parser = parser
+        self.strain = strain
+        self.movie_extractor = movie_extractor
+
+    # Built on first use, so scrapers that only parse never open one.
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = HttpSession()
+        return self._session
+
+    def _soup(self, html, page=None):
+        strainer = _STRAINERS.get(page) if self.strain else None
+        return Soup(html, features=self.parser, parse_only=strainer)
 
     def _scrape_episode(self, div, season_number):
         div = div.find('div', {'class': 'info'})
@@ -104,15 +204,13 @@ class ImdbScraper:
             logging.error("IMDB scraper encountered episode score=None")
             return None
 
+        # index is assigned once all seasons are in, see assign_indexes.
         episode_data = ImdbEpisodeData()
         episode_data.season = season_number
-        episode_data.index = self.episode_index
         episode_data.number = number
         episode_data.title = title
         episode_data.score = score
         episode_data.imdb_id = imdb_id
-
-        self.episode_index += 1
         return episode_data
 
     def scrape_season_soup(self, soup, season_number):
@@ -123,22 +221,68 @@ class ImdbScraper:
                 season_data.episode_list.append(episode_data)
         return season_data
 
+    def scrape_season_html(self, html, season_number):
+        return self.scrape_season_soup(
+            self._soup(html, "season"), season_number)
+
     def _scrape_season(self, show_metadata, season_number):
-        season_url = _BASE_IMDB_SHOW_URL.format(
-            imdb_id=show_metadata.imdb_id, season=season_number)
-        content = requests.get(season_url)
-        soup = Soup(content.text, features="html.parser")
-        return self.scrape_season_soup(soup, season_number)
+        content = self.session.get(
+            season_url(show_metadata.imdb_id, season_number))
+        return self.scrape_season_html(content.text, season_number)
+
+    # Gives every episode its overall index within the show, in season order.
+    # Seasons are scraped independently (and possibly concurrently), so this
+    # must run after all of them are in.
+    def assign_indexes(self, season_data_list, first_index=1):
+        index = first_index
+        for season_data in season_data_list:
+            for episode_data in season_data.episode_list:
+                episode_data.index = index
+                index += 1
+        return index
+
+    # Scrapes the given seasons of a show and yields them in season order, as
+    # soon as each one (and every season before it) is parsed. Episode indexes
+    # continue from first_index. Season pages are fetched and parsed in
+    # parallel, up to max_workers at a time.
+    def iter_seasons(
+            self,
+            show_metadata,
+            season_numbers,
+            first_index=1,
+            max_workers=None):
+        if max_workers is None:
+            max_workers = self.max_workers
+        season_numbers = list(season_numbers)
+
+        index = first_index
+        if max_workers <= 1 or len(season_numbers) <= 1:
+            for season_number in season_numbers:
+                season_data = self._scrape_season(show_metadata, season_number)
+                index = self.assign_indexes([season_data], index)
+                yield season_data
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # map keeps results in season order.
+                for season_data in executor.map(
+                        lambda n: self._scrape_season(show_metadata, n),
+                        season_numbers):
+                    index = self.assign_indexes([season_data], index)
+                    yield season_data
+
+    # Same as scrape_show, one season at a time.
+    def iter_show(self, show_metadata, max_workers=None):
+        return self.iter_seasons(
+            show_metadata,
+            range(1, show_metadata.season_count + 1),
+            max_workers=max_workers)
 
     # Fetch episode info for a given show metadata from IMDB.
 
-    def scrape_show(self, show_metadata):
-        self.episode_index = 1
-
+    def scrape_show(self, show_metadata, max_workers=None):
         show_data = ImdbShowData()
-        for season_number in range(1, show_metadata.season_count + 1):
-            season_data = self._scrape_season(show_metadata, season_number)
-            show_data.season_list.append(season_data)
+        show_data.season_list.extend(
+            self.iter_show(show_metadata, max_workers))
         return show_data
 
     def _scrape_one_review(self, div):
@@ -147,16 +291,61 @@ class ImdbScraper:
         review_data.body = div.find('div', {'class': 'text'}).text
         return review_data
 
-    def scrape_top_reviews(self, imdb_id):
-        episode_reviews_url = _BASE_IMDB_EPISODE_REVIEW_URL.format(
-            imdb_id=imdb_id)
-        content = requests.get(episode_reviews_url)
-        soup = Soup(content.text, features="html.parser")
+    def scrape_reviews_soup(self, soup):
         review_data = ImdbEpisodeReviewsData()
         for div in soup.find_all('div', {'class': 'imdb-user-review'}):
             review_data.review_list.append(self._scrape_one_review(div))
+        load_more_div = soup.find('div', {'class': 'load-more-data'})
+        if load_more_div:
+            review_data.pagination_key = load_more_div.get('data-key')
         return review_data
 
+    def scrape_reviews_html(self, html):
+        return self.scrape_reviews_soup(self._soup(html, "reviews"))
+
+    def scrape_top_reviews(self, imdb_id):
+        content = self.session.get(reviews_url(imdb_id))
+        return self.scrape_reviews_html(content.text)
+
+    # Pulls the pagination key straight out of the raw html, so the next page
+    # can be requested before this one is parsed.
+    def _find_pagination_key(self, html):
+        match = _LOAD_MORE_DIV.search(html)
+        if not match:
+            return None
+        match = _DATA_KEY.search(match.group(0))
+        return match.group(1) if match else None
+
+    def _get_text(self, url):
+        return self.session.get(url).text
+
+    # Yields reviews page after page, following the "Load More" pagination
+    # until there are no more pages, limit reviews were yielded or
+    # time_budget seconds have passed. The next page is fetched while the
+    # current one is parsed; only one page is held at a time.
+    def iter_reviews(self, imdb_id, limit=None, time_budget=None):
+        deadline = time.monotonic() + time_budget if time_budget else None
+        count = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_page = executor.submit(
+                self._get_text, reviews_url(imdb_id))
+            while next_page:
+                html = next_page.result()
+                key = self._find_pagination_key(html)
+                next_page = None
+                if key and (deadline is None or time.monotonic() < deadline):
+                    next_page = executor.submit(
+                        self._get_text, reviews_page_url(imdb_id, key))
+                for review_data in self.scrape_reviews_html(html).review_list:
+                    if limit is not None and count >= limit:
+                        if next_page:
+                            next_page.cancel()
+                        return
+                    count += 1
+                    yield review_data
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+
     def _scrape_movie_metadata(self, div):
         # Title is the hyperlink
         title = div.find('a').text
@@ -192,22 +381,54 @@ class ImdbScraper:
                     director_data.movie_metadata_list.append(movie_metadata)
         return director_data
 
+    def scrape_director_html(self, html):
+        return self.scrape_director_soup(self._soup(html, "director"))
+
     def scrape_director(self, imdb_id):
-        director_url = _BASE_IMDB_DIRECTOR_URL_.format(imdb_id=imdb_id)
-        content = requests.get(director_url)
-        soup = Soup(content.text, features="html.parser")
-        return self.scrape_director_soup(soup)
+        content = self.session.get(director_url(imdb_id))
+        return self.scrape_director_html(content.text)
 
     def _parse_num(self, money):
         return Decimal(sub(r'[^\d.]', '', money))
 
+    def scrape_movie_html(self, html):
+        return self.scrape_movie_soup(self._soup(html))
+
     def scrape_movie(self, imdb_id):
-        movie_url = _BASE_IMDB_MOVIE_URL.format(imdb_id=imdb_id)
-        content = requests.get(movie_url)
-        soup = Soup(content.text, features="html.parser")
-        return self.scrape_movie_soup(soup)
+        content = self.session.get(movie_url(imdb_id))
+        return self.scrape_movie_html(content.text)
 
     def scrape_movie_soup(self, soup):
+        if self.movie_extractor == "legacy":
+            return self._scrape_movie_soup_legacy(soup)
+        return self._scrape_movie_soup_single_pass(soup)
+
+    def _scrape_box_office_div(self, div, movie_data):
+        h4 = div.find('h4')
+        if not h4:
+            return
+        if "Budget" in h4.text:
+            movie_data.budget = self._parse_num(h4.next_sibling)
+        if "Opening Weekend USA" in h4.text:
+            movie_data.opening_weekend = self._parse_num(h4.next_sibling)
+        if "Gross USA" in h4.text:
+            movie_data.us_boxoffice = self._parse_num(h4.next_sibling)
+        if "Cumulative Worldwide Gross" in h4.text:
+            movie_data.worldwide_boxoffice = self._parse_num(h4.next_sibling)
+
+    def _scrape_runtime_div(self, div, movie_data):
+        time = div.find('time')
+        if (time):
+            movie_data.runtime = int(time.text[:-3])
+
+    def _scrape_genres_h4(self, genre_h4, movie_data):
+        genre_span = genre_h4.parent
+        if (genre_span):
+            for a in genre_span.find_all('a'):
+                movie_data.genre_list.append(a.text.strip())
+
+    # Searches the whole tree once per field.
+    def _scrape_movie_soup_legacy(self, soup):
         movie_data = ImdbMovieData()
 
         # best effort scrape for box office info
@@ -215,27 +436,12 @@ class ImdbScraper:
         if (iterator):
             for _ in range(4):
                 iterator = iterator.findNext('div')
-                h4 = iterator.find('h4')
-                if not h4:
-                    continue
-                if "Budget" in h4.text:
-                    movie_data.budget = self._parse_num(h4.next_sibling)
-                if "Opening Weekend USA" in h4.text:
-                    movie_data.opening_weekend = self._parse_num(
-                        h4.next_sibling)
-                if "Gross USA" in h4.text:
-                    movie_data.us_boxoffice = self._parse_num(h4.next_sibling)
-                if "Cumulative Worldwide Gross" in h4.text:
-                    movie_data.worldwide_boxoffice = self._parse_num(
-                        h4.next_sibling)
+                self._scrape_box_office_div(iterator, movie_data)
 
         # best effort scrape of runtime
         iterator = soup.find("h3", string="Technical Specs")
         if (iterator):
-            iterator = iterator.findNext('div')
-            time = iterator.find('time')
-            if (time):
-                movie_data.runtime = int(time.text[:-3])
+            self._scrape_runtime_div(iterator.findNext('div'), movie_data)
 
         # best effor scrape for rating count
         rating_count_span = soup.find('span', {'itemprop': 'ratingCount'})
@@ -245,25 +451,70 @@ class ImdbScraper:
         # best effort scrape for genres
         genre_h4 = soup.find("h4", string="Genres:")
         if (genre_h4):
-            genre_span = genre_h4.parent
-            if (genre_span):
-                for a in genre_span.find_all('a'):
-                    movie_data.genre_list.append(a.text.strip())
+            self._scrape_genres_h4(genre_h4, movie_data)
+
+        return movie_data
+
+    # Walks the document once, in document order, and fills in every field
+    # from the same tags the legacy scrape would find: the first match of each
+    # heading, and the 4 (box office) or 1 (runtime) divs following it.
+    def _scrape_movie_soup_single_pass(self, soup):
+        movie_data = ImdbMovieData()
+        box_office_divs_left = 0
+        runtime_div_pending = False
+        seen = set()
+
+        for tag in soup.find_all(True):
+            if tag.name == 'div':
+                if box_office_divs_left:
+                    box_office_divs_left -= 1
+                    self._scrape_box_office_div(tag, movie_data)
+                if runtime_div_pending:
+                    runtime_div_pending = False
+                    self._scrape_runtime_div(tag, movie_data)
+            elif tag.name == 'h3':
+                if tag.string == "Box Office" and "box_office" not in seen:
+                    seen.add("box_office")
+                    box_office_divs_left = 4
+                elif tag.string == "Technical Specs" and "specs" not in seen:
+                    seen.add("specs")
+                    runtime_div_pending = True
+            elif tag.name == 'span':
+                if tag.get('itemprop') == 'ratingCount' and \
+                        "rating_count" not in seen:
+                    seen.add("rating_count")
+                    movie_data.rating_count = self._parse_num(tag.text)
+            elif tag.name == 'h4':
+                if tag.string == "Genres:" and "genres" not in seen:
+                    seen.add("genres")
+                    self._scrape_genres_h4(tag, movie_data)
 
         return movie_data
 
     def scrape_director_imdb_id_by_name(self, name):
-        search_url = _BASE_IMDB_NAME_SEARCH_URL_.format(name=name)
-        content = requests.get(search_url)
-        soup = Soup(content.text, features="html.parser")
-        return self.scrape_name_soup(name, soup)
+        return self.scrape_name_soup(name, self._search_name(name))
+
+    # Same as scrape_director_imdb_id_by_name, but returns None instead of
+    # exiting when IMDB has no match.
+    def find_director_imdb_id_by_name(self, name):
+        return self.find_name_in_soup(self._search_name(name))
+
+    def _search_name(self, name):
+        content = self.session.get(name_search_url(name))
+        return self._soup(content.text, "search")
 
     def scrape_name_soup(self, name, soup):
+        imdb_id = self.find_name_in_soup(soup)
+        if not imdb_id:
+            logging.error("No match found for %s! Try using imdb_id.", name)
+            raise SystemExit(1)
+        return imdb_id
+
+    def find_name_in_soup(self, soup):
         # result table.
         table = soup.find("table", {'class': 'findList'})
         if not table:
-            logging.error("No match found for %s! Try using imdb_id.", name)
-            raise SystemExit(1)
+            return None
         # find the first row of the results.
         row = table.findNext('tr')
         # name data.
@@ -1,5 +1,7 @@
+import logging
 import sys
 
+from concurrent.futures import ThreadPoolExecutor
 from slugify import slugify
 
 from vmi.model.director import DirectorMetadata
@@ -8,84 +10,235 @@ from vmi.model.movie import Movie, MovieMetadata
 from vmi.model.review import Review
 from vmi.model.season import Season
 from vmi.model.show import Show, ShowMetadata
+from vmi.net.cache import CachingSession
 from vmi.net.omdb import OmdbApiClient, OmdbShowData
-from vmi.net.imdb import ImdbScraper
+from vmi.net.imdb import (ImdbScraper, ImdbShowData, choose_parser,
+                           director_url, movie_url, reviews_url, season_url)
+from vmi.net.pipeline import (DIRECTOR, MOVIE, REVIEWS, SEASON, ParseJob,
+                              ParsePipeline)
+from vmi.net.session import HttpSession
+
+# Max number of requests in flight per host when hydrating many movies.
+_DEFAULT_OMDB_WORKERS = 4
+_DEFAULT_IMDB_WORKERS = 8
 
 
 class Net:
-    def __init__(self):
-        self.omdb = OmdbApiClient()
-        self.imdb = ImdbScraper()
+    def __init__(
+            self,
+            session=None,
+            omdb_workers=_DEFAULT_OMDB_WORKERS,
+            imdb_workers=_DEFAULT_IMDB_WORKERS,
+            parser=None,
+            strain=False,
+            parse_workers=None):
+        # single pooled session shared by both clients, optionally behind the
+        # raw response cache (see CachingSession.from_env).
+        if not session:
+            session = CachingSession.from_env(HttpSession())
+        self.session = session
+        # BeautifulSoup tree builder, see choose_parser.
+        parser = choose_parser(parser)
+        self.omdb = OmdbApiClient(self.session)
+        self.imdb = ImdbScraper(self.session, parser=parser, strain=strain)
+        self.omdb_workers = omdb_workers
+        self.imdb_workers = imdb_workers
+        self.pipeline = ParsePipeline(
+            self.session,
+            fetch_workers=imdb_workers,
+            parse_workers=parse_workers,
+            parser=parser,
+            strain=strain)
 
     # Based on title, attempts to read and parse show metadata.
     def get_show_metadata(self, title):
-        omdb_show_metadata = self.omdb.get_show_metadata(title)
-        return ShowMetadata(
-            title=omdb_show_metadata.title,
-            slug=slugify(omdb_show_metadata.title),
-            rating=omdb_show_metadata.imdb_rating,
-            imdb_id=omdb_show_metadata.imdb_id,
-            season_count=omdb_show_metadata.season_count)
+        return make_show_metadata(self.omdb.get_show_metadata(title))
 
     # Based on title, attempts to read and parse all episode info about a
     # particular show. Raises an system exist if we encounter any errors.
     def get_show(self, show_metadata):
-        imdb_show_data = self.imdb.scrape_show(show_metadata)
+        return make_show(show_metadata, self.imdb.scrape_show(show_metadata))
+
+    # Streaming version of get_show. Yields every Season as soon as its page
+    # is parsed, in season order.
+    def iter_show(self, show_metadata):
+        for i, season_data in enumerate(self.imdb.iter_show(show_metadata)):
+            yield make_season(i + 1, season_data)
+
+    # Scrapes only the given seasons of a show, numbering their episodes from
+    # first_index on. Used to refresh shows that are still airing.
+    def get_seasons(self, show_metadata, season_numbers, first_index=1):
+        season_numbers = list(season_numbers)
         season_list = []
-        for i, season in enumerate(imdb_show_data.season_list):
-            episode_list = []
-            for episode in season.episode_list:
-                episode_list.append(Episode(
-                    index=episode.index,
-                    season=episode.season,
-                    number=episode.number,
-                    title=episode.title,
-                    score=episode.score,
-                    imdb_id=episode.imdb_id))
-            season_list.append(Season(i + 1, episode_list))
-        show = Show(show_metadata, season_list)
-        return show
-
-    # Based on imdb_id, attempts to read and parse top 25 reviews.
+        for season_number, season_data in zip(
+                season_numbers,
+                self.imdb.iter_seasons(
+                    show_metadata, season_numbers, first_index)):
+            season_list.append(make_season(season_number, season_data))
+        return season_list
+
+    # Scrapes many shows at once for bulk refreshes. Season pages of all shows
+    # go through the fetch/parse pipeline together, so parsing is spread over
+    # all cores. Returns shows in the order of show_metadata_list, with None
+    # for shows that had a season page throttled away.
+    def get_shows(self, show_metadata_list):
+        jobs = []
+        for show_metadata in show_metadata_list:
+            for season_number in range(1, show_metadata.season_count + 1):
+                jobs.append(ParseJob(
+                    SEASON,
+                    season_url(show_metadata.imdb_id, season_number),
+                    season_number,
+                    key=(show_metadata.imdb_id, season_number)))
+        seasons = {}
+        for job, season_data in self.pipeline.run(jobs):
+            seasons[job.key] = season_data
+
+        show_list = []
+        for show_metadata in show_metadata_list:
+            show_data = ImdbShowData()
+            for season_number in range(1, show_metadata.season_count + 1):
+                show_data.season_list.append(
+                    seasons[(show_metadata.imdb_id, season_number)])
+            if None in show_data.season_list:
+                logging.warning("Skipping show %s, it was throttled." %
+                                show_metadata.title)
+                show_list.append(None)
+                continue
+            self.imdb.assign_indexes(show_data.season_list)
+            show_list.append(make_show(show_metadata, show_data))
+        return show_list
+
+    # Based on imdb_id, attempts to read and parse top 25 reviews. The page
+    # is parsed in a parser process, see ParsePipeline.parse.
     def get_reviews(self, imdb_id):
-        review_data = self.imdb.scrape_top_reviews(imdb_id)
-        review_list = []
-        for review in review_data.review_list:
-            review_list.append(Review(review.title, review.body))
-        return review_list
+        html = self.session.get(reviews_url(imdb_id)).text
+        return make_reviews(self.pipeline.parse(REVIEWS, html))
+
+    # Based on imdb_id, yields reviews past the first page, see
+    # ImdbScraper.iter_reviews.
+    def iter_reviews(self, imdb_id, limit=None, time_budget=None):
+        for review in self.imdb.iter_reviews(imdb_id, limit, time_budget):
+            yield Review(review.title, review.body)
 
     def get_director_metadata(self, imdb_id):
-        director_data = self.imdb.scrape_director(imdb_id)
-        movie_metadata_list = []
-        for movie_metadata in director_data.movie_metadata_list:
-            movie_metadata_list.append(MovieMetadata(
-                imdb_id=movie_metadata.imdb_id,
-                title=movie_metadata.title))
-        return DirectorMetadata(
-            imdb_id=imdb_id,
-            name=director_data.name,
-            slug=slugify(director_data.name),
-            movie_metadata_list=movie_metadata_list)
+        html = self.session.get(director_url(imdb_id)).text
+        return make_director_metadata(
+            imdb_id, self.pipeline.parse(DIRECTOR, html))
 
     def get_movie(self, movie_metadata):
-        omdb_movie_data = self.omdb.get_movie_data(movie_metadata)
-        imdb_movie_data = self.imdb.scrape_movie(movie_metadata.imdb_id)
-        return Movie(
-            imdb_id=omdb_movie_data.imdb_id,
-            title=omdb_movie_data.title,
-            slug=slugify(omdb_movie_data.title),
-            year=omdb_movie_data.year,
-            rating=omdb_movie_data.imdb_rating,
-            budget=imdb_movie_data.budget,
-            opening_weekend=imdb_movie_data.opening_weekend,
-            boxoffice_usa=imdb_movie_data.us_boxoffice,
-            boxoffice_worldwide=imdb_movie_data.worldwide_boxoffice,
-            runtime=imdb_movie_data.runtime,
-            genre_list=imdb_movie_data.genre_list)
+        return make_movie(
+            self.omdb.get_movie_data(movie_metadata),
+            self.imdb.scrape_movie(movie_metadata.imdb_id))
+
+    # Hydrates many movies at once. The OMDB requests run on a thread pool
+    # while the IMDB pages go through the fetch/parse pipeline, with separate
+    # limits per host. Yields movies in the order of movie_metadata_list, as
+    # soon as each one is ready. A movie that can't be fetched is logged and
+    # yields None, so it doesn't sink the rest.
+    def get_movies(self, movie_metadata_list):
+        jobs = [ParseJob(MOVIE, movie_url(movie_metadata.imdb_id), key=i)
+                for i, movie_metadata in enumerate(movie_metadata_list)]
+        with ThreadPoolExecutor(max_workers=self.omdb_workers) as omdb:
+            omdb_futures = [omdb.submit(self.omdb.get_movie_data, movie_metadata)
+                            for movie_metadata in movie_metadata_list]
+            movie_data = {}
+            done = 0
+            for job, data in self.pipeline.run(jobs, skip_errors=True):
+                movie_data[job.key] = data
+                # hand out the movies ready so far, in order.
+                while done in movie_data:
+                    yield self._make_movie_or_none(
+                        movie_metadata_list[done], omdb_futures[done],
+                        movie_data.pop(done))
+                    done += 1
+
+    def _make_movie_or_none(self, movie_metadata, omdb_future, imdb_data):
+        # the clients bail out with SystemExit on bad responses.
+        try:
+            omdb_data = omdb_future.result()
+            if imdb_data is None:
+                return None
+            return make_movie(omdb_data, imdb_data)
+        except (Exception, SystemExit) as e:
+            logging.warning("Skipping movie %s: %r" %
+                            (movie_metadata.title, e))
+            return None
 
     def get_director_imdb_id_by_name(self, name):
         return self.imdb.scrape_director_imdb_id_by_name(name)
 
+    # Like get_director_imdb_id_by_name, but None if there is no match.
+    def find_director_imdb_id_by_name(self, name):
+        return self.imdb.find_director_imdb_id_by_name(name)
+
+
+# Builders from raw OMDB/IMDB data to our models. Shared by Net and AsyncNet.
+
+
+def make_show_metadata(omdb_show_metadata):
+    return ShowMetadata(
+        title=omdb_show_metadata.title,
+        slug=slugify(omdb_show_metadata.title),
+        rating=omdb_show_metadata.imdb_rating,
+        imdb_id=omdb_show_metadata.imdb_id,
+        season_count=omdb_show_metadata.season_count)
+
+
+def make_season(number, imdb_season_data):
+    episode_list = []
+    for episode in imdb_season_data.episode_list:
+        episode_list.append(Episode(
+            index=episode.index,
+            season=episode.season,
+            number=episode.number,
+            title=episode.title,
+            score=episode.score,
+            imdb_id=episode.imdb_id))
+    return Season(number, episode_list)
+
+
+def make_show(show_metadata, imdb_show_data):
+    season_list = []
+    for i, season in enumerate(imdb_show_data.season_list):
+        season_list.append(make_season(i + 1, season))
+    return Show(show_metadata, season_list)
+
+
+def make_reviews(review_data):
+    review_list = []
+    for review in review_data.review_list:
+        review_list.append(Review(review.title, review.body))
+    return review_list
+
+
+def make_director_metadata(imdb_id, director_data):
+    movie_metadata_list = []
+    for movie_metadata in director_data.movie_metadata_list:
+        movie_metadata_list.append(MovieMetadata(
+            imdb_id=movie_metadata.imdb_id,
+            title=movie_metadata.title))
+    return DirectorMetadata(
+        imdb_id=imdb_id,
+        name=director_data.name,
+        slug=slugify(director_data.name),
+        movie_metadata_list=movie_metadata_list)
+
+
+def make_movie(omdb_movie_data, imdb_movie_data):
+    return Movie(
+        imdb_id=omdb_movie_data.imdb_id,
+        title=omdb_movie_data.title,
+        slug=slugify(omdb_movie_data.title),
+        year=omdb_movie_data.year,
+        rating=omdb_movie_data.imdb_rating,
+        budget=imdb_movie_data.budget,
+        opening_weekend=imdb_movie_data.opening_weekend,
+        boxoffice_usa=imdb_movie_data.us_boxoffice,
+        boxoffice_worldwide=imdb_movie_data.worldwide_boxoffice,
+        runtime=imdb_movie_data.runtime,
+        genre_list=imdb_movie_data.genre_list)
+
 
 # module testing only
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
-import requests
 import json
 import sys
 import os
 
+from vmi.net.session import HttpSession
+
 _BASE_SERIES_OMDB_URL = "http://www.omdbapi.com/?t={title}&type=series&apikey={api_key}"
 _BASE_MOVIE_OMDB_URL = "http://www.omdbapi.com/?i={imdb_id}&type=series&apikey={api_key}"
 
@@ -24,30 +25,53 @@ class OmdbMovieData:
         self.box_office = None
 
 
-class OmdbApiClient:
-    def __init__(self):
-        apikey = os.getenv("OMDB_API_KEY")
-        if not apikey:
-            print("""Must set env variable OMDB_API_KEY!
+def get_api_key():
+    apikey = os.getenv("OMDB_API_KEY")
+    if not apikey:
+        print("""Must set env variable OMDB_API_KEY!
 
 Go to http://www.omdbapi.com/apikey.aspx to get a free API key. Then set it:
 $ export OMDB_API_KEY=<YOUR_KEY>
 """)
-            raise SystemExit(1)
-        self.apikey = apikey
+        raise SystemExit(1)
+    return apikey
+
+
+# Request urls, usable without a client, e.g. by the async client.
+
+
+def show_metadata_url(title, apikey):
+    return _BASE_SERIES_OMDB_URL.format(title=title, api_key=apikey)
+
+
+def movie_data_url(imdb_id, apikey):
+    return _BASE_MOVIE_OMDB_URL.format(imdb_id=imdb_id, api_key=apikey)
+
+
+class OmdbApiClient:
+    def __init__(self, session=None):
+        self.apikey = get_api_key()
+        self._session = session
+
+    # Built on first use, so clients that only parse never open one.
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = HttpSession()
+        return self._session
 
     # Fetch info for a show from OMDB. Raise error if response does not
     # come back.
     def _get_show_metadata_json(self, title):
-        response = requests.request("GET", _BASE_SERIES_OMDB_URL.format(
-            title=title,
-            api_key=self.apikey))
+        response = self.session.get(show_metadata_url(title, self.apikey))
+        return self._check_show_metadata_json(title, response.text)
 
-        if not response.text:
+    def _check_show_metadata_json(self, title, text):
+        if not text:
             print("Error getting info for show '{title}'".format(title=title))
             raise SystemExit(1)
 
-        show_json = json.loads(response.text)
+        show_json = json.loads(text)
 
         # quick error check for sanity
         if show_json["Response"] == "False":
@@ -59,7 +83,14 @@ $ export OMDB_API_KEY=<YOUR_KEY>
         return show_json
 
     def get_show_metadata(self, title):
-        show_info_json = self._get_show_metadata_json(title)
+        return self._make_show_data(self._get_show_metadata_json(title))
+
+    # Same as get_show_metadata, for an already fetched response body.
+    def parse_show_metadata(self, title, text):
+        return self._make_show_data(
+            self._check_show_metadata_json(title, text))
+
+    def _make_show_data(self, show_info_json):
         data = OmdbShowData()
         data.season_count = int(show_info_json["totalSeasons"])
         data.imdb_id = show_info_json["imdbID"]
@@ -71,17 +102,17 @@ $ export OMDB_API_KEY=<YOUR_KEY>
     # come back.
 
     def _get_movie_data_json(self, imdb_id):
-        response = requests.request("GET", _BASE_MOVIE_OMDB_URL.format(
-            imdb_id=imdb_id,
-            api_key=self.apikey))
+        response = self.session.get(movie_data_url(imdb_id, self.apikey))
+        return self._check_movie_data_json(imdb_id, response.text)
 
-        if not response.text:
+    def _check_movie_data_json(self, imdb_id, text):
+        if not text:
             print(
                 "Error getting info for movie '{imdb_id}'".format(
                     imdb_id=imdb_id))
             raise SystemExit(1)
 
-        movie_json = json.loads(response.text)
+        movie_json = json.loads(text)
 
         # quick error check for sanity
         if movie_json["Response"] == "False":
@@ -93,7 +124,17 @@ $ export OMDB_API_KEY=<YOUR_KEY>
         return movie_json
 
     def get_movie_data(self, movie_metadata):
-        movie_info_json = self._get_movie_data_json(movie_metadata.imdb_id)
+        return self._make_movie_data(
+            movie_metadata,
+            self._get_movie_data_json(movie_metadata.imdb_id))
+
+    # Same as get_movie_data, for an already fetched response body.
+    def parse_movie_data(self, movie_metadata, text):
+        return self._make_movie_data(
+            movie_metadata,
+            self._check_movie_data_json(movie_metadata.imdb_id, text))
+
+    def _make_movie_data(self, movie_metadata, movie_info_json):
         data = OmdbMovieData()
         data.imdb_id = movie_metadata.imdb_id
         data.title = movie_info_json["Title"]
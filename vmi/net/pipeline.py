@@ -0,0 +1,203 @@
+import logging
+import os
+import queue
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+
+from vmi.net.imdb import DEFAULT_MOVIE_EXTRACTOR, DEFAULT_PARSER, ImdbScraper
+from vmi.net.session import ThrottledError
+
+_DEFAULT_FETCH_WORKERS = 8
+# Max number of fetched pages not parsed yet. Fetchers block once it is
+# reached, so they never run far ahead of the parsers.
+_DEFAULT_QUEUE_SIZE = 64
+
+# Events the fetchers and parsers send to the consumer in ParsePipeline.run.
+_FETCHED = "fetched"
+_PARSED = "parsed"
+_FETCHER_DONE = "fetcher_done"
+
+# Kinds of pages the pipeline parses.
+SEASON = "season"
+DIRECTOR = "director"
+MOVIE = "movie"
+REVIEWS = "reviews"
+
+# Scraper used by each parser process, see _init_parser.
+_parser_scraper = None
+
+
+# One page to fetch and parse. kind is one of the page kinds above; arg is
+# the season number for seasons. key is not used by the pipeline, callers
+# use it to tell results apart.
+class ParseJob:
+    def __init__(self, kind, url, arg=None, key=None):
+        self.kind = kind
+        self.url = url
+        self.arg = arg
+        self.key = key
+
+
+def _init_parser(parser, strain, movie_extractor):
+    global _parser_scraper
+    _parser_scraper = ImdbScraper(
+        parser=parser, strain=strain, movie_extractor=movie_extractor)
+
+
+# Runs in a parser process. Only the html goes in and only the lightweight
+# Imdb*Data record comes back.
+def _parse(kind, html, arg):
+    if kind == SEASON:
+        return _parser_scraper.scrape_season_html(html, arg)
+    if kind == DIRECTOR:
+        return _parser_scraper.scrape_director_html(html)
+    if kind == MOVIE:
+        return _parser_scraper.scrape_movie_html(html)
+    if kind == REVIEWS:
+        return _parser_scraper.scrape_reviews_html(html)
+    raise ValueError("Unknown parse job kind %s" % kind)
+
+
+# Two stage scrape pipeline: a pool of I/O threads fetches raw html, and a
+# pool of processes parses it, so parsing is not held back by the GIL. At
+# most queue_size pages are fetched but not parsed yet, and at most one page
+# per parser process is in flight. The process pool is started on first use
+# and kept until close(), single pages can be parsed on it with parse().
+class ParsePipeline:
+    def __init__(
+            self,
+            session,
+            fetch_workers=_DEFAULT_FETCH_WORKERS,
+            parse_workers=None,
+            queue_size=_DEFAULT_QUEUE_SIZE,
+            parser=DEFAULT_PARSER,
+            strain=False,
+            movie_extractor=DEFAULT_MOVIE_EXTRACTOR):
+        self.session = session
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers if parse_workers else os.cpu_count()
+        self.queue_size = queue_size
+        self.initargs = (parser, strain, movie_extractor)
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    initializer=_init_parser,
+                    initargs=self.initargs)
+            return self.pool
+
+    def close(self):
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+    # Parses one page already fetched, in a parser process.
+    def parse(self, kind, html, arg=None):
+        return self._get_pool().submit(_parse, kind, html, arg).result()
+
+    # Fetches jobs until there are none left. A failed fetch is handed on
+    # with its job. Whatever kills the fetcher itself is handed on with the
+    # final _FETCHER_DONE event, which is always sent.
+    def _fetch(self, job_queue, events, slots, stop):
+        error = None
+        try:
+            while not stop.is_set():
+                try:
+                    job = job_queue.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    item = (job, self.session.get(job.url).text, None)
+                except Exception as e:
+                    item = (job, None, e)
+                # blocks while the parsers are behind.
+                slots.acquire()
+                if stop.is_set():
+                    return
+                events.put((_FETCHED,) + item)
+        except BaseException as e:
+            error = e
+        finally:
+            events.put((_FETCHER_DONE, None, None, error))
+
+    # Yields (job, record) pairs as the records are parsed, which is not
+    # necessarily the order of jobs. Jobs whose page was throttled away yield
+    # a None record. Any other fetch or parse error is raised, unless
+    # skip_errors is set, then it is logged and the job yields None too.
+    # Whatever killed a fetcher is always raised.
+    def run(self, jobs, skip_errors=False):
+        job_queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+        job_count = job_queue.qsize()
+        if not job_count:
+            return
+        # (event, job, value, error) tuples, see _FETCHED and friends.
+        events = queue.Queue()
+        slots = threading.Semaphore(self.queue_size)
+        stop = threading.Event()
+        fetchers = [threading.Thread(
+            target=self._fetch, args=(job_queue, events, slots, stop),
+            daemon=True)
+            for _ in range(min(self.fetch_workers, job_count))]
+        for fetcher in fetchers:
+            fetcher.start()
+
+        def on_parsed(job):
+            return lambda future: events.put((_PARSED, job, future, None))
+
+        try:
+            pool = self._get_pool()
+            waiting = []
+            parsing = 0
+            done = 0
+            while done < job_count:
+                event, job, value, error = events.get()
+                results = []
+                if event == _FETCHER_DONE:
+                    if error is not None:
+                        raise error
+                elif event == _FETCHED:
+                    if error is not None:
+                        slots.release()
+                        if not isinstance(error, ThrottledError) and \
+                                not skip_errors:
+                            raise error
+                        logging.warning(
+                            "Skipping %s: %r" % (job.url, error))
+                        results.append((job, None))
+                    else:
+                        waiting.append((job, value))
+                elif event == _PARSED:
+                    parsing -= 1
+                    slots.release()
+                    # parsers bail out with SystemExit on bad pages.
+                    try:
+                        results.append((job, value.result()))
+                    except (Exception, SystemExit) as e:
+                        if not skip_errors:
+                            raise
+                        logging.warning(
+                            "Skipping %s: %r" % (job.url, e))
+                        results.append((job, None))
+
+                # keep the parsers busy before handing anything out.
+                while waiting and parsing < self.parse_workers:
+                    job, html = waiting.pop(0)
+                    future = pool.submit(_parse, job.kind, html, job.arg)
+                    parsing += 1
+                    future.add_done_callback(on_parsed(job))
+                for result in results:
+                    done += 1
+                    yield result
+        finally:
+            stop.set()
+            # wakes up fetchers waiting for a slot, so they see stop.
+            for _ in fetchers:
+                slots.release()
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+
+# Default per-host budget: requests per second, burst size, requests in
+# flight. Hosts can be given their own budget through host_budgets.
+DEFAULT_RATE = 5
+DEFAULT_BURST = 10
+DEFAULT_CONCURRENCY = 8
+# Slowest rate and lowest concurrency we back off to when throttled.
+_MIN_RATE = 0.2
+_MIN_CONCURRENCY = 1
+
+
+# Per-host budget of requests per second and requests in flight. Both shrink
+# multiplicatively when the host throttles us and grow back additively on
+# success (AIMD), so we settle just under the host's real limit.
+class HostLimiter:
+    # clock is only there so tests can drive time.
+    def __init__(self, rate, burst, concurrency, clock=time.monotonic):
+        self.clock = clock
+        self.max_rate = rate
+        self.max_concurrency = concurrency
+        self.burst = burst
+        self.rate = rate
+        self.concurrency = concurrency
+        self.tokens = burst
+        self.in_flight = 0
+        self.updated_at = clock()
+        self.cond = threading.Condition()
+        # callbacks waiting for the next release(), see try_acquire.
+        self.release_callbacks = []
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    # Non-blocking acquire, for callers that can't block a thread, like the
+    # async session. Returns 0 if a request may be sent now (pair it with
+    # release()), else the seconds to wait before trying again. If only the
+    # concurrency cap is in the way, returns None and on_release, if given,
+    # is called once on the next release(), from the releasing thread. A
+    # waiter that gives up must take it back with cancel_waiter.
+    def try_acquire(self, on_release=None):
+        with self.cond:
+            self._refill()
+            if self.in_flight < int(self.concurrency) and self.tokens >= 1:
+                self.tokens -= 1
+                self.in_flight += 1
+                return 0
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            if on_release is not None:
+                self.release_callbacks.append(on_release)
+            return None
+
+    # Forgets on_release if it was not called yet.
+    def cancel_waiter(self, on_release):
+        with self.cond:
+            if on_release in self.release_callbacks:
+                self.release_callbacks.remove(on_release)
+
+    # Blocks until a request may be sent. Must be paired with release().
+    def acquire(self):
+        with self.cond:
+            while True:
+                wait = self.try_acquire()
+                if wait == 0:
+                    return
+                self.cond.wait(wait)
+
+    def release(self, throttled=False):
+        with self.cond:
+            self.in_flight -= 1
+            if throttled:
+                self.rate = max(_MIN_RATE, self.rate / 2)
+                self.concurrency = max(
+                    _MIN_CONCURRENCY, self.concurrency / 2)
+                self.tokens = min(self.tokens, 0)
+            else:
+                self.rate = min(self.max_rate, self.rate + 0.1)
+                self.concurrency = min(
+                    self.max_concurrency, self.concurrency + 0.1)
+            self.cond.notify_all()
+            callbacks, self.release_callbacks = self.release_callbacks, []
+        # a waiter's failure must not break the request that released.
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.warning("Release callback failed: %r" % e)
+
+
+# Hands out one HostLimiter per host. Hosts without an explicit budget get
+# the default one.
+class RateLimiter:
+    def __init__(
+            self,
+            rate=DEFAULT_RATE,
+            burst=DEFAULT_BURST,
+            concurrency=DEFAULT_CONCURRENCY,
+            host_budgets=None):
+        self.default_budget = (rate, burst, concurrency)
+        self.host_budgets = host_budgets if host_budgets else {}
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def for_host(self, host):
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostLimiter(
+                    *self.host_budgets.get(host, self.default_budget))
+            return self.hosts[host]
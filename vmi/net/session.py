@@ -0,0 +1,130 @@
+import logging
+import random
+import requests
+import time
+
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+
+from vmi.net.ratelimit import (DEFAULT_BURST, DEFAULT_CONCURRENCY,
+                               DEFAULT_RATE, RateLimiter)
+
+# Number of keep-alive connections kept open per host. This should be at least
+# as large as the number of workers hitting a single host at once.
+_DEFAULT_POOL_SIZE = 16
+# Seconds to wait for a connection to be established.
+_DEFAULT_CONNECT_TIMEOUT = 5
+# Seconds to wait between bytes of the response.
+_DEFAULT_READ_TIMEOUT = 30
+
+# Retries of a throttled request, and the backoff cap in seconds.
+_DEFAULT_MAX_RETRIES = 5
+_BACKOFF_BASE = 1
+_BACKOFF_CAP = 60
+
+_THROTTLE_STATUS_CODES = [429, 503]
+# OMDB answers an exhausted key with a normal json error body.
+_THROTTLE_MARKERS = ["Request limit reached!"]
+
+
+class ThrottledError(Exception):
+    pass
+
+
+def is_throttled(status_code, text):
+    if status_code in _THROTTLE_STATUS_CODES:
+        return True
+    return any(marker in text[:1000] for marker in _THROTTLE_MARKERS)
+
+
+# Seconds to wait before retry number attempt, with "full jitter".
+def backoff_delay(attempt):
+    return random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+
+
+# Seconds the host asked us to wait in its Retry-After header, given either
+# as seconds or as an HTTP date. None if it didn't say.
+def retry_after(headers, now=None):
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0, when - (time.time() if now is None else now))
+
+
+# Seconds to wait before retry number attempt: the jittered backoff, but
+# never less than what the host asked for, up to the backoff cap.
+def retry_delay(attempt, headers=None):
+    delay = backoff_delay(attempt)
+    asked = retry_after(headers)
+    if asked is not None:
+        delay = max(delay, min(asked, _BACKOFF_CAP))
+    return delay
+
+
+# One pooled, keep-alive HTTP session shared by the OMDB and IMDB clients, so
+# repeated requests to the same host reuse their TCP+TLS connection.
+class HttpSession:
+    def __init__(
+            self,
+            pool_size=_DEFAULT_POOL_SIZE,
+            connect_timeout=_DEFAULT_CONNECT_TIMEOUT,
+            read_timeout=_DEFAULT_READ_TIMEOUT,
+            rate=DEFAULT_RATE,
+            burst=DEFAULT_BURST,
+            concurrency=DEFAULT_CONCURRENCY,
+            host_budgets=None,
+            max_retries=_DEFAULT_MAX_RETRIES,
+            limiter=None):
+        self.timeout = (connect_timeout, read_timeout)
+        # an existing RateLimiter can be passed in to share the per-host
+        # budgets with another session, like the async one.
+        self.limiter = limiter if limiter else RateLimiter(
+            rate, burst, concurrency, host_budgets)
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # Sends a GET within the host's rate budget. Throttled responses (and
+    # connection errors) are retried with jittered exponential backoff,
+    # honoring Retry-After; once retries run out, raises ThrottledError.
+    def get(self, url, headers=None):
+        host = urlsplit(url).netloc
+        limiter = self.limiter.for_host(host)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            throttled = True
+            response = None
+            try:
+                response = self.session.get(
+                    url, headers=headers, timeout=self.timeout)
+                throttled = is_throttled(response.status_code, response.text)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                logging.warning("Request to %s failed: %s" % (host, e))
+            finally:
+                limiter.release(throttled)
+            if not throttled:
+                return response
+            if attempt == self.max_retries:
+                break
+            delay = retry_delay(
+                attempt, response.headers if response is not None else None)
+            logging.warning(
+                "Throttled by %s, retrying in %.1fs..." % (host, delay))
+            time.sleep(delay)
+        raise ThrottledError(host)
+
+    def close(self):
+        self.session.close()
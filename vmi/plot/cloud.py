@@ -23,6 +23,9 @@ _CUSTOM_STOPWORDS = ["show", "book", "series", "season", "character",
 
 _ALL_STOPWORDS = list(STOPWORDS) + _CUSTOM_STOPWORDS
 
+# Max number of reviews per episode that go into a word cloud.
+_REVIEW_LIMIT = 1000
+
 
 def _get_corpus(review_list):
     corpus = []
@@ -46,18 +49,20 @@ def _get_wordcloud(review_list, extra_stopwords):
             " ".join(corpus))
 
 
-def make_wordcloud_plot(show, title, best, worst, fname):
+def make_wordcloud_plot(
+        show, title, best, worst, fname, review_limit=_REVIEW_LIMIT):
     logging.info("Making wordcloud for %s..." % show.title)
     net = Net()
 
+    # reviews are streamed straight into the corpus, page by page.
     extra_stopwords = re.sub(r"[^\w]", " ", show.title.lower()).split()
     best_wordcloud = _get_wordcloud(
-        net.get_reviews(
-            best.imdb_id),
+        net.iter_reviews(
+            best.imdb_id, limit=review_limit),
         extra_stopwords)
     worst_wordcloud = _get_wordcloud(
-        net.get_reviews(
-            worst.imdb_id),
+        net.iter_reviews(
+            worst.imdb_id, limit=review_limit),
         extra_stopwords)
 
     logging.info("Plotting...")
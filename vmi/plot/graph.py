@@ -8,7 +8,8 @@ import numpy as np
 from scipy import interpolate
 
 from vmi.db.db import DbClient
-from vmi.insights.show import ShowInsights
+from vmi.insights.frame import show_frame
+from vmi.insights.show import RunningShowInsights, ShowInsights
 from vmi.insights.season import SeasonInsights
 from vmi.plot.common import Constants, Formatters, Saver
 from vmi.util.logger import LoggerConfig
@@ -57,56 +58,75 @@ def _setup(show, fig, ax):
         fontsize=Constants.SUBTITLE_SIZE)
 
     # Labels
-    x_label = "%d episodes" % show.episode_count
-    if show.season_count > 1:
+    _set_show_xlabel(ax, show.episode_count, show.season_count)
+
+
+def _set_show_xlabel(ax, episode_count, season_count):
+    x_label = "%d episodes" % episode_count
+    if season_count > 1:
         x_label = "{x_label} - {season_count} seasons".format(
-            x_label=x_label, season_count=show.season_count)
+            x_label=x_label, season_count=season_count)
     ax.set_xlabel(x_label, fontsize=Constants.LABEL_SIZE)
 
 
-def _plot(show, fig, ax, save=False):
+# Plots the episodes of one season of the overall show plot, given as its
+# episode indexes x, scores y and labels. Appends them to gx, gy and xlabels.
+def _plot_show_season_rows(x, y, labels, ax, gx, gy, xlabels):
+    if not len(x):
+        return
 
-    xlabels = []
-    gx, gy = [], []
+    xlabels.extend(labels)
 
-    for season in show.season_list:
-        if not season.episode_list:
-            continue
+    gx.extend(x)
+    gy.extend(y)
 
-        x = list(map(lambda e: e.index, season.episode_list))
-        y = list(map(lambda e: e.score, season.episode_list))
+    # Plots the interpolation of season.episode_list for each season.
+    if (len(x) > Constants.SPLINE_K):
+        sp_x = np.linspace(x[0], x[-1], len(x) * 10)
+        sp_y = interpolate.make_interp_spline(
+            x, y, k=Constants.SPLINE_K)(sp_x)
+        ax.plot(sp_x, sp_y)
 
-        xlabels.extend(map(lambda e: e.label, season.episode_list))
+    # Plots the per season trend
+    z = np.polyfit(x, y, deg=1)
+    p = np.poly1d(z)
+    ax.scatter(x, y)
+    ax.plot(x, p(x), color=Constants.MIDDLEGROUND)
 
-        gx.extend(x)
-        gy.extend(y)
 
-        # Plots the interpolation of season.episode_list for each season.
-        if (season.episode_count > Constants.SPLINE_K):
-            sp_x = np.linspace(
-                season.episode_list[0].index, season.episode_list[-1].index, len(season.episode_list) * 10)
-            sp_y = interpolate.make_interp_spline(
-                x, y, k=Constants.SPLINE_K)(sp_x)
-            ax.plot(sp_x, sp_y)
+def _plot_show_season(season, ax, gx, gy, xlabels):
+    frame = show_frame(season)
+    _plot_show_season_rows(
+        frame.index, frame.score, frame.labels(), ax, gx, gy, xlabels)
 
-        # Plots the per season trend
-        z = np.polyfit(x, y, deg=1)
-        p = np.poly1d(z)
-        ax.scatter(x, y)
-        ax.plot(x, p(x), color=Constants.MIDDLEGROUND)
 
+def _finish_show_plot(ax, insights, gx, gy, xlabels):
     # Plots the overall show trend.
     gz = np.polyfit(gx, gy, deg=1)
     gp = np.poly1d(gz)
     ax.plot(gx, gp(gx), color=Constants.FOREGROUND)
 
-    insights = ShowInsights(show)
     _format_footnote_episodes(ax, insights)
 
     # Ticks
     ax.set_xticks(range(1, len(xlabels) + 1))
     ax.set_xticklabels(xlabels, rotation=90)
 
+
+def _plot(show, fig, ax, save=False):
+
+    xlabels = []
+    gx, gy = [], []
+
+    frame = show_frame(show)
+    for i in range(frame.season_count):
+        rows = frame.season_rows(i)
+        _plot_show_season_rows(
+            frame.index[rows], frame.score[rows], frame.labels(rows),
+            ax, gx, gy, xlabels)
+
+    _finish_show_plot(ax, ShowInsights(show), gx, gy, xlabels)
+
     if save:
         Saver.savefig(Constants.GRAPH_OUTPUT_DIR, show.slug)
 
@@ -116,10 +136,11 @@ def _plot_season(show, season, fig, ax, save=False):
     xlabels = []
     gx, gy = [], []
 
-    x = list(map(lambda e: e.number, season.episode_list))
-    y = list(map(lambda e: e.score, season.episode_list))
+    frame = show_frame(season)
+    x = frame.number
+    y = frame.score
 
-    xlabels.extend(map(lambda e: e.label, season.episode_list))
+    xlabels.extend(frame.labels())
 
     gx.extend(x)
     gy.extend(y)
@@ -130,9 +151,7 @@ def _plot_season(show, season, fig, ax, save=False):
 
     # Plots the interpolation of season.episode_list for each season.
     if (season.episode_count > 3):
-        sp_x = np.linspace(season.episode_list[0].number,
-                           season.episode_list[-1].number,
-                           len(season.episode_list) * 10)
+        sp_x = np.linspace(x[0], x[-1], len(x) * 10)
         sp_y = interpolate.make_interp_spline(x, y, k=Constants.SPLINE_K)(sp_x)
         ax.plot(sp_x, sp_y, color=color)
 
@@ -192,6 +211,38 @@ def plot_one_show(show):
     logging.info("Done!")
 
 
+# Same as plot_one_show, for a show whose seasons arrive one at a time (see
+# DbClient.stream_show). Each season is drawn as soon as it arrives, and with
+# an interactive backend the figure is refreshed right away.
+def plot_one_show_streaming(show_metadata, seasons):
+    logging.info("Plotting %s..." % show_metadata.title)
+    fig, ax = plt.subplots(**_subplot_args(0))
+    ax.set_ylabel("episode score", fontsize=Constants.LABEL_SIZE)
+    ax.set_facecolor(Constants.BACKGROUND)
+    ax.set_prop_cycle(color=Constants.COLORS)
+    ax.set_title(
+        Formatters.format_show_title(show_metadata),
+        fontsize=Constants.SUBTITLE_SIZE)
+
+    xlabels = []
+    gx, gy = [], []
+    insights = RunningShowInsights()
+    for season in seasons:
+        insights.add_season(season)
+        _plot_show_season(season, ax, gx, gy, xlabels)
+        _set_show_xlabel(ax, insights.episode_count, insights.season_count)
+        if plt.isinteractive():
+            fig.canvas.draw_idle()
+            plt.pause(0.001)
+        logging.info("Plotted season %d (avg %.2f/10 so far)" %
+                     (season.number, insights.avg_episode_rating))
+
+    fig.set_size_inches(_subplot_args(insights.episode_count)["figsize"])
+    _finish_show_plot(ax, insights, gx, gy, xlabels)
+    Saver.savefig(Constants.GRAPH_OUTPUT_DIR, show_metadata.slug)
+    logging.info("Done!")
+
+
 def plot_one_season(show, season):
     logging.info("Plotting season %d for %s..." % (season.number, show.title))
     fig, ax = plt.subplots(**_subplot_args(season.episode_count))
@@ -282,9 +333,9 @@ if __name__ == "__main__":
         raise SystemExit(1)
 
     elif (argc == 2):
-        # Single show mode
-        show1 = dbclient.get_show(sys.argv[1])
-        plot_one_show(show1)
+        # Single show mode, drawn as the seasons come in
+        show_metadata, seasons = dbclient.stream_show(sys.argv[1])
+        plot_one_show_streaming(show_metadata, seasons)
     elif (argc == 3):
         if (sys.argv[2].isdigit()):
             # Single season mode